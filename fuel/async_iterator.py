@@ -0,0 +1,242 @@
+"""Asynchronous iteration over data streams.
+
+The iterators in this module implement the asynchronous iterator protocol
+so that data streams can be consumed with ``async for`` from an
+:mod:`asyncio` event loop. They are returned by
+:meth:`.AbstractDataStream.aget_epoch_iterator` and require Python 3.5 or
+newer.
+
+"""
+import asyncio
+import threading
+
+import zmq
+import zmq.asyncio
+
+from fuel.server import array_from_buffer
+
+_STOP = object()
+
+
+class _Failure(object):
+    """Wraps an exception raised while reading ahead."""
+    def __init__(self, exception):
+        self.exception = exception
+
+
+def _next_or_stop(iterator):
+    # Futures can't hold a StopIteration, so it is replaced by a sentinel
+    try:
+        return next(iterator)
+    except StopIteration:
+        return _STOP
+
+
+async def recv_arrays_async(socket):
+    """Receive a list of NumPy arrays on an asyncio socket.
+
+    The asynchronous counterpart of :func:`.recv_arrays`.
+
+    Parameters
+    ----------
+    socket : :class:`zmq.asyncio.Socket`
+        The socket to receive the arrays on.
+
+    Returns
+    -------
+    list
+        A list of :class:`numpy.ndarray` objects.
+
+    Raises
+    ------
+    StopAsyncIteration
+        If the first JSON object received contains the key `stop`,
+        signifying that the server has finished a single epoch.
+
+    """
+    headers = await socket.recv_json()
+    if 'stop' in headers:
+        raise StopAsyncIteration
+    arrays = []
+    for header in headers:
+        data = await socket.recv()
+        arrays.append(array_from_buffer(header, data))
+    return arrays
+
+
+def connect_async(host, port, hwm):
+    """Connect an asyncio socket to a Fuel server.
+
+    Parameters
+    ----------
+    host : str
+        The host to connect to.
+    port : int
+        The port to connect on.
+    hwm : int
+        The high-water mark of the receiving socket.
+
+    Returns
+    -------
+    :class:`zmq.asyncio.Socket`
+        A connected ``PULL`` socket.
+
+    """
+    context = zmq.asyncio.Context.instance()
+    socket = context.socket(zmq.PULL)
+    socket.set_hwm(hwm)
+    socket.connect("tcp://{}:{}".format(host, port))
+    return socket
+
+
+class AsyncDataIterator(object):
+    """An asynchronous iterator over a blocking epoch iterator.
+
+    Data is read in a background thread, so that the event loop isn't
+    blocked while the data stream loads or processes data, and several
+    streams can be consumed concurrently.
+
+    Parameters
+    ----------
+    data_iterator : :class:`.DataIterator`
+        The epoch iterator to read from.
+    prefetch : int, optional
+        The number of batches (or examples) to read ahead in a dedicated
+        thread. If 0, nothing is read ahead and each batch is read on
+        demand in `executor` instead. Defaults to 1.
+    executor : :class:`concurrent.futures.Executor`, optional
+        The executor used to read data when `prefetch` is 0. Defaults to
+        the event loop's default executor.
+
+    Attributes
+    ----------
+    position : int
+        The number of times data was returned during this epoch.
+
+    Notes
+    -----
+    With prefetching, the data stream is ahead of this iterator by up to
+    `prefetch` steps. Checkpoints taken with
+    :meth:`.AbstractDataStream.state_dict` use the position of this
+    iterator, so no data is skipped when resuming.
+
+    """
+    def __init__(self, data_iterator, prefetch=1, executor=None):
+        if prefetch < 0:
+            raise ValueError("prefetch must be non-negative")
+        self.data_iterator = data_iterator
+        self.prefetch = prefetch
+        self.executor = executor
+        self.position = getattr(data_iterator, 'position', 0)
+        self._queue = None
+        self._closed = threading.Event()
+        self._done = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._done:
+            raise StopAsyncIteration
+        if self.prefetch:
+            if self._queue is None:
+                self._start()
+            data = await self._queue.get()
+        else:
+            loop = asyncio.get_event_loop()
+            data = await loop.run_in_executor(
+                self.executor, _next_or_stop, self.data_iterator)
+        if data is _STOP or isinstance(data, _Failure):
+            self._done = True
+            if data is _STOP:
+                raise StopAsyncIteration
+            raise data.exception
+        self.position += 1
+        return data
+
+    async def aclose(self):
+        """Stop reading ahead and end the iteration."""
+        self._done = True
+        self._closed.set()
+        if self._queue is not None:
+            # Make room in the queue so that the thread can see the flag
+            while not self._queue.empty():
+                self._queue.get_nowait()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_queue'] = None
+        del state['_closed']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__ = state
+        self._closed = threading.Event()
+
+    def _start(self):
+        loop = asyncio.get_event_loop()
+        self._queue = asyncio.Queue(self.prefetch)
+        thread = threading.Thread(target=self._read_ahead, args=(loop,))
+        thread.daemon = True
+        thread.start()
+
+    def _read_ahead(self, loop):
+        while not self._closed.is_set():
+            try:
+                data = next(self.data_iterator)
+            except StopIteration:
+                data = _STOP
+            except Exception as e:
+                data = _Failure(e)
+            try:
+                asyncio.run_coroutine_threadsafe(
+                    self._queue.put(data), loop).result()
+            except Exception:
+                # The event loop was closed or the consumer went away
+                return
+            if data is _STOP or isinstance(data, _Failure):
+                return
+
+
+class ServerAsyncDataIterator(object):
+    """An asynchronous iterator over the batches sent by a Fuel server.
+
+    Batches are received on a :mod:`zmq.asyncio` socket, so waiting for
+    the server doesn't need a thread.
+
+    Parameters
+    ----------
+    data_stream : :class:`.ServerDataStream`
+        The data stream whose asyncio socket to receive on.
+    as_dict : bool, optional
+        If `True`, return dictionaries mapping source names to data
+        from each source. If `False` (default), return tuples in the
+        same order as `data_stream.sources`.
+
+    Attributes
+    ----------
+    position : int
+        The number of times data was returned during this epoch.
+
+    """
+    def __init__(self, data_stream, as_dict=False):
+        self.data_stream = data_stream
+        self.as_dict = as_dict
+        self.position = 0
+        self._done = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._done:
+            raise StopAsyncIteration
+        try:
+            data = await recv_arrays_async(self.data_stream.async_socket)
+        except StopAsyncIteration:
+            self._done = True
+            raise
+        self.position += 1
+        if self.as_dict:
+            return dict(zip(self.data_stream.sources, data))
+        return tuple(data)
@@ -2,8 +2,13 @@
 """Fuel utility for extracting metadata."""
 import argparse
 import os
+import time
 
 import h5py
+import numpy
+from six.moves import range
+
+from fuel.datasets import H5PYDataset
 
 message_prefix_template = 'Metadata for {}'
 message_body_template = """
@@ -17,6 +22,246 @@ message_body_template = """
         H5PYDataset     {}
         fuel.converters {}
 """
+source_template = """
+    {name}
+        dtype           {dtype}
+        shape           {shape}
+        variable-length {vlen}
+        layout          {layout}
+        compression     {compression}
+        size on disk    {disk_size}
+        size in memory  {memory_size}
+"""
+benchmark_template = """
+    {name}
+        sequential      {sequential}
+        random          {random}
+        recommendation  {recommendation}
+"""
+
+# The size chunks are recommended to be at most
+CHUNK_BYTES = 2 ** 20
+
+
+def format_size(num_bytes):
+    """Formats a number of bytes in a human-readable way."""
+    if num_bytes is None:
+        return 'N/A'
+    if num_bytes < 1024:
+        return '{} B'.format(num_bytes)
+    for unit in ('KiB', 'MiB', 'GiB'):
+        num_bytes /= 1024.
+        if num_bytes < 1024 or unit == 'GiB':
+            return '{:.1f} {}'.format(num_bytes, unit)
+
+
+def memory_size(dataset, vlen):
+    """The number of bytes a dataset takes once read into memory."""
+    if not vlen:
+        return dataset.size * dataset.dtype.itemsize
+    if 'shapes' not in dataset.dims[0]:
+        return None
+    base_dtype = h5py.check_dtype(vlen=dataset.dtype)
+    shapes = dataset.dims[0]['shapes'][()]
+    return int(numpy.prod(shapes, axis=1).sum()) * base_dtype.itemsize
+
+
+def describe_source(h5file, name, vlen):
+    """Describes the dtype and storage of a source.
+
+    Parameters
+    ----------
+    h5file : :class:`h5py.File`
+        The file containing the source.
+    name : str
+        The name of the source.
+    vlen : bool
+        Whether the source is variable-length.
+
+    Returns
+    -------
+    str
+        The description.
+
+    """
+    dataset = h5file[name]
+    if vlen:
+        dtype = 'vlen {}'.format(h5py.check_dtype(vlen=dataset.dtype))
+    else:
+        dtype = str(dataset.dtype)
+    if dataset.chunks is None:
+        layout = 'contiguous'
+        if H5PYDataset._get_layout(dataset) is not None:
+            layout += ' (memory-mappable)'
+    else:
+        layout = 'chunked, chunks of {}'.format(dataset.chunks)
+    compression = []
+    if dataset.compression:
+        compression.append('{} ({})'.format(dataset.compression,
+                                            dataset.compression_opts))
+    if dataset.shuffle:
+        compression.append('shuffle')
+    return source_template.format(
+        name=name, dtype=dtype, shape=dataset.shape, vlen=vlen,
+        layout=layout, compression=', '.join(compression) or 'none',
+        disk_size=format_size(dataset.id.get_storage_size()),
+        memory_size=format_size(memory_size(dataset, vlen)))
+
+
+def describe_splits(h5file):
+    """Describes the examples of each split, for each source."""
+    lines = []
+    for row in h5file.attrs['split']:
+        split, source = row['split'].decode('utf8'), row['source'].decode(
+            'utf8')
+        if not row['available']:
+            examples = 'not available'
+        elif row['indices']:
+            examples = '{} examples given by indices'.format(
+                len(h5file[row['indices']]))
+        else:
+            examples = 'examples [{}, {})'.format(row['start'], row['stop'])
+        comment = row['comment'].decode('utf8')
+        if comment and comment != '.':
+            examples += ' ({})'.format(comment)
+        lines.append('    {:<15} {:<15} {}'.format(split, source, examples))
+    return '\n' + '\n'.join(lines) + '\n'
+
+
+def recommend_chunks(shape, itemsize, batch_size):
+    """Recommends the chunk shape of a source read in batches.
+
+    Chunks hold whole examples, at most `batch_size` of them and at most
+    about 1 MiB, so that a batch is read from a few chunks while reading
+    a random example doesn't read much more data than needed.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        The shape of the source.
+    itemsize : int
+        The size of the source's elements in bytes.
+    batch_size : int
+        The number of examples read at once.
+
+    Returns
+    -------
+    tuple of int
+        The chunk shape.
+
+    """
+    example_size = int(numpy.prod(shape[1:], dtype='int64')) * itemsize
+    rows = max(1, min(batch_size, CHUNK_BYTES // max(example_size, 1),
+                      shape[0]))
+    return (rows,) + tuple(shape[1:])
+
+
+def benchmark_source(dataset, batch_size, num_batches, rng):
+    """Times sequential and random reads of batches of a source.
+
+    Parameters
+    ----------
+    dataset : :class:`h5py.Dataset`
+        The source to read from.
+    batch_size : int
+        The number of examples per batch.
+    num_batches : int
+        The number of batches to read in each mode.
+    rng : :class:`numpy.random.RandomState`
+        Used to draw the random batches.
+
+    Returns
+    -------
+    tuple of float
+        The average time to read a batch sequentially and randomly, in
+        seconds.
+
+    """
+    num_examples = len(dataset)
+    batch_size = min(batch_size, num_examples)
+    starts = range(0, num_examples - batch_size + 1, batch_size)
+    starts = list(starts)[:num_batches]
+    begin = time.time()
+    for start in starts:
+        dataset[start:start + batch_size]
+    sequential = (time.time() - begin) / len(starts)
+    begin = time.time()
+    for _ in range(num_batches):
+        # h5py requires increasing indices
+        indices = numpy.sort(rng.choice(num_examples, batch_size,
+                                        replace=False))
+        dataset[indices.tolist()]
+    random = (time.time() - begin) / num_batches
+    return sequential, random
+
+
+def describe_benchmark(h5file, name, vlen, batch_size, num_batches, rng):
+    """Benchmarks a source and recommends a layout for it."""
+    dataset = h5file[name]
+    sequential, random = benchmark_source(dataset, batch_size, num_batches,
+                                          rng)
+    batch_bytes = memory_size(dataset, vlen) or 0
+    batch_bytes *= min(batch_size, len(dataset)) / float(len(dataset))
+
+    def timing(seconds):
+        rate = batch_bytes / seconds / 2 ** 20 if seconds else float('inf')
+        return '{:.2f} ms per batch ({:.1f} MiB/s)'.format(
+            seconds * 1000, rate)
+
+    if vlen:
+        recommendation = 'none (variable-length)'
+    elif dataset.chunks is None:
+        recommendation = 'none (contiguous)'
+    elif not dataset.compression:
+        # Contiguous sources can be memory-mapped, which is fastest
+        recommendation = 'contiguous, e.g. h5repack -l {}:CONTI'.format(name)
+    else:
+        chunks = recommend_chunks(dataset.shape, dataset.dtype.itemsize,
+                                  batch_size)
+        if chunks == dataset.chunks:
+            recommendation = 'none (chunks of {})'.format(chunks)
+        else:
+            recommendation = 'chunks of {}, e.g. h5repack -l {}:CHUNK={}'
+            recommendation = recommendation.format(
+                chunks, name, 'x'.join(str(size) for size in chunks))
+    return benchmark_template.format(
+        name=name, sequential=timing(sequential), random=timing(random),
+        recommendation=recommendation)
+
+
+def extended_report(h5file, batch_size, num_batches):
+    """Describes the sources and splits of a file, and benchmarks them.
+
+    Parameters
+    ----------
+    h5file : :class:`h5py.File`
+        An HDF5 file respecting the H5PYDataset interface.
+    batch_size : int
+        The number of examples per batch in the benchmark.
+    num_batches : int
+        The number of batches read in each mode of the benchmark.
+
+    Returns
+    -------
+    str
+        The report.
+
+    """
+    vlen_sources = H5PYDataset.get_vlen_sources(h5file)
+    sources = sorted(set(
+        row['source'].decode('utf8') for row in h5file.attrs['split']))
+    rng = numpy.random.RandomState(1)
+    sections = [
+        ('Sources', ''.join(describe_source(h5file, source,
+                                            source in vlen_sources)
+                            for source in sources)),
+        ('Splits', describe_splits(h5file)),
+        ('Read benchmark (batches of {})'.format(batch_size),
+         ''.join(describe_benchmark(h5file, source, source in vlen_sources,
+                                    batch_size, num_batches, rng)
+                 for source in sources if len(h5file[source])))]
+    return ''.join('\n{}\n{}\n{}'.format(title, '-' * len(title), body)
+                   for title, body in sections)
 
 
 def main(args=None):
@@ -35,12 +280,26 @@ def main(args=None):
     parser = argparse.ArgumentParser(
         description='Extracts metadata from a Fuel-converted HDF5 file.')
     parser.add_argument("filename", help="HDF5 file to analyze")
-    args = parser.parse_args()
+    parser.add_argument(
+        "-e", "--extended", action='store_true',
+        help="also describe the sources and splits, benchmark reading "
+             "them and recommend a layout")
+    parser.add_argument(
+        "--batch-size", type=int, default=128,
+        help="batch size of the benchmark (default: 128)")
+    parser.add_argument(
+        "--num-batches", type=int, default=20,
+        help="number of batches read in each mode of the benchmark "
+             "(default: 20)")
+    args = parser.parse_args(args)
 
     with h5py.File(args.filename, 'r') as h5file:
         interface_version = h5file.attrs.get('h5py_interface_version', 'N/A')
         fuel_convert_version = h5file.attrs.get('fuel_convert_version', 'N/A')
         fuel_convert_command = h5file.attrs.get('fuel_convert_command', 'N/A')
+        if args.extended:
+            report = extended_report(h5file, args.batch_size,
+                                     args.num_batches)
 
     message_prefix = message_prefix_template.format(
         os.path.basename(args.filename))
@@ -48,6 +307,8 @@ def main(args=None):
         fuel_convert_command, interface_version, fuel_convert_version)
     message = ''.join(['\n', message_prefix, '\n', '=' * len(message_prefix),
                        message_body])
+    if args.extended:
+        message += report
     print(message)
 
 
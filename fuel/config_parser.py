@@ -51,6 +51,26 @@ The following configurations are supported:
    The default :class:`~numpy.dtype` to use for floating point numbers. The
    default value is ``float64``. A lower value can save memory.
 
+.. option:: hdf5_handle_linger
+
+   The number of seconds an HDF5 file opened by
+   :class:`~.datasets.H5PYDataset` is kept open after the last dataset
+   using it closes it, so that reopening it (e.g. every epoch) is avoided.
+   Defaults to 0, i.e. files are closed immediately. Can also be set using
+   the environment variable ``FUEL_HDF5_HANDLE_LINGER``.
+
+.. option:: hdf5_rdcc_nbytes
+
+   The size in bytes of the chunk cache of the HDF5 files opened by
+   :class:`~.datasets.H5PYDataset`. Defaults to the h5py default. Can also
+   be set using the environment variable ``FUEL_HDF5_RDCC_NBYTES``.
+
+.. option:: hdf5_rdcc_nslots
+
+   The number of slots of the chunk cache of the HDF5 files opened by
+   :class:`~.datasets.H5PYDataset`. Defaults to the h5py default. Can also
+   be set using the environment variable ``FUEL_HDF5_RDCC_NSLOTS``.
+
 .. option:: extra_downloaders
 
    A list of package names which, like fuel.downloaders, define an
@@ -96,6 +116,25 @@ def extra_downloader_converter(value):
     return value
 
 
+def optional_int(value):
+    """Parses an integer setting that may be left unset.
+
+    Parameters
+    ----------
+    value : int, str or None
+        The configuration value. ``None`` and empty strings mean the
+        setting is unset.
+
+    Returns
+    -------
+    int or None
+
+    """
+    if value is None or value == '':
+        return None
+    return int(value)
+
+
 def multiple_paths_parser(value):
     """Parses data_path argument.
 
@@ -192,6 +231,12 @@ config = Configuration()
 config.add_config('data_path', type_=multiple_paths_parser,
                   env_var='FUEL_DATA_PATH')
 config.add_config('default_seed', type_=int, default=1)
+config.add_config('hdf5_handle_linger', type_=float, default=0,
+                  env_var='FUEL_HDF5_HANDLE_LINGER')
+config.add_config('hdf5_rdcc_nbytes', type_=optional_int, default=None,
+                  env_var='FUEL_HDF5_RDCC_NBYTES')
+config.add_config('hdf5_rdcc_nslots', type_=optional_int, default=None,
+                  env_var='FUEL_HDF5_RDCC_NSLOTS')
 config.add_config('extra_downloaders', type_=extra_downloader_converter,
                   default=[], env_var='FUEL_EXTRA_DOWNLOADERS')
 config.add_config('extra_converters', type_=extra_downloader_converter,
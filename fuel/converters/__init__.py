@@ -9,33 +9,30 @@ specific arguments. They should set a `func` default argument for the
 subparser with a function that will get called and given the parsed
 command-line arguments, and is expected to download the required files.
 
+Submodules are imported when they are first accessed, or when their
+converter is used.
+
 """
-from fuel.converters import adult
-from fuel.converters import binarized_mnist
-from fuel.converters import caltech101_silhouettes
-from fuel.converters import celeba
-from fuel.converters import cifar10
-from fuel.converters import cifar100
-from fuel.converters import dogs_vs_cats
-from fuel.converters import iris
-from fuel.converters import mnist
-from fuel.converters import svhn
-from fuel.converters import jpgtgz
-from fuel.converters import ilsvrc2010
-from fuel.converters import youtube_audio
+import importlib
+
+from fuel.utils import lazy_module_attributes
 
 __version__ = '0.2'
-all_converters = (
-    ('adult', adult.fill_subparser),
-    ('binarized_mnist', binarized_mnist.fill_subparser),
-    ('caltech101_silhouettes', caltech101_silhouettes.fill_subparser),
-    ('celeba', celeba.fill_subparser),
-    ('cifar10', cifar10.fill_subparser),
-    ('cifar100', cifar100.fill_subparser),
-    ('dogs_vs_cats', dogs_vs_cats.fill_subparser),
-    ('iris', iris.fill_subparser),
-    ('mnist', mnist.fill_subparser),
-    ('svhn', svhn.fill_subparser),
-    ('jpgtgz', jpgtgz.fill_subparser))
-    ('ilsvrc2010', ilsvrc2010.fill_subparser),
-    ('youtube_audio', youtube_audio.fill_subparser))
+
+
+def _lazy_fill_subparser(name):
+    """Import a converter's module only when its subparser is filled."""
+    def fill_subparser(subparser):
+        module = importlib.import_module('fuel.converters.' + name)
+        return module.fill_subparser(subparser)
+    return fill_subparser
+
+
+all_converters = tuple(
+    (name, _lazy_fill_subparser(name)) for name in
+    ('adult', 'billion', 'binarized_mnist', 'caltech101_silhouettes',
+     'celeba', 'cifar10', 'cifar100', 'dogs_vs_cats', 'iris', 'mnist',
+     'svhn', 'jpgtgz', 'ilsvrc2010', 'youtube_audio'))
+
+lazy_module_attributes(__name__, dict(
+    (name, 'fuel.converters.' + name) for name, _ in all_converters))
@@ -1,12 +1,18 @@
 import os
 import sys
+import tempfile
+from collections import deque
 from contextlib import contextmanager
+from itertools import chain, islice
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
 from six import wraps
 
 import numpy
 from progressbar import (ProgressBar, Percentage, Bar, ETA)
 
 from fuel.datasets import H5PYDataset
+from fuel.streams import DataStream
 from ..exceptions import MissingInputFiles
 
 
@@ -61,16 +67,27 @@ def fill_hdf5_file(h5file, data):
         * 'split_name' is a string identifier for the split name
         * 'source_name' is a string identifier for the source name
         * 'data_array' is a :class:`numpy.ndarray` containing the data
-          for this split/source pair
+          for this split/source pair, or a list of arrays that are
+          concatenated along their first axis
         * 'comment' is a comment string for the split/source pair
 
         The 'comment' element can optionally be omitted.
 
     """
+    # The arrays given in parts are written to the file one after the
+    # other, so that they never need to be concatenated in memory
+    def parts(split_tuple):
+        if isinstance(split_tuple[2], (list, tuple)):
+            return split_tuple[2]
+        return [split_tuple[2]]
+
+    def length(split_tuple):
+        return sum(len(part) for part in parts(split_tuple))
+
     # Check that all sources for a split have the same length
     split_names = set(split_tuple[0] for split_tuple in data)
     for name in split_names:
-        lengths = [len(split_tuple[2]) for split_tuple in data
+        lengths = [length(split_tuple) for split_tuple in data
                    if split_tuple[0] == name]
         if not all(l == lengths[0] for l in lengths):
             raise ValueError("split '{}' has sources that ".format(name) +
@@ -84,17 +101,22 @@ def fill_hdf5_file(h5file, data):
     source_names = set(split_tuple[1] for split_tuple in data)
     for name in source_names:
         splits = [s for s in data if s[1] == name]
-        indices = numpy.cumsum([0] + [len(s[2]) for s in splits])
-        if not all(s[2].dtype == splits[0][2].dtype for s in splits):
+        indices = numpy.cumsum([0] + [length(s) for s in splits])
+        arrays = [part for s in splits for part in parts(s)]
+        if not all(array.dtype == arrays[0].dtype for array in arrays):
             raise ValueError("source '{}' has splits that ".format(name) +
                              "vary in dtype")
-        if not all(s[2].shape[1:] == splits[0][2].shape[1:] for s in splits):
+        if not all(array.shape[1:] == arrays[0].shape[1:]
+                   for array in arrays):
             raise ValueError("source '{}' has splits that ".format(name) +
                              "vary in shapes")
         dataset = h5file.create_dataset(
-            name, (sum(len(s[2]) for s in splits),) + splits[0][2].shape[1:],
-            dtype=splits[0][2].dtype)
-        dataset[...] = numpy.concatenate([s[2] for s in splits], axis=0)
+            name, (indices[-1],) + arrays[0].shape[1:],
+            dtype=arrays[0].dtype)
+        start = 0
+        for array in arrays:
+            dataset[start:start + len(array)] = array
+            start += len(array)
         for i, j, s in zip(indices[:-1], indices[1:], splits):
             if len(s) == 4:
                 split_dict[s[0]][name] = (i, j, None, s[3])
@@ -103,6 +125,177 @@ def fill_hdf5_file(h5file, data):
     h5file.attrs['split'] = H5PYDataset.create_split_array(split_dict)
 
 
+def read_array(f, shape, dtype='uint8', out_dtype=None, convert=None,
+               buffer_size=2 ** 20):
+    """Reads a binary array from a file into a preallocated array.
+
+    The data is read with ``readinto`` in pieces of at most `buffer_size`
+    bytes, so that unlike ``numpy.frombuffer(f.read())`` no intermediate
+    copy of the whole data is made, even when reading from compressed
+    files.
+
+    Parameters
+    ----------
+    f : file-like object
+        The file to read from, positioned at the start of the data.
+    shape : tuple of int
+        The shape of the array.
+    dtype : str or :class:`numpy.dtype`, optional
+        The dtype of the data in the file. Defaults to 'uint8'.
+    out_dtype : str or :class:`numpy.dtype`, optional
+        If given, the dtype of the returned array. The data is then read
+        one piece at a time, and each piece is converted into the
+        corresponding part of the returned array.
+    convert : callable, optional
+        Called as ``convert(piece, out)`` to convert each piece of the
+        data into `out`, a flat view of the returned array. Defaults to
+        casting the data to `out_dtype`.
+    buffer_size : int, optional
+        The maximum number of bytes read at once. Defaults to 1 MiB.
+
+    Returns
+    -------
+    array : :class:`numpy.ndarray`
+        An array of the given shape.
+
+    """
+    dtype = numpy.dtype(dtype)
+    if out_dtype is None:
+        array = numpy.empty(shape, dtype)
+        _read_into(f, array.reshape(-1).view('uint8'), buffer_size)
+        return array
+    array = numpy.empty(shape, out_dtype)
+    flat = array.reshape(-1)
+    step = max(buffer_size // dtype.itemsize, 1)
+    buffer_ = numpy.empty(min(step, flat.size), dtype)
+    for start in range(0, flat.size, step):
+        piece = buffer_[:min(step, flat.size - start)]
+        _read_into(f, piece.view('uint8'), buffer_size)
+        out = flat[start:start + len(piece)]
+        if convert is None:
+            out[...] = piece
+        else:
+            convert(piece, out)
+    return array
+
+
+def _read_into(f, buffer_, buffer_size):
+    """Fills a flat ``uint8`` array with the bytes read from a file."""
+    position = 0
+    while position < len(buffer_):
+        piece = buffer_[position:position + buffer_size]
+        if hasattr(f, 'readinto'):
+            read = f.readinto(piece)
+        else:
+            data = f.read(len(piece))
+            read = len(data)
+            piece[:read] = numpy.frombuffer(data, dtype='uint8')
+        if not read:
+            raise ValueError("unexpected end of file")
+        position += read
+
+
+def fill_tokenized_corpus(h5file, text_file, block_size=65536):
+    """Fills an HDF5 file with a tokenized text corpus.
+
+    The sentences of `text_file` are numberized once and stored as a
+    flat ``int32`` array of tokens (the `tokens` dataset) together with
+    an ``int64`` array of ``num_sentences + 1`` offsets into it (the
+    `offsets` dataset), such that sentence ``i`` is given by
+    ``tokens[offsets[i]:offsets[i + 1]]``. Both datasets are stored
+    contiguously and uncompressed, so that they can be memory-mapped by
+    :class:`fuel.datasets.TokenizedCorpus`.
+
+    Parameters
+    ----------
+    h5file : :class:`h5py.File`
+        File handle for an HDF5 file.
+    text_file : :class:`fuel.datasets.TextFile`
+        The corpus to tokenize.
+    block_size : int, optional
+        The number of sentences that are written to disk at once.
+        Defaults to 65536.
+
+    """
+    # The total number of tokens is only known at the end, so they are
+    # first written to a temporary file and copied over afterwards,
+    # which allows the datasets to be contiguous instead of chunked.
+    lengths = []
+    with tempfile.TemporaryFile() as buffer_file:
+        sentences = DataStream(text_file).get_epoch_iterator()
+        while True:
+            block = [sentence for sentence, in islice(sentences, block_size)]
+            if not block:
+                break
+            block_lengths = [len(sentence) for sentence in block]
+            lengths.extend(block_lengths)
+            buffer_file.write(numpy.fromiter(
+                chain.from_iterable(block), dtype='int32',
+                count=sum(block_lengths)).tobytes())
+        offsets = numpy.zeros(len(lengths) + 1, dtype='int64')
+        numpy.cumsum(lengths, out=offsets[1:])
+        tokens = h5file.create_dataset('tokens', (offsets[-1],),
+                                       dtype='int32')
+        buffer_file.seek(0)
+        for start in range(0, offsets[-1], block_size * 32):
+            block = numpy.frombuffer(
+                buffer_file.read(block_size * 32 * 4), dtype='int32')
+            tokens[start:start + len(block)] = block
+    h5file.create_dataset('offsets', data=offsets)
+    h5file['tokens'].dims[0].label = 'token'
+    h5file['offsets'].dims[0].label = 'sentence'
+
+
+def parallel_map(function, iterable, num_workers=None, buffer_size=None):
+    """Applies a function to each item of an iterable in worker threads.
+
+    Unlike :meth:`multiprocessing.pool.Pool.imap`, at most `buffer_size`
+    items are read ahead of the results that were consumed, so that e.g.
+    the members of a large archive can be decoded while it's being read
+    without holding it in memory.
+
+    Parameters
+    ----------
+    function : callable
+        The function to apply. It should release the GIL (as e.g. image
+        decoding does) for threads to help.
+    iterable : iterable
+        The items to apply the function to.
+    num_workers : int, optional
+        The number of threads. Defaults to the number of CPUs. If 1, the
+        function is applied in the calling thread.
+    buffer_size : int, optional
+        The maximum number of items being processed at once. Defaults to
+        four times `num_workers`.
+
+    Yields
+    ------
+    object
+        The results of the function, in the order of `iterable`.
+
+    """
+    if num_workers is None:
+        num_workers = cpu_count()
+    if num_workers == 1:
+        for item in iterable:
+            yield function(item)
+        return
+    if buffer_size is None:
+        buffer_size = 4 * num_workers
+    pool = ThreadPool(num_workers)
+    try:
+        pending = deque()
+        for item in iterable:
+            pending.append(pool.apply_async(function, (item,)))
+            if len(pending) >= buffer_size:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
 @contextmanager
 def progress_bar(name, maxval, prefix='Converting'):
     """Manages a progress bar for a conversion.
@@ -0,0 +1,107 @@
+import os
+
+import h5py
+from six.moves import cPickle
+
+from fuel.converters.base import fill_tokenized_corpus
+from fuel.datasets import TextFile
+from fuel.exceptions import MissingInputFiles
+
+
+def convert_one_billion_word(directory, output_directory, which_set,
+                             which_partitions, dictionary,
+                             output_filename=None):
+    """Converts the One Billion Word benchmark to HDF5.
+
+    Tokenizes the given partitions of the One Billion Word benchmark
+    once and saves them in a format that can be read by
+    :class:`fuel.datasets.TokenizedCorpus`. The converted dataset is
+    saved as 'billion_training.hdf5' or 'billion_heldout.hdf5'.
+
+    This method assumes the existence of the directories
+    `training-monolingual.tokenized.shuffled` and
+    `heldout-monolingual.tokenized.shuffled`, as extracted from the
+    original archive.
+
+    Parameters
+    ----------
+    directory : str
+        Directory in which input files reside.
+    output_directory : str
+        Directory in which to save the converted dataset.
+    which_set : 'training' or 'heldout'
+        Which dataset to convert.
+    which_partitions : list of ints
+        The partitions to convert, see
+        :class:`fuel.datasets.OneBillionWord`.
+    dictionary : str
+        Path to a pickled dictionary mapping tokens to integers, which
+        contains the tokens ``<S>``, ``</S>`` and ``<UNK>``.
+    output_filename : str, optional
+        Name of the saved dataset. Defaults to `None`, in which case a name
+        based on `which_set` will be used.
+
+    Returns
+    -------
+    output_paths : tuple of str
+        Single-element tuple containing the path to the converted dataset.
+
+    """
+    if which_set == 'training':
+        if not all(partition in range(1, 100)
+                   for partition in which_partitions):
+            raise ValueError
+        filenames = [os.path.join(
+            'training-monolingual.tokenized.shuffled',
+            'news.en-{:05d}-of-00100'.format(partition))
+            for partition in which_partitions]
+    elif which_set == 'heldout':
+        if not all(partition in range(50)
+                   for partition in which_partitions):
+            raise ValueError
+        filenames = [os.path.join(
+            'heldout-monolingual.tokenized.shuffled',
+            'news.en.heldout-{:05d}-of-00050'.format(partition))
+            for partition in which_partitions]
+    else:
+        raise ValueError
+    missing = [filename for filename in filenames
+               if not os.path.isfile(os.path.join(directory, filename))]
+    if missing:
+        raise MissingInputFiles('Required files missing', missing)
+    with open(dictionary, 'rb') as f:
+        dictionary = cPickle.load(f)
+    text_file = TextFile(
+        [os.path.join(directory, filename) for filename in filenames],
+        dictionary)
+
+    if output_filename is None:
+        output_filename = 'billion_{}.hdf5'.format(which_set)
+    output_path = os.path.join(output_directory, output_filename)
+    h5file = h5py.File(output_path, mode='w')
+    fill_tokenized_corpus(h5file, text_file)
+    h5file.flush()
+    h5file.close()
+
+    return (output_path,)
+
+
+def fill_subparser(subparser):
+    """Sets up a subparser to convert the One Billion Word benchmark.
+
+    Parameters
+    ----------
+    subparser : :class:`argparse.ArgumentParser`
+        Subparser handling the `billion` command.
+
+    """
+    subparser.add_argument(
+        "--which-set", help="which set to convert", dest="which_set",
+        choices=('training', 'heldout'), type=str, default='training')
+    subparser.add_argument(
+        "--partitions", help="the partitions to convert",
+        dest="which_partitions", type=int, nargs='+', required=True)
+    subparser.add_argument(
+        "--dictionary", help="path to a pickled dictionary mapping tokens "
+        "to integers", type=str, required=True)
+    return convert_one_billion_word
@@ -1,7 +1,9 @@
 import os
+from itertools import islice
 
 import h5py
 import numpy
+from six.moves import range
 
 from fuel.converters.base import fill_hdf5_file, check_exists
 
@@ -49,15 +51,9 @@ def convert_binarized_mnist(directory, output_directory,
     output_path = os.path.join(output_directory, output_filename)
     h5file = h5py.File(output_path, mode='w')
 
-    train_set = numpy.loadtxt(
-        os.path.join(directory, TRAIN_FILE)).reshape(
-            (-1, 1, 28, 28)).astype('uint8')
-    valid_set = numpy.loadtxt(
-        os.path.join(directory, VALID_FILE)).reshape(
-            (-1, 1, 28, 28)).astype('uint8')
-    test_set = numpy.loadtxt(
-        os.path.join(directory, TEST_FILE)).reshape(
-            (-1, 1, 28, 28)).astype('uint8')
+    train_set = read_amat(os.path.join(directory, TRAIN_FILE), (1, 28, 28))
+    valid_set = read_amat(os.path.join(directory, VALID_FILE), (1, 28, 28))
+    test_set = read_amat(os.path.join(directory, TEST_FILE), (1, 28, 28))
     data = (('train', 'features', train_set),
             ('valid', 'features', valid_set),
             ('test', 'features', test_set))
@@ -81,3 +77,41 @@ def fill_subparser(subparser):
 
     """
     return convert_binarized_mnist
+
+
+def read_amat(filename, shape, dtype='uint8', block_size=1000):
+    """Reads a matrix of whitespace-separated numbers, one row per line.
+
+    Unlike :func:`numpy.loadtxt`, the rows are parsed in blocks straight
+    into a preallocated array, so that the data is only held in memory
+    once, in its final dtype.
+
+    Parameters
+    ----------
+    filename : str
+        Filename/path of the matrix.
+    shape : tuple of int
+        The shape of each row.
+    dtype : str, optional
+        The dtype of the returned array. Defaults to 'uint8'.
+    block_size : int, optional
+        The number of rows parsed at once. Defaults to 1000.
+
+    Returns
+    -------
+    array : :class:`~numpy.ndarray`
+        An array of shape ``(num_rows,) + shape``.
+
+    """
+    with open(filename) as f:
+        num_rows = sum(1 for line in f if line.strip())
+        array = numpy.empty((num_rows,) + shape, dtype=dtype)
+        rows = array.reshape((num_rows, -1))
+        f.seek(0)
+        lines = (line for line in f if line.strip())
+        for start in range(0, num_rows, block_size):
+            block = numpy.fromstring(
+                ' '.join(islice(lines, block_size)), sep=' ')
+            rows[start:start + block_size] = block.reshape(
+                (-1, rows.shape[1]))
+    return array
@@ -44,7 +44,11 @@ def convert_cifar10(directory, output_directory,
     input_file = os.path.join(directory, DISTRIBUTION_FILE)
     tar_file = tarfile.open(input_file, 'r:gz')
 
-    train_batches = []
+    # The batches are written to the file one after the other instead of
+    # being concatenated, so that the training set is only held in memory
+    # once
+    train_features = []
+    train_labels = []
     for batch in range(1, 6):
         file = tar_file.extractfile(
             'cifar-10-batches-py/data_batch_%d' % batch)
@@ -53,17 +57,12 @@ def convert_cifar10(directory, output_directory,
                 array = cPickle.load(file, encoding='latin1')
             else:
                 array = cPickle.load(file)
-            train_batches.append(array)
         finally:
             file.close()
-
-    train_features = numpy.concatenate(
-        [batch['data'].reshape(batch['data'].shape[0], 3, 32, 32)
-            for batch in train_batches])
-    train_labels = numpy.concatenate(
-        [numpy.array(batch['labels'], dtype=numpy.uint8)
-            for batch in train_batches])
-    train_labels = numpy.expand_dims(train_labels, 1)
+        train_features.append(
+            array['data'].reshape(array['data'].shape[0], 3, 32, 32))
+        train_labels.append(numpy.expand_dims(
+            numpy.array(array['labels'], dtype=numpy.uint8), 1))
 
     file = tar_file.extractfile('cifar-10-batches-py/test_batch')
     try:
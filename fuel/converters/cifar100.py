@@ -43,6 +43,9 @@ def convert_cifar100(directory, output_directory,
     input_file = os.path.join(directory, 'cifar-100-python.tar.gz')
     tar_file = tarfile.open(input_file, 'r:gz')
 
+    # Unlike CIFAR-10, each split is pickled as a single array, so the
+    # features are written straight from reshaped views of the unpickled
+    # arrays and nothing is concatenated
     file = tar_file.extractfile('cifar-100-python/train')
     try:
         if six.PY3:
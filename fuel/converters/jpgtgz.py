@@ -14,23 +14,20 @@ the "target" column is copied as (target,1)
 if there is no match then (0,0) is copied
 into the "targets" source
 """
+import hashlib
+import io
 import os
-import tarfile
-import tempfile
-import shutil
-from collections import namedtuple, OrderedDict
+from collections import OrderedDict
 
 import h5py
 import numpy
 import pandas as pd
-from scipy.io import loadmat
-from six import iteritems
-from six.moves import range, zip
+from six.moves import zip
 from PIL import Image
 
-from fuel.converters.base import fill_hdf5_file, check_exists, progress_bar
+from fuel.converters.base import check_exists, progress_bar, parallel_map
 from fuel.datasets import H5PYDataset
-import hashlib
+from fuel.utils.formats import iter_archive
 
 FORMAT_1_FILES = ['{}.tar.gz'.format(s) for s in ['train', 'test']]
 TARGET_FILES = ['{}.target.csv'.format(s) for s in ['train', 'test']]
@@ -42,7 +39,9 @@ def convert_jpgtgz(target, onlytarget, directory, output_directory,
                  output_filename=None):
     """Converts jpg tar.gz dataset to HDF5.
 
-    Converts a jpg tar.gz dataset to an HDF5 dataset.
+    Converts a jpg tar.gz dataset to an HDF5 dataset. The archives are
+    read in a single pass without being extracted, and the images are
+    decoded in worker threads as they are read.
 
     Parameters
     ----------
@@ -77,8 +76,6 @@ def convert_jpgtgz(target, onlytarget, directory, output_directory,
     output_path = os.path.join(output_directory, output_filename)
     h5file = h5py.File(output_path, mode='w')
     try:
-        TMPDIR = tempfile.mkdtemp()
-
         sources = ('features','targets') if dotarget else ('features',)
         source_dtypes = dict([(source, 'uint8') for source in sources])
         source_axis_labels = {
@@ -113,166 +110,148 @@ def convert_jpgtgz(target, onlytarget, directory, output_directory,
                 mask = 0
             return target, mask
 
+        def is_jpg(name):
+            return (name.endswith('.jpg') and
+                    not os.path.basename(name).startswith('.'))
 
-        # We first extract the data files in a temporary directory. While doing
-        # that, we also count the number of examples for each split. Files are
-        # extracted individually, which allows to display a progress bar. Since
-        # the splits will be concatenated in the HDF5 file, we also compute the
-        # start and stop intervals of each split within the concatenated array.
-        checksums = set([])
-        def extract_tar(split):
-            num_examples = 0
+        # The images are read straight from the archive (or directory) of
+        # each split, without extracting them.
+        def iter_images(split, bar):
             path = file_paths[split]
             if os.path.isfile(path):
-                with tarfile.open(path, 'r:gz') as f:
-                    members = f.getmembers()
-                    progress_bar_context = progress_bar(
-                        name='{} file'.format(split), maxval=len(members),
-                        prefix='Extracting')
-                    with progress_bar_context as bar:
-                        for i, member in enumerate(members):
-                            if ((member.name.endswith('.jpg') and not
-                            os.path.basename(member.name).startswith('.'))):
-                                f.extract(member, path=os.path.join(TMPDIR,split))
-                                num_examples += 1
-                            bar.update(i)
-                DIR = TMPDIR
-            elif os.path.isdir(path):
-                print("reading DIRECTORY %s"%path)
-                DIR = path
-                for root, dirs, files in os.walk(path):
-                    for file in files:
-                        if file.endswith('.jpg') and not file.startswith('.'):
-                            num_examples += 1
+                with open(path, 'rb') as archive:
+                    for member in iter_archive(archive, is_jpg):
+                        yield member
+                        bar.update(archive.tell())
             else:
-                print("No file or directory named %s"%path)
-                return [], None
-            print('#files=%d'%num_examples)
-
-            jpgfiles = []
-            progress_bar_context = progress_bar(
-                name='{} file'.format(split), maxval=num_examples,
-                prefix='Validating')
-            num_examples = 0
-            bad_examples = 0
-            duplicate_examples = 0
-            count = 0
-            errors = 0
-            shape = None  # all images must have the same shape
-            with progress_bar_context as bar:
-                for root, dirs, files in os.walk(os.path.join(DIR,split)):
+                count = 0
+                for root, dirs, files in os.walk(os.path.join(path, split)):
                     for file in files:
-                        if file.endswith('.jpg') and not file.startswith('.'):
+                        if is_jpg(file):
                             image_path = os.path.join(root, file)
+                            with open(image_path, 'rb') as f:
+                                yield image_path, f.read()
                             count += 1
-                            try:
-                                im = Image.open(image_path)
-                                im = numpy.asarray(im)
-                                m = hashlib.md5()
-                                m.update(im)
-                                h = m.hexdigest()
-
-                                if shape is None:
-                                    shape = im.shape
-                                if im.shape != shape:
-                                    bad_examples += 1
-                                    os.remove(image_path)
-                                elif h  in checksums:
-                                    duplicate_examples += 1
-                                    os.remove(image_path)
-                                else:
-                                    checksums.add(h)
-                                    num_examples += 1
-                                    jpgfiles.append(image_path)
-                            except:
-                                errors += 1
                             bar.update(count)
-            print('count=%d bad=%d dup=%d good=%d errors=%d'%(
-                count, bad_examples, duplicate_examples,
-                num_examples, errors))
-
-            if onlytarget:
-                jpgfiles = filter(lambda x: get_target(image_path, split)[1],
-                                  jpgfiles)
-            return jpgfiles, shape
-
-        examples_per_split = OrderedDict(
-            [(split, extract_tar(split)) for split in splits])
-        cumulative_num_examples = numpy.cumsum(
-            [0] + list(map(lambda x: len(x[0]),examples_per_split.values())))
-        num_examples = cumulative_num_examples[-1]
-        intervals = zip(cumulative_num_examples[:-1],
-                        cumulative_num_examples[1:])
-        split_intervals = dict(zip(splits, intervals))
-
-        # The start and stop indices are used to create a split dict that will
-        # be parsed into the split array required by the H5PYDataset interface.
-        # The split dict is organized as follows:
-        #
-        #     dict(split -> dict(source -> (start, stop)))
-        #
-        split_dict = OrderedDict([
-            (split, OrderedDict([(s, split_intervals[split])
-                                 for s in sources]))
-            for split in splits])
-        h5file.attrs['split'] = H5PYDataset.create_split_array(split_dict)
 
-        # We then prepare the HDF5 dataset. This involves creating datasets to
-        # store data sources and datasets to store auxiliary information
-        # (namely the shapes for variable-length axes, and labels to indicate
-        # what these variable-length axes represent).
-        def make_vlen_dataset(source, shape):
+        def decode(member):
+            name, data = member
+            try:
+                im = numpy.asarray(Image.open(io.BytesIO(data)))
+            except:
+                return name, None, None
+            m = hashlib.md5()
+            m.update(im)
+            return name, im, m.hexdigest()
+
+        # We then prepare the HDF5 dataset. Since the number of examples is
+        # only known once all the images were read, the datasets are
+        # resizable and created once the shape of the first image is known.
+        def make_dataset(source, shape):
             dtype = source_dtypes[source]
-            shape = (num_examples,)+shape
             print("creating %s %s %s"%(source,str(shape),str(dtype)))
             dataset = h5file.create_dataset(
-                source, shape, dtype=dtype)
+                source, (0,) + shape, maxshape=(None,) + shape, dtype=dtype)
             # Tag fixed-length axis with its label
             dataset.dims[0].label = 'batch'
             for i, label in enumerate(source_axis_labels[source]):
                 dataset.dims[i+1].label = label
 
-        shapes = filter(None,map(lambda x: x[1],examples_per_split.values()))
-        assert len(set(shapes)) == 1, "splits have different image size %s"%shapes
-        print('Images shape %s'%str(shapes[0]))
-
-        source_shape = {'features':shapes[0], 'targets':(target_dim,)}
+        # Each image is validated and written in a single pass: all images
+        # must have the same shape as the first one, and each image may
+        # appear only once (no duplicated samples and no overlap between
+        # train and test). The splits are concatenated in the HDF5 file, so
+        # we also compute the start and stop intervals of each split.
+        checksums = set([])
+        split_intervals = OrderedDict()
+        state = {'num_examples': 0, 'capacity': 0, 'shape': None}
 
-        for source in sources:
-            make_vlen_dataset(source, source_shape[source])
+        def resize(num_examples):
+            for source in sources:
+                if source in h5file:
+                    h5file[source].resize(num_examples, axis=0)
+            state['capacity'] = num_examples
 
-        # The final step is to fill the HDF5 file.
-        def fill_split(split, bar=None):
-            print(split)
+        def fill_split(split):
+            path = file_paths[split]
+            start = state['num_examples']
+            if os.path.isfile(path):
+                maxval = os.path.getsize(path)
+            elif os.path.isdir(path):
+                print("reading DIRECTORY %s"%path)
+                maxval = sum(1 for root, dirs, files in
+                             os.walk(os.path.join(path, split))
+                             for file in files if is_jpg(file))
+            else:
+                print("No file or directory named %s"%path)
+                split_intervals[split] = (start, start)
+                return
 
+            count = bad_examples = duplicate_examples = errors = 0
             image_count = target_count = 0
-            for image_number, image_path in enumerate(examples_per_split[split][0]):
-                image = numpy.asarray(Image.open(image_path))
-                index = image_number + split_intervals[split][0]
-
-                h5file['features'][index] = image
-                image_count += 1
-
-                target, mask = get_target(image_path, split)
-
-                if dotarget:
-                    if onlytarget:
-                        h5file['targets'][index] = numpy.array([target,])
-                    else:
-                        h5file['targets'][index] = numpy.array([target,mask])
-                target_count += mask
-
-                if image_number % 1000 == 0:
-                    h5file.flush()
-                if bar:
-                    bar.update(index)
+            with progress_bar('{} file'.format(split), maxval) as bar:
+                for name, im, h in parallel_map(decode,
+                                                iter_images(split, bar)):
+                    count += 1
+                    if im is None:
+                        errors += 1
+                        continue
+                    if state['shape'] is None:
+                        state['shape'] = im.shape
+                        print('Images shape %s'%str(im.shape))
+                        make_dataset('features', im.shape)
+                        if dotarget:
+                            make_dataset('targets', (target_dim,))
+                    if im.shape != state['shape']:
+                        bad_examples += 1
+                        continue
+                    if h in checksums:
+                        duplicate_examples += 1
+                        continue
+                    target, mask = get_target(name, split)
+                    if onlytarget and not mask:
+                        continue
+                    checksums.add(h)
+
+                    index = state['num_examples']
+                    state['num_examples'] += 1
+                    # The datasets grow geometrically, and are trimmed once
+                    # the split is read
+                    if index >= state['capacity']:
+                        resize(max(2 * state['capacity'], index + 1))
+                    h5file['features'][index] = im
+                    image_count += 1
+                    if dotarget:
+                        if onlytarget:
+                            h5file['targets'][index] = numpy.array([target,])
+                        else:
+                            h5file['targets'][index] = numpy.array([target,mask])
+                    target_count += mask
+
+                    if image_count % 1000 == 0:
+                        h5file.flush()
+            resize(state['num_examples'])
+            print('count=%d bad=%d dup=%d good=%d errors=%d'%(
+                count, bad_examples, duplicate_examples,
+                image_count, errors))
             print('# targets %d out of %d'%(target_count, image_count))
-        with progress_bar('jpgtgz', num_examples) as bar:
-            for split in splits:
-                fill_split(split, bar=bar)
+            split_intervals[split] = (start, state['num_examples'])
+
+        for split in splits:
+            fill_split(split)
+
+        # The start and stop indices are used to create a split dict that will
+        # be parsed into the split array required by the H5PYDataset interface.
+        # The split dict is organized as follows:
+        #
+        #     dict(split -> dict(source -> (start, stop)))
+        #
+        split_dict = OrderedDict([
+            (split, OrderedDict([(s, split_intervals[split])
+                                 for s in sources]))
+            for split in splits])
+        h5file.attrs['split'] = H5PYDataset.create_split_array(split_dict)
     finally:
-        if os.path.isdir(TMPDIR):
-            shutil.rmtree(TMPDIR)
         h5file.flush()
         h5file.close()
 
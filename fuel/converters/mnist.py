@@ -5,7 +5,7 @@ import struct
 import h5py
 import numpy
 
-from fuel.converters.base import fill_hdf5_file, check_exists
+from fuel.converters.base import fill_hdf5_file, check_exists, read_array
 
 MNIST_IMAGE_MAGIC = 2051
 MNIST_LABEL_MAGIC = 2049
@@ -138,27 +138,38 @@ def read_mnist_images(filename, dtype=None):
     original unsigned byte representation equal to 1.0.
 
     """
-    with gzip.open(filename, 'rb') as f:
-        magic, number, rows, cols = struct.unpack('>iiii', f.read(16))
-        if magic != MNIST_IMAGE_MAGIC:
-            raise ValueError("Wrong magic number reading MNIST image file")
-        array = numpy.frombuffer(f.read(), dtype='uint8')
-        array = array.reshape((number, 1, rows, cols))
+    convert = None
     if dtype:
         dtype = numpy.dtype(dtype)
 
         if dtype.kind == 'b':
             # If the user wants Booleans, threshold at half the range.
-            array = array >= 128
+            convert = _threshold
         elif dtype.kind == 'f':
             # Otherwise, just convert.
-            array = array.astype(dtype)
-            array /= 255.
+            convert = _scale
         else:
             raise ValueError("Unknown dtype to convert MNIST to")
+    with gzip.open(filename, 'rb') as f:
+        magic, number, rows, cols = struct.unpack('>iiii', f.read(16))
+        if magic != MNIST_IMAGE_MAGIC:
+            raise ValueError("Wrong magic number reading MNIST image file")
+        # The images are converted as they are decompressed, so that only
+        # the converted array is held in memory
+        array = read_array(f, (number, 1, rows, cols), 'uint8', dtype,
+                           convert)
     return array
 
 
+def _threshold(piece, out):
+    numpy.greater_equal(piece, 128, out=out)
+
+
+def _scale(piece, out):
+    out[...] = piece
+    out /= 255.
+
+
 def read_mnist_labels(filename):
     """Read MNIST labels from the original ubyte file format.
 
@@ -175,9 +186,8 @@ def read_mnist_labels(filename):
 
     """
     with gzip.open(filename, 'rb') as f:
-        magic, _ = struct.unpack('>ii', f.read(8))
+        magic, number = struct.unpack('>ii', f.read(8))
         if magic != MNIST_LABEL_MAGIC:
             raise ValueError("Wrong magic number reading MNIST label file")
-        array = numpy.frombuffer(f.read(), dtype='uint8')
-    array = array.reshape(array.size, 1)
+        array = read_array(f, (number, 1), 'uint8')
     return array
@@ -1,7 +1,6 @@
+import io
 import os
-import tarfile
 import tempfile
-import shutil
 from collections import namedtuple, OrderedDict
 
 import h5py
@@ -11,8 +10,10 @@ from six import iteritems
 from six.moves import range, zip
 from PIL import Image
 
-from fuel.converters.base import fill_hdf5_file, check_exists, progress_bar
+from fuel.converters.base import (fill_hdf5_file, check_exists,
+                                  progress_bar, parallel_map)
 from fuel.datasets import H5PYDataset
+from fuel.utils.formats import iter_archive
 
 
 FORMAT_1_FILES = ['{}.tar.gz'.format(s) for s in ['train', 'test', 'extra']]
@@ -32,6 +33,10 @@ def convert_svhn_format_1(directory, output_directory,
 
     .. [SVHNSITE] http://ufldl.stanford.edu/housenumbers/
 
+    The archives are read in a single pass, without extracting them:
+    images are decoded in worker threads as they are read, and only the
+    small `digitStruct.mat` file is written to a temporary file.
+
     Parameters
     ----------
     directory : str
@@ -50,7 +55,6 @@ def convert_svhn_format_1(directory, output_directory,
     try:
         output_path = os.path.join(output_directory, output_filename)
         h5file = h5py.File(output_path, mode='w')
-        TMPDIR = tempfile.mkdtemp()
 
         # Every image has three channels (RGB) and variable height and width.
         # It features a variable number of bounding boxes that identify the
@@ -83,63 +87,23 @@ def convert_svhn_format_1(directory, output_directory,
         file_paths = dict(zip(splits, FORMAT_1_FILES))
         for split, path in file_paths.items():
             file_paths[split] = os.path.join(directory, path)
-        digit_struct_paths = dict(
-            [(split, os.path.join(TMPDIR, split, 'digitStruct.mat'))
-             for split in splits])
-
-        # We first extract the data files in a temporary directory. While doing
-        # that, we also count the number of examples for each split. Files are
-        # extracted individually, which allows to display a progress bar. Since
-        # the splits will be concatenated in the HDF5 file, we also compute the
-        # start and stop intervals of each split within the concatenated array.
-        def extract_tar(split):
-            with tarfile.open(file_paths[split], 'r:gz') as f:
-                members = f.getmembers()
-                num_examples = sum(1 for m in members if '.png' in m.name)
-                progress_bar_context = progress_bar(
-                    name='{} file'.format(split), maxval=len(members),
-                    prefix='Extracting')
-                with progress_bar_context as bar:
-                    for i, member in enumerate(members):
-                        f.extract(member, path=TMPDIR)
-                        bar.update(i)
-            return num_examples
-
-        examples_per_split = OrderedDict(
-            [(split, extract_tar(split)) for split in splits])
-        cumulative_num_examples = numpy.cumsum(
-            [0] + list(examples_per_split.values()))
-        num_examples = cumulative_num_examples[-1]
-        intervals = zip(cumulative_num_examples[:-1],
-                        cumulative_num_examples[1:])
-        split_intervals = dict(zip(splits, intervals))
-
-        # The start and stop indices are used to create a split dict that will
-        # be parsed into the split array required by the H5PYDataset interface.
-        # The split dict is organized as follows:
-        #
-        #     dict(split -> dict(source -> (start, stop)))
-        #
-        split_dict = OrderedDict([
-            (split, OrderedDict([(s, split_intervals[split])
-                                 for s in sources]))
-            for split in splits])
-        h5file.attrs['split'] = H5PYDataset.create_split_array(split_dict)
 
         # We then prepare the HDF5 dataset. This involves creating datasets to
         # store data sources and datasets to store auxiliary information
         # (namely the shapes for variable-length axes, and labels to indicate
-        # what these variable-length axes represent).
+        # what these variable-length axes represent). Since the number of
+        # examples is only known once the archives are read, the datasets
+        # are resizable.
         def make_vlen_dataset(source):
             # Create a variable-length 1D dataset
             dtype = h5py.special_dtype(vlen=numpy.dtype(source_dtypes[source]))
             dataset = h5file.create_dataset(
-                source, (num_examples,), dtype=dtype)
+                source, (0,), maxshape=(None,), dtype=dtype)
             # Create a dataset to store variable-length shapes.
             axis_labels = source_axis_labels[source]
             dataset_shapes = h5file.create_dataset(
-                '{}_shapes'.format(source), (num_examples, len(axis_labels)),
-                dtype='uint16')
+                '{}_shapes'.format(source), (0, len(axis_labels)),
+                maxshape=(None, len(axis_labels)), dtype='uint16')
             # Create a dataset to store labels for variable-length axes.
             dataset_vlen_axis_labels = h5file.create_dataset(
                 '{}_vlen_axis_labels'.format(source), (len(axis_labels),),
@@ -158,6 +122,11 @@ def convert_svhn_format_1(directory, output_directory,
             # Tag fixed-length axis with its label
             dataset.dims[0].label = 'batch'
 
+        def resize(sources, num_examples):
+            for source in sources:
+                h5file[source].resize((num_examples,))
+                h5file[source].dims[0]['shapes'].resize(num_examples, axis=0)
+
         for source in sources:
             make_vlen_dataset(source)
 
@@ -165,13 +134,12 @@ def convert_svhn_format_1(directory, output_directory,
         # information contained in 'digitStruct.mat'. This is a version 7.3
         # Matlab file, which uses HDF5 under the hood, albeit with a very
         # convoluted layout.
-        def get_boxes(split):
+        def get_boxes(split, digit_struct_path, num_examples):
             boxes = []
-            with h5py.File(digit_struct_paths[split], 'r') as f:
+            with h5py.File(digit_struct_path, 'r') as f:
                 bar_name = '{} digitStruct'.format(split)
-                bar_maxval = examples_per_split[split]
-                with progress_bar(bar_name, bar_maxval) as bar:
-                    for image_number in range(examples_per_split[split]):
+                with progress_bar(bar_name, num_examples) as bar:
+                    for image_number in range(num_examples):
                         # The 'digitStruct' group is the main group of the HDF5
                         # file. It contains two datasets: 'bbox' and 'name'.
                         # The 'name' dataset isn't of interest to us, as it
@@ -219,44 +187,89 @@ def convert_svhn_format_1(directory, output_directory,
                             bar.update(image_number)
             return boxes
 
-        split_boxes = dict([(split, get_boxes(split)) for split in splits])
-
-        # The final step is to fill the HDF5 file.
-        def fill_split(split, bar=None):
-            for image_number in range(examples_per_split[split]):
-                image_path = os.path.join(
-                    TMPDIR, split, '{}.png'.format(image_number + 1))
+        def decode(member):
+            name, data = member
+            if name.endswith('.png'):
                 image = numpy.asarray(
-                    Image.open(image_path)).transpose(2, 0, 1)
-                bounding_boxes = split_boxes[split][image_number]
+                    Image.open(io.BytesIO(data))).transpose(2, 0, 1)
+                return name, image
+            return name, data
+
+        # The images of each split are streamed from its archive and
+        # written as they are decoded. The bounding boxes are filled in
+        # once 'digitStruct.mat', wherever it is in the archive, was read.
+        def fill_split(split, start):
+            num_examples = 0
+            capacity = 0
+            digit_struct = None
+            path = file_paths[split]
+            with open(path, 'rb') as archive:
+                members = iter_archive(archive, lambda name: (
+                    name.endswith('.png') or
+                    os.path.basename(name) == 'digitStruct.mat'))
+                with progress_bar('{} file'.format(split),
+                                  os.path.getsize(path)) as bar:
+                    for name, data in parallel_map(decode, members):
+                        if not name.endswith('.png'):
+                            digit_struct = data
+                            continue
+                        image_number = int(os.path.basename(name)[:-4]) - 1
+                        index = start + image_number
+                        if index >= capacity:
+                            capacity = max(2 * capacity, index + 1)
+                            resize(sources[:1], capacity)
+                        h5file['features'][index] = data.flatten()
+                        h5file['features'].dims[0]['shapes'][index] = \
+                            data.shape
+                        num_examples = max(num_examples, image_number + 1)
+                        bar.update(archive.tell())
+            stop = start + num_examples
+            resize(sources, stop)
+            if digit_struct is None:
+                raise ValueError('no digitStruct.mat in {}'.format(path))
+
+            # h5py can't open files in memory, so the bounding boxes are
+            # read from a temporary copy of 'digitStruct.mat'.
+            with tempfile.NamedTemporaryFile(suffix='.mat',
+                                             delete=False) as f:
+                f.write(digit_struct)
+            try:
+                boxes = get_boxes(split, f.name, num_examples)
+            finally:
+                os.remove(f.name)
+            for image_number, bounding_boxes in enumerate(boxes):
                 num_boxes = len(bounding_boxes.labels)
-                index = image_number + split_intervals[split][0]
-
-                h5file['features'][index] = image.flatten()
-                h5file['features'].dims[0]['shapes'][index] = image.shape
+                index = image_number + start
                 for field in BoundingBoxes._fields:
                     name = 'bbox_{}'.format(field)
-                    h5file[name][index] = numpy.maximum(0,
-                                                        getattr(bounding_boxes,
-                                                                field))
+                    values = numpy.maximum(0, getattr(bounding_boxes, field))
+                    if field == 'labels':
+                        # Replace label '10' with '0'.
+                        values[values == 10] = 0
+                    h5file[name][index] = values
                     h5file[name].dims[0]['shapes'][index] = [num_boxes, 1]
+            h5file.flush()
+            return stop
 
-                # Replace label '10' with '0'.
-                labels = h5file['bbox_labels'][index]
-                labels[labels == 10] = 0
-                h5file['bbox_labels'][index] = labels
+        split_intervals = OrderedDict()
+        start = 0
+        for split in splits:
+            stop = fill_split(split, start)
+            split_intervals[split] = (start, stop)
+            start = stop
 
-                if image_number % 1000 == 0:
-                    h5file.flush()
-                if bar:
-                    bar.update(index)
-
-        with progress_bar('SVHN format 1', num_examples) as bar:
-            for split in splits:
-                fill_split(split, bar=bar)
+        # The start and stop indices are used to create a split dict that will
+        # be parsed into the split array required by the H5PYDataset interface.
+        # The split dict is organized as follows:
+        #
+        #     dict(split -> dict(source -> (start, stop)))
+        #
+        split_dict = OrderedDict([
+            (split, OrderedDict([(s, split_intervals[split])
+                                 for s in sources]))
+            for split in splits])
+        h5file.attrs['split'] = H5PYDataset.create_split_array(split_dict)
     finally:
-        if os.path.isdir(TMPDIR):
-            shutil.rmtree(TMPDIR)
         h5file.flush()
         h5file.close()
 
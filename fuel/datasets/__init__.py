@@ -1,17 +1,30 @@
-# flake8: noqa
-from fuel.datasets.base import (Dataset, IterableDataset,
-                                IndexableDataset)
+"""Built-in datasets and the base dataset classes.
 
-from fuel.datasets.hdf5 import H5PYDataset
-from fuel.datasets.adult import Adult
-from fuel.datasets.binarized_mnist import BinarizedMNIST
-from fuel.datasets.celeba import CelebA
-from fuel.datasets.cifar10 import CIFAR10
-from fuel.datasets.cifar100 import CIFAR100
-from fuel.datasets.caltech101_silhouettes import CalTech101Silhouettes
-from fuel.datasets.dogs_vs_cats import DogsVsCats
-from fuel.datasets.iris import Iris
-from fuel.datasets.mnist import MNIST
-from fuel.datasets.svhn import SVHN
-from fuel.datasets.text import TextFile
-from fuel.datasets.billion import OneBillionWord
+Datasets are imported when they are first accessed, so that importing
+this package doesn't import the dependencies of every dataset.
+
+"""
+from fuel.utils import lazy_module_attributes
+
+_datasets = {
+    'Dataset': 'fuel.datasets.base',
+    'IterableDataset': 'fuel.datasets.base',
+    'IndexableDataset': 'fuel.datasets.base',
+    'H5PYDataset': 'fuel.datasets.hdf5',
+    'Adult': 'fuel.datasets.adult',
+    'BinarizedMNIST': 'fuel.datasets.binarized_mnist',
+    'CelebA': 'fuel.datasets.celeba',
+    'CIFAR10': 'fuel.datasets.cifar10',
+    'CIFAR100': 'fuel.datasets.cifar100',
+    'CalTech101Silhouettes': 'fuel.datasets.caltech101_silhouettes',
+    'DogsVsCats': 'fuel.datasets.dogs_vs_cats',
+    'Iris': 'fuel.datasets.iris',
+    'MNIST': 'fuel.datasets.mnist',
+    'SVHN': 'fuel.datasets.svhn',
+    'TextFile': 'fuel.datasets.text',
+    'TokenizedCorpus': 'fuel.datasets.text',
+    'OneBillionWord': 'fuel.datasets.billion'}
+
+lazy_module_attributes(__name__, dict(
+    [(module.rpartition('.')[2], module) for module in _datasets.values()] +
+    list(_datasets.items())))
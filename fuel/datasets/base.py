@@ -7,7 +7,8 @@ from picklable_itertools import iter_, izip
 
 from fuel.schemes import SequentialExampleScheme
 from fuel.streams import DataStream
-from fuel.utils import Subset
+from fuel.transformers import fuse
+from fuel.utils import Subset, shard_slice
 
 
 @add_metaclass(ABCMeta)
@@ -88,11 +89,18 @@ class Dataset(object):
         stream : :class:`~.streams.AbstractDataStream`
             A data stream.
 
+        Notes
+        -----
+        Adjacent elementwise transformers, such as the scaling and casting
+        of :func:`~.transformers.defaults.uint8_pixels_to_floatX`, are
+        fused so that each batch is processed in a single pass. See
+        :func:`~.transformers.fuse`.
+
         """
         for (cls, args, kwargs) in self.default_transformers:
             args = [stream] + args
             stream = cls(*args, **kwargs)
-        return stream
+        return fuse(stream)
 
     @property
     def example_iteration_scheme(self):
@@ -325,6 +333,10 @@ class IndexableDataset(Dataset):
         indexables providing data, and its keys strings that are used as
         source names. If a single indexable is given, it will be given the
         source ``data``.
+    shard : tuple of int, optional
+        A ``(rank, world_size)`` pair. If given, only the `rank`-th of
+        `world_size` equally-sized contiguous shards of the indexables is
+        provided. See :func:`.shard_slice`.
 
     Attributes
     ----------
@@ -342,7 +354,8 @@ class IndexableDataset(Dataset):
     provide easy access to the data.
 
     """
-    def __init__(self, indexables, start=None, stop=None, **kwargs):
+    def __init__(self, indexables, start=None, stop=None, shard=None,
+                 **kwargs):
         if isinstance(indexables, dict):
             self.provides_sources = tuple(indexables.keys())
         else:
@@ -356,6 +369,10 @@ class IndexableDataset(Dataset):
                 raise ValueError("sources have different lengths")
         else:
             self.indexables = [indexables]
+        if shard is not None:
+            shard = shard_slice(len(self.indexables[0]), *shard)
+            self.indexables = [indexable[shard]
+                               for indexable in self.indexables]
 
         self.example_iteration_scheme = SequentialExampleScheme(
             self.num_examples)
@@ -373,9 +390,10 @@ class IndexableDataset(Dataset):
     # Without explicitly defining a trivial __setstate__ method,
     # the __getattribute__ method would call the __getattr__ method,
     # which would raise an AttributeError. This causes problems
-    # when unpickling.
+    # when unpickling. The state is copied, since :func:`copy.copy`
+    # passes the original's ``__dict__``.
     def __setstate__(self, dict):
-        self.__dict__ = dict
+        self.__dict__.update(dict)
 
     @property
     def num_examples(self):
@@ -38,6 +38,13 @@ class OneBillionWord(TextFile):
 
     See :class:`TextFile` for remaining keyword arguments.
 
+    Notes
+    -----
+    This dataset tokenizes the raw text every epoch and can only be
+    iterated over sequentially. ``fuel-convert billion`` tokenizes the
+    partitions once into a file that can be read with
+    :class:`.TokenizedCorpus`, which supports random access.
+
     """
     def __init__(self, which_set, which_partitions, dictionary, **kwargs):
         if which_set not in ('training', 'heldout'):
@@ -1,6 +1,8 @@
 import numbers
+import os
+import threading
 from itertools import product
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
 import h5py
 import numpy
@@ -8,12 +10,13 @@ import six
 import tables
 from six.moves import zip, range
 
+from fuel import config
 from fuel.datasets import Dataset
-from fuel.utils import do_not_pickle_attributes, Subset
+from fuel.utils import do_not_pickle_attributes, Subset, shard_slice
 from fuel.schemes import SequentialExampleScheme
 
 
-@do_not_pickle_attributes('nodes', 'h5file')
+@do_not_pickle_attributes('nodes', 'h5file', 'row_cache')
 class PytablesDataset(Dataset):
     """A pytables dataset.
 
@@ -38,13 +41,25 @@ class PytablesDataset(Dataset):
         Names of nodes in HDF5 file which contain sources. Should the same
         length as `sources`.
         Optional, if not set will be equal to `sources`.
+    cache_size : int
+        The number of rows to keep in a least-recently-used cache for
+        integer and list requests. Optional, by default rows aren't
+        cached.
+
+    Notes
+    -----
+    List requests are read in sorted order, with runs of consecutive rows
+    coalesced into slice reads, and the result is reordered to match the
+    request. This makes random access (e.g. with a
+    :class:`.ShuffledScheme`) practical.
 
     """
     def __init__(self, path, sources, start=0, stop=None, data_node='Data',
-                 sources_in_file=None):
+                 sources_in_file=None, cache_size=0):
         if sources_in_file is None:
             sources_in_file = sources
         self.sources_in_file = sources_in_file
+        self.cache_size = cache_size
         self.provides_sources = sources
         self.path = path
         self.data_node = data_node
@@ -62,6 +77,7 @@ class PytablesDataset(Dataset):
         if self.stop is None:
             self.stop = self.nodes[0].nrows
         self.num_examples = self.stop - self.start
+        self.row_cache = OrderedDict()
 
     def load(self):
         self.open_file(self.path)
@@ -70,6 +86,7 @@ class PytablesDataset(Dataset):
         self.h5file.close()
         del self._h5file
         del self._nodes
+        del self._row_cache
 
     def get_data(self, state=None, request=None):
         """ Returns data from HDF5 dataset.
@@ -78,19 +95,250 @@ class PytablesDataset(Dataset):
 
         """
         if isinstance(request, slice):
-            request = slice(request.start + self.start,
-                            request.stop + self.start, request.step)
+            start, stop, step = request.indices(self.num_examples)
+            request = slice(start + self.start, stop + self.start, step)
             data = [node[request] for node in self.nodes]
-        elif isinstance(request, list):
-            request = [index + self.start for index in request]
-            data = [node[request, ...] for node in self.nodes]
+        elif (isinstance(request, numbers.Integral) and
+                not isinstance(request, bool)):
+            data = [source_data[0] for source_data in
+                    self._get_rows(numpy.array([request]))]
+        elif isinstance(request, (list, numpy.ndarray)):
+            data = self._get_rows(numpy.asarray(request, dtype=numpy.int64))
         else:
             raise ValueError
         return data
 
+    def _get_rows(self, request):
+        """Reads a list of rows, in any order."""
+        if request.ndim != 1:
+            raise ValueError("requests must be 1-dimensional")
+        if len(request) and (request.min() < 0 or
+                             request.max() >= self.num_examples):
+            raise IndexError("request out of range")
+        rows, inverse = numpy.unique(request + self.start,
+                                     return_inverse=True)
+        if not self.cache_size:
+            return [source_data[inverse]
+                    for source_data in self._read_rows(rows)]
+
+        cached = numpy.array([row in self.row_cache for row in rows.tolist()],
+                             dtype=bool)
+        missing = rows[~cached]
+        data = [numpy.empty((len(rows),) + node.shape[1:], dtype=node.dtype)
+                for node in self.nodes]
+        for source_data, read in zip(data, self._read_rows(missing)):
+            source_data[~cached] = read
+        for i in numpy.flatnonzero(cached):
+            row = int(rows[i])
+            # Mark the row as recently used
+            self.row_cache[row] = self.row_cache.pop(row)
+            for source_data, cached_row in zip(data, self.row_cache[row]):
+                source_data[i] = cached_row
+        for i in numpy.flatnonzero(~cached):
+            self.row_cache[int(rows[i])] = tuple(
+                source_data[i].copy() for source_data in data)
+        while len(self.row_cache) > self.cache_size:
+            self.row_cache.popitem(last=False)
+        return [source_data[inverse] for source_data in data]
+
+    def _read_rows(self, rows):
+        """Reads sorted rows, one slice per run of consecutive rows.
+
+        Isolated rows are gathered with a single point selection instead.
+
+        """
+        breaks = numpy.flatnonzero(numpy.diff(rows) != 1) + 1
+        if len(rows):
+            starts = numpy.append(0, breaks)
+            stops = numpy.append(breaks, len(rows))
+        else:
+            starts = stops = breaks
+        is_run = stops - starts > 1
+        isolated = numpy.ones(len(rows), dtype=bool)
+        for start, stop in zip(starts[is_run], stops[is_run]):
+            isolated[start:stop] = False
+        data = []
+        for node in self.nodes:
+            source_data = numpy.empty((len(rows),) + node.shape[1:],
+                                      dtype=node.dtype)
+            for start, stop in zip(starts[is_run], stops[is_run]):
+                source_data[start:stop] = node[rows[start]:rows[stop - 1] + 1]
+            if isolated.any():
+                source_data[isolated] = node[rows[isolated].tolist(), ...]
+            data.append(source_data)
+        return data
+
+
+class FileHandlePool(object):
+    """A pool of shared, read-only HDF5 file handles.
+
+    Handles are reference counted per path, so that all datasets reading
+    the same file share a single handle. The pool can be used from several
+    threads, and is reinitialized in a child process after a fork, where
+    files are reopened on demand.
+
+    Parameters
+    ----------
+    linger : float, optional
+        The number of seconds a handle is kept open after its last user
+        released it, so that e.g. alternating training and validation
+        streams don't reopen the file (and start with a cold chunk cache)
+        every epoch. Defaults to the ``hdf5_handle_linger`` configuration.
+    rdcc_nbytes : int, optional
+        The size in bytes of the HDF5 chunk cache of each handle.
+        Defaults to the ``hdf5_rdcc_nbytes`` configuration.
+    rdcc_nslots : int, optional
+        The number of slots of the HDF5 chunk cache of each handle.
+        Defaults to the ``hdf5_rdcc_nslots`` configuration.
+
+    Notes
+    -----
+    A lingering handle keeps the file open, which prevents it from being
+    opened for writing. Call :meth:`close_all` before modifying a file
+    that was read recently.
+
+    """
+    def __init__(self, linger=None, rdcc_nbytes=None, rdcc_nslots=None):
+        self._linger = linger
+        self._rdcc_nbytes = rdcc_nbytes
+        self._rdcc_nslots = rdcc_nslots
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+        self.handles = {}
+        self.ref_counts = defaultdict(int)
+        self._drivers = {}
+        self._timers = {}
+
+    @property
+    def linger(self):
+        if self._linger is None:
+            return config.hdf5_handle_linger
+        return self._linger
+
+    def _file_kwargs(self):
+        kwargs = {}
+        rdcc_nbytes = (config.hdf5_rdcc_nbytes if self._rdcc_nbytes is None
+                       else self._rdcc_nbytes)
+        rdcc_nslots = (config.hdf5_rdcc_nslots if self._rdcc_nslots is None
+                       else self._rdcc_nslots)
+        # Only passed when set, since older versions of h5py don't
+        # support them
+        if rdcc_nbytes is not None:
+            kwargs['rdcc_nbytes'] = rdcc_nbytes
+        if rdcc_nslots is not None:
+            kwargs['rdcc_nslots'] = rdcc_nslots
+        return kwargs
+
+    def _check_process(self):
+        if os.getpid() != self._pid:
+            # Handles inherited from the parent process can't be used
+            # safely. Keep the reference counts so that files still in use
+            # are reopened on demand.
+            self._lock = threading.RLock()
+            self._pid = os.getpid()
+            self.handles = {}
+            self._timers = {}
+            for path in [path for path, count in self.ref_counts.items()
+                         if not count]:
+                del self.ref_counts[path]
+
+    def acquire(self, path, driver=None):
+        """Opens a file, or reuses the handle already open for it.
+
+        Parameters
+        ----------
+        path : str
+            The path to the HDF5 file.
+        driver : str, optional
+            The low-level driver to open the file with.
+
+        Returns
+        -------
+        :class:`h5py.File`
+            The shared read-only handle.
+
+        """
+        self._check_process()
+        with self._lock:
+            timer = self._timers.pop(path, None)
+            if timer is not None:
+                timer.cancel()
+            self.ref_counts[path] += 1
+            self._drivers[path] = driver
+            try:
+                return self.get(path)
+            except Exception:
+                self.release(path)
+                raise
+
+    def get(self, path):
+        """Returns the handle of a file acquired by this process.
+
+        Raises
+        ------
+        IOError
+            If the file wasn't acquired.
+
+        """
+        self._check_process()
+        with self._lock:
+            if path not in self.handles:
+                if not self.ref_counts.get(path):
+                    raise IOError('no open handle for file {}'.format(path))
+                self.handles[path] = h5py.File(
+                    name=path, mode="r", driver=self._drivers[path],
+                    **self._file_kwargs())
+            return self.handles[path]
+
+    def release(self, path):
+        """Releases a file, closing it once it's no longer used.
+
+        The handle is closed after lingering for :attr:`linger` seconds,
+        unless the file is acquired again in the meantime.
+
+        """
+        self._check_process()
+        with self._lock:
+            if not self.ref_counts.get(path):
+                return
+            self.ref_counts[path] -= 1
+            if self.ref_counts[path]:
+                return
+            linger = self.linger
+            if linger > 0 and path in self.handles:
+                timer = threading.Timer(linger, self._expire, (path,))
+                timer.daemon = True
+                self._timers[path] = timer
+                timer.start()
+            else:
+                self._close(path)
+
+    def _expire(self, path):
+        with self._lock:
+            if (os.getpid() == self._pid and
+                    self._timers.get(path) is threading.current_thread()):
+                del self._timers[path]
+                self._close(path)
+
+    def _close(self, path):
+        del self.ref_counts[path]
+        handle = self.handles.pop(path, None)
+        if handle is not None:
+            handle.close()
+
+    def close_all(self):
+        """Closes all lingering handles immediately."""
+        self._check_process()
+        with self._lock:
+            for path, timer in list(self._timers.items()):
+                timer.cancel()
+                del self._timers[path]
+                self._close(path)
+
 
 @do_not_pickle_attributes('data_sources', 'external_file_handle',
-                          'source_shapes', 'in_memory_subset', 'subsets')
+                          'source_shapes', 'in_memory_subset', 'subsets',
+                          'mapped_sources')
 class H5PYDataset(Dataset):
     """An h5py-fueled HDF5 dataset.
 
@@ -144,6 +392,11 @@ class H5PYDataset(Dataset):
         performance, set this flag to `False`. Note that in that case,
         it is the user's responsibility to make sure that indices are
         ordered.
+    shard : tuple of int, optional
+        A ``(rank, world_size)`` pair. If given, only the `rank`-th of
+        `world_size` equally-sized contiguous shards of the data (after
+        applying `subset`) is used, so that data-parallel workers can each
+        read their own part of the file. See :func:`.shard_slice`.
 
     Attributes
     ----------
@@ -160,14 +413,27 @@ class H5PYDataset(Dataset):
     default_axis_labels : dict mapping string to tuple of strings
         Maps all sources provided by this dataset to their axis labels.
 
+    Notes
+    -----
+    Datasets opened by path share their file handles through a
+    process-wide :class:`FileHandlePool`, whose linger time and chunk
+    cache size are set by the ``hdf5_handle_linger``,
+    ``hdf5_rdcc_nbytes`` and ``hdf5_rdcc_nslots`` configurations.
+
+    When reading out of memory, sources that are stored contiguously and
+    uncompressed are memory-mapped and read directly, bypassing HDF5's
+    selection machinery. Chunked, compressed and variable-length sources
+    are read through h5py.
+
     """
     interface_version = '0.3'
-    _ref_counts = defaultdict(int)
-    _file_handles = {}
+    _handle_pool = FileHandlePool()
+    _metadata_cache = {}
+    _metadata_lock = threading.Lock()
 
     def __init__(self, file_or_path, which_sets, subset=None,
                  load_in_memory=False, driver=None, sort_indices=True,
-                 **kwargs):
+                 shard=None, **kwargs):
         if isinstance(file_or_path, h5py.File):
             self.path = file_or_path.filename
             self.external_file_handle = file_or_path
@@ -181,6 +447,7 @@ class H5PYDataset(Dataset):
             raise ValueError('`which_sets` should be an iterable of strings')
         self.which_sets = which_sets
         self.user_given_subset = subset if subset else slice(None)
+        self.shard = shard
         self.load_in_memory = load_in_memory
         self.driver = driver
         self.sort_indices = sort_indices
@@ -207,9 +474,8 @@ class H5PYDataset(Dataset):
         * `default_axis_labels`
 
         """
-        self._out_of_memory_open()
-        handle = self._file_handle
-        available_splits = self.get_all_splits(handle)
+        metadata = self._get_metadata()
+        available_splits = metadata['splits']
         which_sets = self.which_sets
         provides_sources = None
         for split in which_sets:
@@ -219,15 +485,114 @@ class H5PYDataset(Dataset):
                     "dataset. Available splits are " +
                     "{}.".format(available_splits))
             split_provides_sources = set(
-                self.get_provided_sources(handle, split))
+                metadata['provided_sources'][split])
             if provides_sources:
                 provides_sources &= split_provides_sources
             else:
                 provides_sources = split_provides_sources
         self.provides_sources = tuple(sorted(provides_sources))
-        self.vlen_sources = self.get_vlen_sources(handle)
-        self.default_axis_labels = self.get_axis_labels(handle)
-        self._out_of_memory_close()
+        self.vlen_sources = list(metadata['vlen_sources'])
+        self.default_axis_labels = dict(metadata['axis_labels'])
+
+    def _get_metadata(self):
+        """Returns the metadata of the file, reading it only if needed.
+
+        The metadata of files opened by path is cached for the lifetime
+        of the process, keyed by the file's path and modification time,
+        and shared by all threads.
+        Metadata is always read from external file handles, since the
+        file may be modified through them.
+
+        """
+        key = None
+        if not self.external_file_handle:
+            try:
+                stat = os.stat(self.path)
+                key = (os.path.abspath(self.path), stat.st_mtime,
+                       stat.st_size)
+            except OSError:
+                # e.g. the family driver, whose path is a pattern
+                pass
+        if key is not None:
+            with self._metadata_lock:
+                if key in self._metadata_cache:
+                    return self._metadata_cache[key]
+        self._out_of_memory_open()
+        try:
+            metadata = self.read_metadata(self._file_handle)
+        finally:
+            self._out_of_memory_close()
+        if key is not None:
+            with self._metadata_lock:
+                # Forget the metadata of earlier versions of the file
+                for old_key in [old_key for old_key in self._metadata_cache
+                                if old_key[0] == key[0]]:
+                    del self._metadata_cache[old_key]
+                self._metadata_cache[key] = metadata
+        return metadata
+
+    @staticmethod
+    def read_metadata(h5file):
+        """Reads all split and source metadata of an HDF5 dataset.
+
+        Parameters
+        ----------
+        h5file : HDF5 file handle
+            An HDF5 dataset respecting the H5PYDataset interface.
+
+        Returns
+        -------
+        metadata : dict
+            Contains the names of all splits (``splits``), the sources
+            provided by each split (``provided_sources``), the
+            variable-length sources (``vlen_sources``), the axis labels
+            of each source (``axis_labels``), the arguments of the
+            :class:`~fuel.utils.Subset` of each split/source pair
+            (``subsets``) and the ``(offset, dtype, shape)`` layout of
+            each source that can be memory-mapped (``layouts``).
+
+        """
+        split_array = h5file.attrs['split']
+        splits = numpy.char.decode(split_array['split'], 'utf8')
+        sources = numpy.char.decode(split_array['source'], 'utf8')
+        available = split_array['available'].astype(bool)
+        lengths = dict((source, len(h5file[source]))
+                       for source in set(sources.tolist()))
+        # Only the arguments of the subsets are stored, since e.g. an empty
+        # split isn't a valid subset. The index lists of all splits are
+        # read here, but only once per file since the metadata is cached
+        keys = list(zip(splits.tolist(), sources.tolist()))
+        subsets = dict(
+            (key, (slice(start, stop), lengths[key[1]])) for key, start, stop
+            in zip(keys, split_array['start'].tolist(),
+                   split_array['stop'].tolist()))
+        references = split_array['indices']
+        for i in numpy.flatnonzero(list(map(bool, references))):
+            subsets[keys[i]] = (h5file[references[i]][()].tolist(),
+                                lengths[keys[i][1]])
+        vlen_sources = H5PYDataset.get_vlen_sources(h5file)
+        return {
+            'splits': tuple(set(splits.tolist())),
+            'provided_sources': dict(
+                (split, tuple(sources[(splits == split) & available]
+                              .tolist()))
+                for split in set(splits.tolist())),
+            'vlen_sources': vlen_sources,
+            'axis_labels': H5PYDataset.get_axis_labels(h5file, vlen_sources),
+            'subsets': subsets,
+            'layouts': dict(
+                (source, H5PYDataset._get_layout(h5file[source]))
+                for source in lengths if source not in vlen_sources)}
+
+    @staticmethod
+    def _get_layout(dataset):
+        """Returns the layout of a dataset if it can be memory-mapped."""
+        offset = dataset.id.get_offset()
+        if (offset is None or dataset.chunks is not None or
+                dataset.compression is not None or dataset.dtype.hasobject or
+                not dataset.size):
+            return None
+        return offset, dataset.dtype, dataset.shape
 
     @staticmethod
     def create_split_array(split_dict):
@@ -312,8 +677,8 @@ class H5PYDataset(Dataset):
             Names of all splits in ``h5file``.
 
         """
-        available_splits = tuple(
-            set(row['split'].decode('utf8') for row in h5file.attrs['split']))
+        available_splits = tuple(set(numpy.char.decode(
+            h5file.attrs['split']['split'], 'utf8').tolist()))
         return available_splits
 
     @staticmethod
@@ -331,8 +696,8 @@ class H5PYDataset(Dataset):
             Names of all sources in ``h5file``.
 
         """
-        all_sources = tuple(
-            set(row['source'].decode('utf8') for row in h5file.attrs['split']))
+        all_sources = tuple(set(numpy.char.decode(
+            h5file.attrs['split']['source'], 'utf8').tolist()))
         return all_sources
 
     @staticmethod
@@ -352,9 +717,11 @@ class H5PYDataset(Dataset):
             Names of sources provided by ``split`` in ``h5file``.
 
         """
-        provided_sources = tuple(
-            row['source'].decode('utf8') for row in h5file.attrs['split']
-            if row['split'].decode('utf8') == split and row['available'])
+        split_array = h5file.attrs['split']
+        provided = ((numpy.char.decode(split_array['split'], 'utf8') ==
+                     split) & split_array['available'].astype(bool))
+        provided_sources = tuple(numpy.char.decode(
+            split_array['source'][provided], 'utf8').tolist())
         return provided_sources
 
     @staticmethod
@@ -385,13 +752,17 @@ class H5PYDataset(Dataset):
         return vlen_sources
 
     @staticmethod
-    def get_axis_labels(h5file):
+    def get_axis_labels(h5file, vlen_sources=None):
         """Returns axis labels for all sources in an HDF5 dataset.
 
         Parameters
         ----------
         h5file : HDF5 file handle
             An HDF5 dataset respecting the H5PYDataset interface.
+        vlen_sources : list of str, optional
+            The variable-length sources, as returned by
+            :meth:`get_vlen_sources`. Determined from the file if not
+            given.
 
         Returns
         -------
@@ -401,7 +772,8 @@ class H5PYDataset(Dataset):
 
         """
         axis_labels = {}
-        vlen_sources = H5PYDataset.get_vlen_sources(h5file)
+        if vlen_sources is None:
+            vlen_sources = H5PYDataset.get_vlen_sources(h5file)
         for source_name in H5PYDataset.get_all_sources(h5file):
             if source_name in vlen_sources:
                 axis_labels[source_name] = (
@@ -433,20 +805,25 @@ class H5PYDataset(Dataset):
             the splits/sources combination.
 
         """
-        subsets = [Subset.empty_subset(len(h5file[source_name]))
-                   for source_name in sources]
-        for split in splits:
-            for i, source in enumerate(sources):
-                row, = [r for r in h5file.attrs['split'] if
-                        (r['split'].decode('utf8') == split and
-                         r['source'].decode('utf8') == source)]
-                if row['indices']:
-                    subsets[i] += Subset(
-                        h5file[row['indices']], len(h5file[source]))
-                else:
-                    subsets[i] += Subset(
-                        slice(row['start'], row['stop']), len(h5file[source]))
+        return H5PYDataset._combine_subsets(
+            H5PYDataset.read_metadata(h5file)['subsets'], splits, sources)
 
+    @staticmethod
+    def _combine_subsets(split_subsets, splits, sources):
+        """Merges the subsets of several splits, for each source."""
+        subsets = []
+        for source in sources:
+            subset = None
+            for split in splits:
+                if (split, source) not in split_subsets:
+                    raise ValueError("split '{}' has no source '{}'".format(
+                        split, source))
+                split_subset = Subset(*split_subsets[split, source])
+                if subset is None:
+                    subset = Subset.empty_subset(
+                        split_subset.original_num_examples)
+                subset += split_subset
+            subsets.append(subset)
         return subsets
 
     def load(self):
@@ -458,11 +835,9 @@ class H5PYDataset(Dataset):
         if not hasattr(self, '_external_file_handle'):
             self.external_file_handle = None
 
-        self._out_of_memory_open()
-        handle = self._file_handle
-
         # Infer subsets based on `which_sets`
-        subsets = self.get_subsets(handle, self.which_sets, self.sources)
+        subsets = self._combine_subsets(self._get_metadata()['subsets'],
+                                        self.which_sets, self.sources)
         # Sanity check to make sure that all sources have equal length
         if any(subset.num_examples != subsets[0].num_examples for subset in
                 subsets):
@@ -471,9 +846,16 @@ class H5PYDataset(Dataset):
         # into account.
         self.subsets = [Subset.subset_of(subset, self.user_given_subset)
                         for subset in subsets]
+        if self.shard is not None:
+            self.subsets = [
+                Subset.subset_of(subset, shard_slice(subset.num_examples,
+                                                     *self.shard))
+                for subset in self.subsets]
 
         # Load data sources and source shapes (if requested)
         if self.load_in_memory:
+            self._out_of_memory_open()
+            handle = self._file_handle
             data_sources = []
             source_shapes = []
             for source_name, subset in zip(self.sources, self.subsets):
@@ -492,12 +874,40 @@ class H5PYDataset(Dataset):
             # This exists only for request sanity checking purposes.
             self.in_memory_subset = Subset(
                 slice(None), len(self.data_sources[0]))
+            self._out_of_memory_close()
         else:
             self.data_sources = None
             self.source_shapes = None
             self.in_memory_subset = None
+        self.mapped_sources = self._map_sources()
+
+    def _map_sources(self):
+        """Memory-maps the sources which can be read directly.
+
+        Returns
+        -------
+        tuple
+            A read-only array mapping each source in :attr:`sources`, or
+            `None` for sources which must be read through h5py.
 
-        self._out_of_memory_close()
+        """
+        # In-memory files and drivers which don't lay the file out as-is
+        # on disk can't be mapped
+        if (self.load_in_memory or self.external_file_handle or
+                self.driver not in (None, 'sec2', 'stdio')):
+            return (None,) * len(self.sources)
+        layouts = self._get_metadata()['layouts']
+        mapped_sources = []
+        for source_name in self.sources:
+            layout = layouts.get(source_name)
+            if layout is None:
+                mapped_sources.append(None)
+                continue
+            offset, dtype, shape = layout
+            mapped_sources.append(numpy.asarray(numpy.memmap(
+                self.path, dtype=dtype, mode='r', offset=offset,
+                shape=shape)))
+        return tuple(mapped_sources)
 
     @property
     def num_examples(self):
@@ -508,11 +918,7 @@ class H5PYDataset(Dataset):
 
     def _out_of_memory_open(self):
         if not self.external_file_handle:
-            if self.path not in self._file_handles:
-                handle = h5py.File(
-                    name=self.path, mode="r", driver=self.driver)
-                self._file_handles[self.path] = handle
-            self._ref_counts[self.path] += 1
+            self._handle_pool.acquire(self.path, self.driver)
 
     def close(self, state):
         if not self.load_in_memory:
@@ -520,20 +926,13 @@ class H5PYDataset(Dataset):
 
     def _out_of_memory_close(self):
         if not self.external_file_handle:
-            self._ref_counts[self.path] -= 1
-            if not self._ref_counts[self.path]:
-                del self._ref_counts[self.path]
-                self._file_handles[self.path].close()
-                del self._file_handles[self.path]
+            self._handle_pool.release(self.path)
 
     @property
     def _file_handle(self):
         if self.external_file_handle:
             return self.external_file_handle
-        elif self.path in self._file_handles:
-            return self._file_handles[self.path]
-        else:
-            raise IOError('no open handle for file {}'.format(self.path))
+        return self._handle_pool.get(self.path)
 
     def get_data(self, state=None, request=None):
         if self.load_in_memory:
@@ -565,7 +964,18 @@ class H5PYDataset(Dataset):
         data = []
         shapes = []
         handle = self._file_handle
-        for source_name, subset in zip(self.sources, self.subsets):
+        for source_name, subset, mapped_source in zip(
+                self.sources, self.subsets, self.mapped_sources):
+            if mapped_source is not None:
+                # NumPy supports unsorted fancy indexing, and the result
+                # shouldn't be a view of the read-only mapping
+                source_data = subset.index_within_subset(
+                    mapped_source, request)
+                if not source_data.flags.owndata:
+                    source_data = source_data.copy()
+                data.append(source_data)
+                shapes.append(None)
+                continue
             # Process the data request within the context of the data source
             # subset
             data.append(
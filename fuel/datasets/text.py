@@ -1,6 +1,15 @@
+import numbers
+from collections import deque
+from itertools import islice, repeat
+
+import h5py
+import numpy
+import six
 from picklable_itertools import iter_, chain
 
 from fuel.datasets import Dataset
+from fuel.schemes import SequentialExampleScheme
+from fuel.utils import Subset, do_not_pickle_attributes
 from fuel.utils.formats import open_
 
 
@@ -48,6 +57,22 @@ class TextFile(Dataset):
         The encoding to use to read the file. Defaults to ``None``. Use
         UTF-8 if the dictionary you pass contains UTF-8 characters, but
         note that this makes the dataset unpicklable on legacy Python.
+    dtype : str, optional
+        If given, each example is returned as a 1-dimensional ndarray of
+        this dtype (e.g. ``'int32'``) instead of a list of integers.
+    block_size : int, optional
+        The number of lines that are read and numberized at once.
+        Defaults to 1024.
+
+    Notes
+    -----
+    Lines are read in blocks of `block_size`, and the tokens of a block
+    are numberized at once. Words are looked up by mapping
+    :meth:`dict.get` over them. The distinct characters of a block are
+    found from the counts of their code points and each is looked up
+    once, after which unknown characters are replaced all at once. The
+    resulting numbers are then split into sentences, which are returned
+    one at a time.
 
     Examples
     --------
@@ -88,7 +113,7 @@ class TextFile(Dataset):
 
     def __init__(self, files, dictionary, bos_token='<S>', eos_token='</S>',
                  unk_token='<UNK>', level='word', preprocess=None,
-                 encoding=None):
+                 encoding=None, dtype=None, block_size=1024):
         self.files = files
         self.dictionary = dictionary
         if bos_token is not None and bos_token not in dictionary:
@@ -110,35 +135,197 @@ class TextFile(Dataset):
         self.level = level
         self.preprocess = preprocess
         self.encoding = encoding
+        self.dtype = dtype
+        self.block_size = block_size
         super(TextFile, self).__init__()
 
     def open(self):
-        return chain(*[iter_(open_(f, encoding=self.encoding))
-                       for f in self.files])
+        # The state holds the lines left to read and the numberized
+        # sentences of the current block that haven't been returned yet.
+        return (chain(*[iter_(open_(f, encoding=self.encoding))
+                        for f in self.files]), deque())
+
+    def _missing_token(self, token):
+        return KeyError("token '{}' not found in dictionary and no "
+                        "`unk_token` given".format(token))
+
+    def _numberize_words(self, tokens):
+        """Look up a list of words in the dictionary."""
+        # map performs the lookups without running Python code per token
+        get = self.dictionary.get
+        if self.unk_token is not None:
+            unk = self.dictionary[self.unk_token]
+            return list(map(get, tokens, repeat(unk, len(tokens))))
+        ids = list(map(get, tokens))
+        if None in ids:
+            raise self._missing_token(tokens[ids.index(None)])
+        return ids
 
-    def _get_from_dictionary(self, symbol):
-        value = self.dictionary.get(symbol)
-        if value is not None:
-            return value
+    def _numberize_characters(self, text):
+        """Look up each character of a string in the dictionary."""
+        if isinstance(text, six.text_type):
+            codes = numpy.frombuffer(text.encode('utf-32-le'), dtype='<u4')
+            to_character = six.unichr
         else:
+            codes = numpy.frombuffer(text, dtype='uint8')
+            to_character = chr
+        # Each distinct character is only looked up once. Characters are
+        # found by counting their code points, which is much faster than
+        # sorting them with numpy.unique.
+        characters = numpy.flatnonzero(numpy.bincount(codes))
+        get = self.dictionary.get
+        ids = numpy.array([get(to_character(code))
+                           for code in characters.tolist()], dtype=object)
+        unknown = numpy.equal(ids, None)
+        if unknown.any():
             if self.unk_token is None:
-                raise KeyError("token '{}' not found in dictionary and no "
-                               "`unk_token` given".format(symbol))
-            return self.dictionary[self.unk_token]
+                first = numpy.in1d(codes, characters[unknown]).argmax()
+                raise self._missing_token(to_character(codes[first]))
+            ids[unknown] = self.dictionary[self.unk_token]
+        # Maps code points to numbers
+        table = numpy.zeros(len(characters) and characters[-1] + 1,
+                            dtype=self.dtype or object)
+        table[characters] = ids
+        if self.dtype is not None:
+            return table[codes]
+        return table[codes].tolist()
+
+    def _numberize_block(self, lines):
+        """Numberize a block of lines, returning one sequence per line."""
+        sentences = []
+        for sentence in lines:
+            if self.preprocess is not None:
+                sentence = self.preprocess(sentence)
+            if self.level == 'word':
+                sentence = sentence.split()
+            else:
+                sentence = sentence.strip()
+            sentences.append(sentence)
+        if self.level == 'word':
+            tokens = []
+            for sentence in sentences:
+                tokens.extend(sentence)
+            ids = self._numberize_words(tokens)
+        else:
+            ids = self._numberize_characters(''.join(sentences))
+        prefix = [self.dictionary[self.bos_token]] if self.bos_token else []
+        suffix = [self.dictionary[self.eos_token]] if self.eos_token else []
+        lengths = [len(sentence) for sentence in sentences]
+        ends = numpy.cumsum(lengths).tolist()
+        if self.dtype is None:
+            return [prefix + ids[end - length:end] + suffix
+                    for end, length in zip(ends, lengths)]
+        # The markers are added to the block's numbers all at once
+        extra = len(prefix) + len(suffix)
+        bounds = numpy.cumsum([0] + [length + extra for length in lengths])
+        numbers = numpy.empty(bounds[-1], dtype=self.dtype)
+        is_token = numpy.ones(bounds[-1], dtype=bool)
+        if prefix:
+            numbers[bounds[:-1]] = prefix[0]
+            is_token[bounds[:-1]] = False
+        if suffix:
+            numbers[bounds[1:] - 1] = suffix[0]
+            is_token[bounds[1:] - 1] = False
+        numbers[is_token] = ids
+        bounds = bounds.tolist()
+        return [numbers[start:stop]
+                for start, stop in zip(bounds[:-1], bounds[1:])]
 
     def get_data(self, state=None, request=None):
         if request is not None:
             raise ValueError
-        sentence = next(state)
-        if self.preprocess is not None:
-            sentence = self.preprocess(sentence)
-        data = [self.dictionary[self.bos_token]] if self.bos_token else []
-        if self.level == 'word':
-            data.extend(self._get_from_dictionary(word)
-                        for word in sentence.split())
-        else:
-            data.extend(self._get_from_dictionary(char)
-                        for char in sentence.strip())
-        if self.eos_token:
-            data.append(self.dictionary[self.eos_token])
-        return (data,)
+        lines, pending = state
+        if not pending:
+            pending.extend(self._numberize_block(
+                islice(lines, self.block_size)))
+            if not pending:
+                raise StopIteration
+        return (pending.popleft(),)
+
+
+@do_not_pickle_attributes('tokens', 'offsets')
+class TokenizedCorpus(Dataset):
+    """A corpus of numberized sentences with random access.
+
+    Reads the files written by
+    :func:`fuel.converters.base.fill_tokenized_corpus` (e.g. by
+    ``fuel-convert billion``), which store a corpus as a flat array of
+    tokens and an array of sentence offsets. Unlike :class:`TextFile`,
+    the text doesn't need to be tokenized again every epoch, and
+    sentences can be requested in any order, so the dataset can be used
+    with e.g. :class:`.ShuffledScheme`.
+
+    Parameters
+    ----------
+    path : str
+        Path to the HDF5 file containing the `tokens` and `offsets`
+        datasets.
+    subset : :class:`slice` or list of int, optional
+        The sentences to provide. This can be used to split the corpus,
+        e.g. to give each worker its own contiguous shard. Defaults to
+        the whole corpus.
+
+    Notes
+    -----
+    When stored contiguously and uncompressed (which is what
+    :func:`fill_tokenized_corpus` does), the tokens and offsets are
+    memory-mapped instead of being read into memory. Sentences are
+    returned as 1-dimensional ``int32`` arrays that are read-only views
+    into the mapped file; slice requests are served with a single read
+    of the tokens they span.
+
+    """
+    provides_sources = ('features',)
+
+    def __init__(self, path, subset=None, **kwargs):
+        self.path = path
+        super(TokenizedCorpus, self).__init__(**kwargs)
+        with h5py.File(self.path, 'r') as h5file:
+            original_num_examples = len(h5file['offsets']) - 1
+        self.subset = Subset(subset if subset is not None else slice(None),
+                             original_num_examples)
+        self.example_iteration_scheme = SequentialExampleScheme(
+            self.num_examples)
+
+    @property
+    def num_examples(self):
+        return self.subset.num_examples
+
+    @staticmethod
+    def _map(dataset):
+        """Memory-map an HDF5 dataset, or read it if that's impossible."""
+        offset = dataset.id.get_offset()
+        if (offset is None or dataset.chunks is not None or
+                dataset.compression is not None):
+            return dataset[...]
+        return numpy.asarray(numpy.memmap(
+            dataset.file.filename, dtype=dataset.dtype, mode='r',
+            offset=offset, shape=dataset.shape))
+
+    def load(self):
+        with h5py.File(self.path, 'r') as h5file:
+            self.tokens = self._map(h5file['tokens'])
+            self.offsets = self._map(h5file['offsets'])
+
+    def get_data(self, state=None, request=None):
+        if state is not None or request is None:
+            raise ValueError
+        tokens, offsets = self.tokens, self.offsets
+        if isinstance(request, numbers.Integral):
+            index, = self.subset[[request]]
+            return (tokens[offsets[index]:offsets[index + 1]],)
+        request = self.subset[request]
+        if hasattr(request, 'step'):
+            start, stop, step = Subset.slice_to_numerical_args(
+                request, self.subset.original_num_examples)
+            if stop <= start:
+                return ([],)
+            if step == 1:
+                bounds = offsets[start:stop + 1]
+                return (numpy.split(tokens[bounds[0]:bounds[-1]],
+                                    bounds[1:-1] - bounds[0]),)
+            request = list(range(start, stop, step))
+        request = numpy.asarray(request, dtype='int64')
+        return ([tokens[start:stop] for start, stop
+                 in zip(offsets[request].tolist(),
+                        offsets[request + 1].tolist())],)
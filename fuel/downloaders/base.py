@@ -1,13 +1,18 @@
+import hashlib
 import os
 import re
 import sys
 from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
 
 import requests
 from progressbar import (ProgressBar, Percentage, Bar, ETA, FileTransferSpeed,
                          Timer, UnknownLength)
 from six.moves import zip, urllib
-from ..exceptions import NeedURLPrefix
+from ..exceptions import ChecksumError, NeedURLPrefix
+
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
 
 
 @contextmanager
@@ -36,6 +41,12 @@ def progress_bar(name, maxval):
         bar.finish()
 
 
+@contextmanager
+def no_progress_bar():
+    """Stands in for :func:`progress_bar` when progress isn't shown."""
+    yield None
+
+
 def filename_from_url(url, path=None):
     """Parses a URL to determine a file name.
 
@@ -54,29 +65,175 @@ def filename_from_url(url, path=None):
     return filename
 
 
-def download(url, file_handle, chunk_size=1024):
+def adaptive_chunk_size(total_length):
+    """Chooses the size of the chunks to read a download in.
+
+    Small files are read in :const:`MIN_CHUNK_SIZE` chunks, while large
+    files are read in about a hundred chunks of at most
+    :const:`MAX_CHUNK_SIZE` bytes, which keeps the progress bar moving
+    without making a Python call per kilobyte.
+
+    Parameters
+    ----------
+    total_length : int or None
+        The size of the download in bytes, if known.
+
+    """
+    if total_length is None:
+        return MIN_CHUNK_SIZE
+    return min(max(total_length // 100, MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+
+
+def sha256sum(file_handle, chunk_size=MAX_CHUNK_SIZE):
+    """Computes the SHA-256 hash of the rest of a file.
+
+    Parameters
+    ----------
+    file_handle : file
+        The file to hash, from its current position onwards.
+
+    Returns
+    -------
+    :class:`hashlib.sha256`
+        The hash object, which can be updated further.
+
+    """
+    sha256 = hashlib.sha256()
+    for chunk in iter(lambda: file_handle.read(chunk_size), b''):
+        sha256.update(chunk)
+    return sha256
+
+
+def _validator(response):
+    """Returns the strong validator (ETag or date) of a response, if any."""
+    etag = response.headers.get('etag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return response.headers.get('last-modified')
+
+
+def _complete_length(response):
+    """Returns the length of the file a 416 response refers to, if given."""
+    match = re.match(r'bytes \*/(\d+)$',
+                     response.headers.get('content-range', ''))
+    return int(match.group(1)) if match else None
+
+
+def download(url, file_handle, chunk_size=None, session=None, sha256=None,
+             show_progress=True, validator=None, store_validator=None):
     """Downloads a given URL to a specific file.
 
+    If the file already has content, the download is resumed with an
+    HTTP Range request, as long as the content can be checked: either
+    `validator` is given, so that the server only sends the rest of the
+    file if it hasn't changed since, or `sha256` is. Otherwise, and if
+    the server doesn't support ranges or the file changed, the file is
+    truncated and downloaded in full.
+
     Parameters
     ----------
     url : str
         URL to download.
     file_handle : file
-        Where to save the downloaded URL.
+        Where to save the downloaded URL. When resuming a download, this
+        must be positioned at the end of the partial content, and
+        readable if `sha256` is given.
+    chunk_size : int, optional
+        The number of bytes to read at a time. By default, it's chosen
+        based on the size of the download. See
+        :func:`adaptive_chunk_size`.
+    session : :class:`requests.Session`, optional
+        The session to download with, so that connections can be reused.
+    sha256 : str, optional
+        The expected SHA-256 hash of the whole file, as a hexadecimal
+        string. The hash is computed while downloading.
+    show_progress : bool, optional
+        Whether to show a progress bar. Defaults to `True`.
+    validator : str, optional
+        The ETag or Last-Modified date of the file the partial content
+        was downloaded from, as passed to `store_validator`.
+    store_validator : callable, optional
+        Called with the ETag or Last-Modified date of the file (or
+        `None` if the server gives neither) when its content is
+        downloaded from the start, before any of it is written, so that
+        the download can be resumed later.
+
+    Raises
+    ------
+    ChecksumError
+        If the file doesn't match `sha256`.
 
     """
-    r = requests.get(url, stream=True)
-    total_length = r.headers.get('content-length')
-    if total_length is None:
-        maxval = UnknownLength
+    if session is None:
+        session = requests
+    offset = file_handle.tell()
+    if offset and validator is None and sha256 is None:
+        # Partial content that can't be checked isn't resumed
+        offset = 0
+        file_handle.seek(0)
+        file_handle.truncate()
+    if offset:
+        headers = {'Range': 'bytes={}-'.format(offset)}
+        if validator is not None:
+            headers['If-Range'] = validator
+        r = session.get(url, stream=True, headers=headers)
+        if r.status_code == 416:
+            r.close()
+            if _complete_length(r) == offset:
+                # The partial file is already complete
+                r = None
+            else:
+                # The partial file doesn't match the file's length
+                offset = 0
+                file_handle.seek(0)
+                file_handle.truncate()
+                r = session.get(url, stream=True)
     else:
-        maxval = int(total_length)
-    name = file_handle.name
-    with progress_bar(name=name, maxval=maxval) as bar:
-        for i, chunk in enumerate(r.iter_content(chunk_size)):
-            if total_length:
-                bar.update(i * chunk_size)
-            file_handle.write(chunk)
+        r = session.get(url, stream=True)
+    if r is not None:
+        # Errors must not discard the partial file
+        r.raise_for_status()
+        if offset and r.status_code == 200:
+            # The server ignored the range or the file changed, so start
+            # over
+            offset = 0
+            file_handle.seek(0)
+            file_handle.truncate()
+        if not offset and store_validator is not None:
+            store_validator(_validator(r))
+    if sha256 is not None:
+        if offset:
+            file_handle.seek(0)
+            hash_ = sha256sum(file_handle)
+        else:
+            hash_ = hashlib.sha256()
+    if r is not None:
+        total_length = r.headers.get('content-length')
+        if total_length is not None:
+            total_length = int(total_length)
+        if chunk_size is None:
+            chunk_size = adaptive_chunk_size(total_length)
+        if total_length is None:
+            maxval = UnknownLength
+        else:
+            maxval = offset + total_length
+        if show_progress:
+            bar_context = progress_bar(name=file_handle.name, maxval=maxval)
+        else:
+            bar_context = no_progress_bar()
+        with bar_context as bar:
+            downloaded = offset
+            for chunk in r.iter_content(chunk_size):
+                file_handle.write(chunk)
+                if sha256 is not None:
+                    hash_.update(chunk)
+                downloaded += len(chunk)
+                if bar is not None and maxval is not UnknownLength:
+                    bar.update(min(downloaded, maxval))
+    if sha256 is not None and hash_.hexdigest() != sha256.lower():
+        raise ChecksumError("{} doesn't match its SHA-256 checksum ({}, "
+                            "expected {})".format(file_handle.name,
+                                                  hash_.hexdigest(), sha256))
 
 
 def ensure_directory_exists(directory):
@@ -93,8 +250,51 @@ def ensure_directory_exists(directory):
     os.makedirs(directory)
 
 
+def _remove_if_exists(path):
+    if os.path.isfile(path):
+        os.remove(path)
+
+
+def _download_file(url, path, session, sha256, resume, show_progress):
+    """Downloads a URL to a path, through a partial file."""
+    partial_path = path + '.part'
+    # The ETag or date of the file the partial file was downloaded from
+    validator_path = partial_path + '.validator'
+    if not resume:
+        _remove_if_exists(partial_path)
+        _remove_if_exists(validator_path)
+    validator = None
+    if os.path.isfile(validator_path):
+        with open(validator_path) as f:
+            validator = f.read() or None
+
+    def store_validator(value):
+        if value is None:
+            _remove_if_exists(validator_path)
+        else:
+            with open(validator_path, 'w') as f:
+                f.write(value)
+
+    # Append mode resumes at the end of the partial file, if any
+    with open(partial_path, 'a+b') as file_handle:
+        file_handle.seek(0, os.SEEK_END)
+        try:
+            download(url, file_handle, session=session, sha256=sha256,
+                     show_progress=show_progress, validator=validator,
+                     store_validator=store_validator)
+        except ChecksumError:
+            file_handle.close()
+            os.remove(partial_path)
+            _remove_if_exists(validator_path)
+            raise
+    os.rename(partial_path, path)
+    _remove_if_exists(validator_path)
+    if not show_progress:
+        print('Downloaded ' + os.path.basename(path))
+
+
 def default_downloader(directory, urls, filenames, url_prefix=None,
-                       clear=False):
+                       clear=False, sha256s=None, num_workers=4, resume=True):
     """Downloads or clears files from URLs and filenames.
 
     Parameters
@@ -111,6 +311,27 @@ def default_downloader(directory, urls, filenames, url_prefix=None,
     clear : bool, optional
         If `True`, delete the given filenames from the given
         directory rather than download them.
+    sha256s : list, optional
+        The expected SHA-256 hash of each file, as hexadecimal strings,
+        or `None` for files without one. Downloaders can provide these
+        as a manifest using :meth:`argparse.ArgumentParser.set_defaults`.
+        Files that are already present and match their hash aren't
+        downloaded again.
+    num_workers : int, optional
+        The number of files to download concurrently. Defaults to 4.
+    resume : bool, optional
+        Whether to resume partial downloads left by an interrupted run
+        (``<filename>.part``). Defaults to `True`.
+
+    Notes
+    -----
+    Files are downloaded to ``<filename>.part`` and renamed once complete
+    and verified, so that an interrupted download can be resumed. The
+    ETag or Last-Modified date of the file being downloaded is stored in
+    ``<filename>.part.validator``, so that a download is only resumed
+    if the file hasn't changed since (or if its hash is known). All
+    downloads share a :class:`requests.Session`, so that connections to
+    the same server are reused.
 
     """
     # Parse file names from URL if not provided
@@ -123,18 +344,49 @@ def default_downloader(directory, urls, filenames, url_prefix=None,
         filenames[i] = filename
     files = [os.path.join(directory, f) for f in filenames]
 
+    if sha256s is None:
+        sha256s = [None] * len(files)
+
     if clear:
         for f in files:
-            if os.path.isfile(f):
-                os.remove(f)
+            for path in (f, f + '.part', f + '.part.validator'):
+                _remove_if_exists(path)
     else:
-        print('Downloading ' + ', '.join(filenames) + '\n')
-        ensure_directory_exists(directory)
-
-        for url, f, n in zip(urls, files, filenames):
+        downloads = []
+        for url, f, n, sha256 in zip(urls, files, filenames, sha256s):
             if not url:
                 if url_prefix is None:
                     raise NeedURLPrefix
                 url = url_prefix + n
-            with open(f, 'wb') as file_handle:
-                download(url, file_handle)
+            if sha256 is not None and os.path.isfile(f):
+                with open(f, 'rb') as file_handle:
+                    if sha256sum(file_handle).hexdigest() == sha256.lower():
+                        continue
+            downloads.append((url, f, sha256))
+        if not downloads:
+            return
+        print('Downloading ' + ', '.join(os.path.basename(f)
+                                         for _, f, _ in downloads) + '\n')
+        ensure_directory_exists(directory)
+
+        num_workers = max(1, min(num_workers, len(downloads)))
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=num_workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        try:
+            if num_workers == 1:
+                for url, f, sha256 in downloads:
+                    _download_file(url, f, session, sha256, resume, True)
+            else:
+                # Concurrent progress bars would garble the output
+                pool = ThreadPool(num_workers)
+                try:
+                    pool.map(lambda args: _download_file(
+                        args[0], args[1], session, args[2], resume, False),
+                        downloads)
+                finally:
+                    pool.close()
+                    pool.join()
+        finally:
+            session.close()
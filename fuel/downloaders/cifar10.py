@@ -5,7 +5,7 @@ def fill_subparser(subparser):
     """Sets up a subparser to download the CIFAR-10 dataset file.
 
     The CIFAR-10 dataset file is downloaded from Alex Krizhevsky's
-    website [ALEX].
+    website [ALEX], and verified against its SHA-256 hash.
 
     Parameters
     ----------
@@ -15,5 +15,6 @@ def fill_subparser(subparser):
     """
     url = 'http://www.cs.toronto.edu/~kriz/cifar-10-python.tar.gz'
     filename = 'cifar-10-python.tar.gz'
-    subparser.set_defaults(urls=[url], filenames=[filename])
+    sha256 = '6d958be074577803d12ecdefd02955f39262c83c16fe9348329d7fe0b5c001ce'
+    subparser.set_defaults(urls=[url], filenames=[filename], sha256s=[sha256])
     return default_downloader
@@ -5,7 +5,7 @@ def fill_subparser(subparser):
     """Sets up a subparser to download the CIFAR-100 dataset file.
 
     The CIFAR-100 dataset file is downloaded from Alex Krizhevsky's
-    website [ALEX].
+    website [ALEX], and verified against its SHA-256 hash.
 
     .. [ALEX] http://www.cs.toronto.edu/~kriz/cifar-100-python.tar.gz
 
@@ -17,5 +17,6 @@ def fill_subparser(subparser):
     """
     url = 'http://www.cs.toronto.edu/~kriz/cifar-100-python.tar.gz'
     filename = 'cifar-100-python.tar.gz'
-    subparser.set_defaults(urls=[url], filenames=[filename])
+    sha256 = '85cd44d02ba6437773c5bbd22e183051d648de2e7d6b014e1ef29b855ba677a7'
+    subparser.set_defaults(urls=[url], filenames=[filename], sha256s=[sha256])
     return default_downloader
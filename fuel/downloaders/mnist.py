@@ -7,7 +7,8 @@ def fill_subparser(subparser):
     The following MNIST dataset files are downloaded from Yann LeCun's
     website [LECUN]:
     `train-images-idx3-ubyte.gz`, `train-labels-idx1-ubyte.gz`,
-    `t10k-images-idx3-ubyte.gz`, `t10k-labels-idx1-ubyte.gz`.
+    `t10k-images-idx3-ubyte.gz`, `t10k-labels-idx1-ubyte.gz`. They are
+    verified against their SHA-256 hashes.
 
     Parameters
     ----------
@@ -18,5 +19,10 @@ def fill_subparser(subparser):
     filenames = ['train-images-idx3-ubyte.gz', 'train-labels-idx1-ubyte.gz',
                  't10k-images-idx3-ubyte.gz', 't10k-labels-idx1-ubyte.gz']
     urls = ['http://yann.lecun.com/exdb/mnist/' + f for f in filenames]
-    subparser.set_defaults(urls=urls, filenames=filenames)
+    sha256s = [
+        '440fcabf73cc546fa21475e81ea370265605f56be210a4024d2ca8f203523609',
+        '3552534a0a558bbed6aed32b30c495cca23d567ec52cac8be1a0730e8010255c',
+        '8d422c7b0a1c1c79245a5bcf07fe86e33eeafee792b84584aec276f5a2dbc4e6',
+        'f7ae60f92e00ec6debd23a6088c31dbd2371eca3ffa0defaefb259924204aec6']
+    subparser.set_defaults(urls=urls, filenames=filenames, sha256s=sha256s)
     return default_downloader
@@ -2,6 +2,10 @@ class AxisLabelsMismatchError(ValueError):
     """Raised when a pair of axis labels tuples do not match."""
 
 
+class ChecksumError(Exception):
+    """Raised when a downloaded file doesn't match its checksum."""
+
+
 class ConfigurationError(Exception):
     """Error raised when a configuration value is requested but not set."""
 
@@ -1,4 +1,74 @@
+from itertools import islice
+
 import six
+from six.moves import range
+
+
+def _make_source_tuple(sources, data):
+    return SourceTuple.for_sources(sources)(data)
+
+
+class SourceTuple(tuple):
+    """A tuple of data from several sources, accessible by source name.
+
+    Behaves exactly like a tuple (indexing included, which is as fast as
+    for a tuple), but a source's data can also be looked up by the
+    source's name with :meth:`get`, without building a dictionary for
+    every batch. Instances are created through a subclass per tuple of
+    source names, as returned by :meth:`for_sources`, which holds the
+    mapping from names to positions.
+
+    Data streams return their data as a :class:`SourceTuple`, so that
+    transformers which don't change the data can pass it on as is.
+
+    Examples
+    --------
+    >>> batch = SourceTuple.for_sources(('features', 'targets'))((1, 2))
+    >>> batch.get('targets')
+    2
+    >>> features, targets = batch
+    >>> batch.as_dict() == {'features': 1, 'targets': 2}
+    True
+
+    """
+    __slots__ = ()
+    sources = ()
+    _indices = {}
+    _classes = {}
+
+    @classmethod
+    def for_sources(cls, sources):
+        """Return the subclass for the given tuple of source names."""
+        try:
+            return cls._classes[sources]
+        except (KeyError, TypeError):
+            pass
+        sources = tuple(sources)
+        if sources not in cls._classes:
+            indices = dict((source, i) for i, source
+                           in reversed(list(enumerate(sources))))
+            cls._classes[sources] = type(
+                str('SourceTuple'), (SourceTuple,),
+                {'__slots__': (), 'sources': sources, '_indices': indices})
+        return cls._classes[sources]
+
+    def get(self, source):
+        """Return the data of a source, given its name.
+
+        Raises
+        ------
+        KeyError
+            If there is no source with this name.
+
+        """
+        return self[self._indices[source]]
+
+    def __reduce__(self):
+        return _make_source_tuple, (self.sources, tuple(self))
+
+    def as_dict(self):
+        """Return a dictionary mapping source names to data."""
+        return dict(zip(self.sources, self))
 
 
 class DataIterator(six.Iterator):
@@ -16,21 +86,78 @@ class DataIterator(six.Iterator):
         from each source. If `False` (default), return tuples in the
         same order as `data_stream.sources`.
 
+    Attributes
+    ----------
+    position : int
+        The number of times data was returned during this epoch.
+
+    Notes
+    -----
+    Unless `as_dict` is `True`, data is returned as a
+    :class:`SourceTuple`, so that a source's data can be looked up by
+    name as well as by position. Data the stream already returns as one
+    is passed through as is.
+
     """
+    _source_tuple = None
+
     def __init__(self, data_stream, request_iterator=None, as_dict=False):
         self.data_stream = data_stream
         self.request_iterator = request_iterator
         self.as_dict = as_dict
+        self.position = 0
 
     def __iter__(self):
         return self
 
+    def __getstate__(self):
+        # The SourceTuple subclasses are created dynamically and can't be
+        # pickled, so it is looked up again after unpickling
+        state = self.__dict__.copy()
+        state['_source_tuple'] = None
+        return state
+
     def __next__(self):
         if self.request_iterator is not None:
             data = self.data_stream.get_data(next(self.request_iterator))
         else:
             data = self.data_stream.get_data()
+        self.position += 1
+        if self._source_tuple is None:
+            self._source_tuple = SourceTuple.for_sources(
+                self.data_stream.sources)
         if self.as_dict:
-            return dict(zip(self.data_stream.sources, data))
+            return dict(zip(self._source_tuple.sources, data))
+        if type(data) is not self._source_tuple:
+            data = self._source_tuple(data)
+        return data
+
+    def seek(self, position):
+        """Fast-forward the iterator to a given position in the epoch.
+
+        Requests are skipped without passing them to the data stream,
+        in constant time if the request iterator has a `seek` method. If
+        there is no request iterator, the data is read and discarded.
+
+        Parameters
+        ----------
+        position : int
+            The number of steps since the start of the epoch, as given by
+            :attr:`position`. Can't be smaller than the current position.
+
+        """
+        if position < self.position:
+            raise ValueError("can't seek backwards from position {} to {}"
+                             .format(self.position, position))
+        num_steps = position - self.position
+        if hasattr(self.request_iterator, 'seek'):
+            self.request_iterator.seek(position)
+        elif self.request_iterator is not None:
+            next(islice(self.request_iterator, num_steps, num_steps), None)
         else:
-            return data
+            try:
+                for _ in range(num_steps):
+                    self.data_stream.get_data()
+            except StopIteration:
+                pass
+        self.position = position
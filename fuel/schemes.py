@@ -1,13 +1,16 @@
+import copy
 from abc import ABCMeta, abstractmethod
 from collections import Iterable
 
 import numpy
+import six
 from picklable_itertools import chain, repeat, imap, iter_
 from picklable_itertools.extras import partition_all
 from six import add_metaclass
 from six.moves import xrange
 
 from fuel import config
+from fuel.utils import shard_slice
 
 
 @add_metaclass(ABCMeta)
@@ -42,6 +45,36 @@ class IterationScheme(object):
     def get_request_iterator(self):
         """Returns an iterator type."""
 
+    def state_dict(self):
+        """Return the state needed to reproduce the next request iterator.
+
+        The default implementation stores the state of the `rng`
+        attribute, if the scheme has one.
+
+        Returns
+        -------
+        dict
+            A picklable dictionary that can be passed to
+            :meth:`load_state_dict`.
+
+        """
+        rng = getattr(self, 'rng', None)
+        if isinstance(rng, numpy.random.RandomState):
+            return {'rng': rng.get_state()}
+        return {}
+
+    def load_state_dict(self, state_dict):
+        """Restore a state returned by :meth:`state_dict`.
+
+        Parameters
+        ----------
+        state_dict : dict
+            The state to restore.
+
+        """
+        if 'rng' in state_dict:
+            self.rng.set_state(state_dict['rng'])
+
 
 @add_metaclass(ABCMeta)
 class BatchSizeScheme(IterationScheme):
@@ -119,6 +152,13 @@ class ConcatenatedScheme(IterationScheme):
     def get_request_iterator(self):
         return chain(*[sch.get_request_iterator() for sch in self.schemes])
 
+    def state_dict(self):
+        return {'schemes': [scheme.state_dict() for scheme in self.schemes]}
+
+    def load_state_dict(self, state_dict):
+        for scheme, scheme_state in zip(self.schemes, state_dict['schemes']):
+            scheme.load_state_dict(scheme_state)
+
     @property
     def requests_examples(self):
         return self.schemes[0].requests_examples
@@ -257,6 +297,566 @@ class ShuffledExampleScheme(IndexScheme):
         return iter_(indices)
 
 
+class FeistelPermutation(object):
+    """A pseudo-random permutation of ``[0, num_examples)``.
+
+    The permutation is a Feistel network on the smallest domain of ``4 **
+    k`` integers containing all examples, restricted to the examples by
+    cycle-walking: values that fall outside of ``[0, num_examples)`` are
+    permuted again until they fall inside. Any position can hence be
+    mapped in constant time and memory, without materializing the
+    permutation.
+
+    Parameters
+    ----------
+    num_examples : int
+        The number of integers to permute.
+    keys : list of int
+        One key per round of the Feistel network.
+
+    """
+    _multipliers = (numpy.uint64(0x9E3779B97F4A7C15),
+                    numpy.uint64(0xBF58476D1CE4E5B9))
+
+    def __init__(self, num_examples, keys):
+        self.num_examples = num_examples
+        self.keys = [numpy.uint64(key) for key in keys]
+        self.half_bits = max(1, (int(num_examples - 1).bit_length() + 1) // 2)
+
+    def _round(self, half, key):
+        mixed = (half ^ key) * self._multipliers[0]
+        mixed ^= mixed >> numpy.uint64(29)
+        mixed *= self._multipliers[1]
+        return mixed >> numpy.uint64(64 - self.half_bits)
+
+    def _permute(self, values):
+        bits = numpy.uint64(self.half_bits)
+        left = values >> bits
+        right = values & numpy.uint64((1 << self.half_bits) - 1)
+        for key in self.keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << bits) | right
+
+    def __call__(self, positions):
+        """Map positions to examples.
+
+        Parameters
+        ----------
+        positions : array_like of int
+            Positions in ``[0, num_examples)``.
+
+        Returns
+        -------
+        :class:`numpy.ndarray`
+            The examples at these positions of the permutation.
+
+        """
+        values = self._permute(numpy.asarray(positions, dtype='uint64'))
+        outside = values >= self.num_examples
+        while outside.any():
+            values[outside] = self._permute(values[outside])
+            outside = values >= self.num_examples
+        return values.astype('int64')
+
+
+class PermutationIterator(six.Iterator):
+    """Iterates over the requests of a lazily shuffled epoch.
+
+    Parameters
+    ----------
+    permutation : :class:`FeistelPermutation`
+        The order in which to visit the examples.
+    indices : indexable
+        The example indices that are being permuted.
+    batch_size : int, optional
+        If given, return lists of up to `batch_size` indices instead of
+        single indices.
+    sorted_indices : bool, optional
+        If `True`, sort the indices within a batch. Defaults to `False`.
+
+    """
+    def __init__(self, permutation, indices, batch_size=None,
+                 sorted_indices=False):
+        self.permutation = permutation
+        self.batch_size = batch_size
+        self.sorted_indices = sorted_indices
+        # Ranges are mapped arithmetically instead of being materialized
+        if isinstance(indices, xrange):
+            self.indices = None
+            self.first = indices[0] if len(indices) else 0
+            self.step = indices[1] - indices[0] if len(indices) > 1 else 1
+        else:
+            self.indices = numpy.asarray(indices)
+        self.position = 0
+
+    def __iter__(self):
+        return self
+
+    def seek(self, position):
+        """Jump to the `position`-th request of the epoch."""
+        self.position = position
+
+    def _lookup(self, positions):
+        permuted = self.permutation(positions)
+        if self.indices is None:
+            return permuted * self.step + self.first
+        return self.indices[permuted]
+
+    def __next__(self):
+        num_examples = self.permutation.num_examples
+        if self.batch_size is None:
+            if self.position >= num_examples:
+                raise StopIteration
+            request = self._lookup([self.position])[0].item()
+        else:
+            start = self.position * self.batch_size
+            if start >= num_examples:
+                raise StopIteration
+            request = self._lookup(numpy.arange(
+                start, min(start + self.batch_size, num_examples))).tolist()
+            if self.sorted_indices:
+                request.sort()
+        self.position += 1
+        return request
+
+
+class LazyShuffledScheme(BatchScheme):
+    """Shuffled batches iterator that doesn't materialize the shuffle.
+
+    Like :class:`ShuffledScheme`, but the examples are visited in the
+    order of a pseudo-random :class:`FeistelPermutation`, which is
+    computed one batch at a time. The first batch is hence returned in
+    constant time and memory regardless of the number of examples, and
+    the request iterator can :meth:`~PermutationIterator.seek` to any
+    batch of the epoch.
+
+    Parameters
+    ----------
+    sorted_indices : bool, optional
+        If `True`, enforce that indices within a batch are ordered.
+        Defaults to `False`.
+    rng : :class:`numpy.random.RandomState`, optional
+        The random number generator from which the keys of the
+        permutation are drawn, once per epoch.
+
+    Notes
+    -----
+    The permutation is pseudo-random rather than uniformly drawn from
+    all permutations, and differs from the one :class:`ShuffledScheme`
+    would produce for the same random state.
+
+    """
+    def __init__(self, *args, **kwargs):
+        self.rng = kwargs.pop('rng', None)
+        if self.rng is None:
+            self.rng = numpy.random.RandomState(config.default_seed)
+        self.sorted_indices = kwargs.pop('sorted_indices', False)
+        super(LazyShuffledScheme, self).__init__(*args, **kwargs)
+
+    def get_request_iterator(self):
+        permutation = FeistelPermutation(len(self.indices),
+                                         self.rng.randint(2 ** 30, size=4))
+        return PermutationIterator(permutation, self.indices,
+                                   self.batch_size, self.sorted_indices)
+
+
+class LazyShuffledExampleScheme(IndexScheme):
+    """Shuffled examples iterator that doesn't materialize the shuffle.
+
+    The examples are returned in the order of a pseudo-random
+    :class:`FeistelPermutation`, see :class:`LazyShuffledScheme`.
+
+    """
+    def __init__(self, *args, **kwargs):
+        self.rng = kwargs.pop('rng', None)
+        if self.rng is None:
+            self.rng = numpy.random.RandomState(config.default_seed)
+        super(LazyShuffledExampleScheme, self).__init__(*args, **kwargs)
+
+    def get_request_iterator(self):
+        permutation = FeistelPermutation(len(self.indices),
+                                         self.rng.randint(2 ** 30, size=4))
+        return PermutationIterator(permutation, self.indices)
+
+
+class AliasTable(object):
+    """Walker's alias table for sampling from a discrete distribution.
+
+    After construction, each draw takes constant time: a bucket is picked
+    uniformly at random, and either the bucket's own outcome or its
+    alias is returned.
+
+    Parameters
+    ----------
+    weights : array_like
+        The non-negative (unnormalized) probability of each outcome.
+
+    Attributes
+    ----------
+    accept : :class:`numpy.ndarray`
+        The probability with which each bucket returns its own outcome.
+    alias : :class:`numpy.ndarray`
+        The outcome each bucket returns otherwise.
+
+    Notes
+    -----
+    The table is built with Vose's method, pairing the outcomes with
+    less than average probability with those with more than average
+    probability in order. The pairing is found for all outcomes at once
+    from the cumulative sums of the deficits and surpluses, instead of
+    one outcome at a time.
+
+    """
+    def __init__(self, weights):
+        weights = numpy.asarray(weights, dtype='float64')
+        if weights.ndim != 1 or not len(weights):
+            raise ValueError("weights should be a non-empty vector")
+        if (weights < 0).any() or not weights.sum() > 0:
+            raise ValueError("weights should be non-negative and sum to a "
+                             "positive number")
+        probabilities = weights * (len(weights) / weights.sum())
+        self.accept = numpy.ones(len(weights))
+        self.alias = numpy.arange(len(weights))
+        small, = numpy.nonzero(probabilities < 1)
+        large, = numpy.nonzero(probabilities >= 1)
+        # Without large outcomes, all probabilities are 1 up to rounding
+        if not len(small) or not len(large):
+            return
+        # The small outcomes are covered by the large ones in order, so a
+        # small outcome is aliased to the first large outcome whose
+        # cumulative surplus exceeds the deficit accumulated before it.
+        deficits = numpy.cumsum(1 - probabilities[small])
+        previous_deficits = numpy.concatenate([[0], deficits])
+        surpluses = numpy.cumsum(probabilities[large] - 1)
+        covering = numpy.searchsorted(surpluses, previous_deficits[:-1],
+                                      side='right')
+        self.accept[small] = probabilities[small]
+        self.alias[small] = large[numpy.minimum(covering, len(large) - 1)]
+        # A large outcome whose surplus is used up halfway through a small
+        # outcome's deficit becomes small itself, and is covered by the
+        # next large outcome.
+        crossing = numpy.searchsorted(deficits, surpluses, side='right')
+        exhausted, = numpy.nonzero(
+            (crossing < len(small)) &
+            (previous_deficits[numpy.minimum(crossing, len(small))] <
+             surpluses))
+        self.accept[large[exhausted]] = numpy.clip(
+            1 - (deficits[crossing[exhausted]] - surpluses[exhausted]), 0, 1)
+        self.alias[large[exhausted]] = large[
+            numpy.minimum(exhausted + 1, len(large) - 1)]
+
+    def __len__(self):
+        return len(self.accept)
+
+    def sample(self, size, rng):
+        """Draw outcomes with replacement.
+
+        Parameters
+        ----------
+        size : int or tuple of int
+            The shape of the output.
+        rng : :class:`numpy.random.RandomState`
+            The random number generator to use.
+
+        Returns
+        -------
+        :class:`numpy.ndarray`
+            The sampled outcomes.
+
+        """
+        buckets = rng.randint(len(self), size=size)
+        return numpy.where(rng.uniform(size=size) < self.accept[buckets],
+                           buckets, self.alias[buckets])
+
+
+def _read_source(values, source):
+    """Return values given as an array or as a source of a dataset.
+
+    Only `source` is read from a dataset, through a copy of the dataset
+    restricted to that source.
+
+    """
+    if not hasattr(values, 'get_data'):
+        return numpy.asarray(values)
+    if source not in values.sources:
+        raise ValueError("dataset doesn't provide source '{}'".format(source))
+    # Copying drops the attributes that aren't pickled (e.g. the subsets
+    # of an H5PYDataset), which are then loaded for `source` only
+    dataset = copy.copy(values)
+    dataset.sources = (source,)
+    if hasattr(values, 'indexables'):
+        dataset.indexables = [values.indexables[values.sources.index(source)]]
+    state = dataset.open()
+    try:
+        data, = dataset.get_data(state, slice(0, dataset.num_examples))
+    finally:
+        dataset.close(state)
+    return numpy.asarray(data)
+
+
+class WeightedSampleScheme(IterationScheme):
+    """Samples examples with probability proportional to their weights.
+
+    Parameters
+    ----------
+    weights : array_like or :class:`.Dataset`
+        One non-negative weight per example. If a dataset is given, the
+        weights are read from its `source` when the first request
+        iterator is created.
+    num_examples : int, optional
+        The number of examples to sample per epoch. Defaults to the number
+        of weights.
+    batch_size : int, optional
+        If given, the requests are lists of `batch_size` indices (the
+        last one could be smaller) instead of single indices.
+    replacement : bool, optional
+        Whether to sample with replacement (the default). Without
+        replacement, an epoch can't contain more examples than there are
+        examples with a positive weight.
+    source : str, optional
+        The source containing the weights, if `weights` is a dataset.
+        Defaults to 'weights'.
+    rng : :class:`numpy.random.RandomState`, optional
+        The random number generator to use.
+
+    Notes
+    -----
+    With replacement, examples are drawn from an :class:`AliasTable`.
+    Without replacement, each example gets the key ``-log(u) / w`` for a
+    uniformly drawn `u`, and the examples with the smallest keys are
+    taken in order, which is equivalent to drawing them one by one.
+
+    """
+    def __init__(self, weights, num_examples=None, batch_size=None,
+                 replacement=True, source='weights', rng=None):
+        self.weights = weights
+        self.num_examples = num_examples
+        self.batch_size = batch_size
+        self.replacement = replacement
+        self.source = source
+        self.rng = rng
+        if self.rng is None:
+            self.rng = numpy.random.RandomState(config.default_seed)
+
+    @property
+    def requests_examples(self):
+        return self.batch_size is None
+
+    def _load(self):
+        if not hasattr(self, '_weights'):
+            self._weights = _read_source(self.weights,
+                                         self.source).astype('float64')
+            if self.replacement:
+                self._table = AliasTable(self._weights)
+        return self._weights
+
+    def get_request_iterator(self):
+        weights = self._load()
+        num_examples = (len(weights) if self.num_examples is None
+                        else self.num_examples)
+        if self.replacement:
+            indices = self._table.sample(num_examples, self.rng)
+        else:
+            if num_examples > numpy.count_nonzero(weights):
+                raise ValueError("can't sample {} examples without "
+                                 "replacement".format(num_examples))
+            with numpy.errstate(divide='ignore'):
+                keys = -numpy.log(self.rng.uniform(size=len(weights)))
+                keys /= weights
+            indices = numpy.argpartition(keys, num_examples - 1)[
+                :num_examples] if num_examples else numpy.arange(0)
+            indices = indices[numpy.argsort(keys[indices])]
+        if self.batch_size is None:
+            return iter_(indices.tolist())
+        return imap(list, partition_all(self.batch_size, indices.tolist()))
+
+
+class StratifiedBatchScheme(IterationScheme):
+    """Batches that contain the classes in fixed proportions.
+
+    Each batch contains ``batch_size * w_c / sum(w)`` examples of class
+    `c`, where `w` are the class weights. The slots left over by rounding
+    down are given to classes drawn in proportion to their weights from
+    an :class:`AliasTable`. Within a class, examples are drawn uniformly.
+
+    Parameters
+    ----------
+    labels : array_like or :class:`.Dataset`
+        The class label of each example. If a dataset is given, the
+        labels are read from its `source` when the first request iterator
+        is created.
+    batch_size : int
+        The size of the batches.
+    num_batches : int, optional
+        The number of batches per epoch. Defaults to the number of batches
+        needed to cover all examples once.
+    class_weights : dict, optional
+        Maps labels to non-negative weights. Defaults to equal weights for
+        all classes.
+    replacement : bool, optional
+        If `True` (the default), examples are drawn with replacement.
+        Otherwise the examples of a class are only repeated after all of
+        them have been used.
+    source : str, optional
+        The source containing the labels, if `labels` is a dataset.
+        Defaults to 'targets'.
+    rng : :class:`numpy.random.RandomState`, optional
+        The random number generator to use.
+
+    Notes
+    -----
+    Within a batch, the indices are ordered by class.
+
+    """
+    requests_examples = False
+
+    def __init__(self, labels, batch_size, num_batches=None,
+                 class_weights=None, replacement=True, source='targets',
+                 rng=None):
+        self.labels = labels
+        self.batch_size = batch_size
+        self.num_batches = num_batches
+        self.class_weights = class_weights
+        self.replacement = replacement
+        self.source = source
+        self.rng = rng
+        if self.rng is None:
+            self.rng = numpy.random.RandomState(config.default_seed)
+
+    def _load(self):
+        if not hasattr(self, '_members'):
+            labels = _read_source(self.labels, self.source).reshape(-1)
+            classes, labels = numpy.unique(labels, return_inverse=True)
+            if self.class_weights is None:
+                weights = numpy.ones(len(classes))
+            else:
+                weights = numpy.array([self.class_weights.get(class_, 0)
+                                       for class_ in classes.tolist()],
+                                      dtype='float64')
+            self._table = AliasTable(weights)
+            self._quotas = numpy.floor(
+                self.batch_size * weights / weights.sum()).astype('int64')
+            order = numpy.argsort(labels, kind='mergesort')
+            bounds = numpy.searchsorted(labels[order],
+                                        numpy.arange(len(classes) + 1))
+            self._members = [order[start:stop] for start, stop
+                             in zip(bounds[:-1], bounds[1:])]
+            self._num_examples = len(labels)
+        return self._members
+
+    def _draw(self, members, num_draws):
+        if self.replacement:
+            return members[self.rng.randint(len(members), size=num_draws)]
+        num_permutations = -(-num_draws // len(members))
+        return numpy.concatenate(
+            [self.rng.permutation(members)
+             for _ in xrange(num_permutations)])[:num_draws]
+
+    def get_request_iterator(self):
+        members = self._load()
+        num_batches = self.num_batches
+        if num_batches is None:
+            num_batches = -(-self._num_examples // self.batch_size)
+        counts = numpy.tile(self._quotas, (num_batches, 1))
+        num_extra = self.batch_size - self._quotas.sum()
+        if num_extra:
+            extra = self._table.sample((num_batches, num_extra), self.rng)
+            numpy.add.at(counts, (numpy.arange(num_batches)[:, None], extra),
+                         1)
+        if any(not len(class_members) and count
+               for class_members, count in zip(members, counts.sum(axis=0))):
+            raise ValueError("can't sample from a class without examples")
+        draws = [numpy.split(self._draw(class_members, class_counts.sum()),
+                             numpy.cumsum(class_counts)[:-1])
+                 if len(class_members) else None
+                 for class_members, class_counts in zip(members, counts.T)]
+        batches = [numpy.concatenate([class_draws[i] for class_draws in draws
+                                      if class_draws is not None]).tolist()
+                   for i in xrange(num_batches)]
+        return iter_(batches)
+
+
+class ShardedScheme(IterationScheme):
+    """Split the requests of an iteration scheme between workers.
+
+    Each of `world_size` workers (e.g. the processes of a data-parallel
+    job) wraps the same iteration scheme in a :class:`ShardedScheme` with
+    its own `rank`, and iterates over its share of the requests only.
+
+    Parameters
+    ----------
+    scheme : :class:`IterationScheme`
+        The scheme whose requests to split. Its requests must be finite.
+    rank : int
+        The index of this worker, in ``[0, world_size)``.
+    world_size : int
+        The number of workers.
+    remainder : 'pad' or 'drop', optional
+        What to do when the number of requests is not a multiple of
+        `world_size`. If 'pad' (the default), requests from the start of
+        the epoch are repeated; if 'drop', the last requests are dropped.
+        Either way, all workers get the same number of requests.
+    contiguous : bool, optional
+        If `True`, each worker gets a contiguous run of requests instead
+        of every `world_size`-th one. For a :class:`SequentialScheme`
+        this means every worker reads its own region of the data.
+        Defaults to `False`.
+    seed : int, optional
+        If the wrapped scheme has a `rng` attribute, it is seeded with
+        ``seed + epoch`` at the start of every epoch, so that all
+        workers agree on the order of the requests without having to
+        communicate. Defaults to ``config.default_seed``.
+
+    Notes
+    -----
+    All the requests of an epoch are generated up front on every worker,
+    which is what allows them to be split evenly.
+
+    """
+    def __init__(self, scheme, rank, world_size, remainder='pad',
+                 contiguous=False, seed=None):
+        if not 0 <= rank < world_size:
+            raise ValueError("rank should be in [0, {}), got {}"
+                             .format(world_size, rank))
+        if remainder not in ('pad', 'drop'):
+            raise ValueError("remainder should be 'pad' or 'drop', not '{}'"
+                             .format(remainder))
+        self.scheme = scheme
+        self.rank = rank
+        self.world_size = world_size
+        self.remainder = remainder
+        self.contiguous = contiguous
+        self.seed = config.default_seed if seed is None else seed
+        self.epoch = 0
+
+    @property
+    def requests_examples(self):
+        return self.scheme.requests_examples
+
+    def state_dict(self):
+        return {'epoch': self.epoch, 'scheme': self.scheme.state_dict()}
+
+    def load_state_dict(self, state_dict):
+        self.epoch = state_dict['epoch']
+        self.scheme.load_state_dict(state_dict['scheme'])
+
+    def get_request_iterator(self):
+        rng = getattr(self.scheme, 'rng', None)
+        if isinstance(rng, numpy.random.RandomState):
+            rng.seed(self.seed + self.epoch)
+        self.epoch += 1
+        requests = list(self.scheme.get_request_iterator())
+        if self.remainder == 'pad' and requests:
+            num_requests = -(-len(requests) // self.world_size)
+            requests = [requests[i % len(requests)]
+                        for i in xrange(num_requests * self.world_size)]
+        if self.contiguous:
+            return iter_(requests[shard_slice(
+                len(requests), self.rank, self.world_size)])
+        num_requests = len(requests) // self.world_size
+        return iter_(requests[self.rank::self.world_size][:num_requests])
+
+
 def cross_validation(scheme_class, num_examples, num_folds, strict=True,
                      **kwargs):
     """Return pairs of schemes to be used for cross-validation.
@@ -71,16 +71,35 @@ def recv_arrays(socket):
     arrays = []
     for header in headers:
         data = socket.recv()
-        buf = buffer_(data)
-        array = numpy.frombuffer(buf, dtype=numpy.dtype(header['descr']))
-        array.shape = header['shape']
-        if header['fortran_order']:
-            array.shape = header['shape'][::-1]
-            array = array.transpose()
-        arrays.append(array)
+        arrays.append(array_from_buffer(header, data))
     return arrays
 
 
+def array_from_buffer(header, data):
+    """Reconstruct a NumPy array sent by :func:`send_arrays`.
+
+    Parameters
+    ----------
+    header : dict
+        The ``.npy`` format description of the array.
+    data : bytes
+        The raw contents of the array.
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+        A read-only array sharing memory with `data`.
+
+    """
+    buf = buffer_(data)
+    array = numpy.frombuffer(buf, dtype=numpy.dtype(header['descr']))
+    array.shape = header['shape']
+    if header['fortran_order']:
+        array.shape = header['shape'][::-1]
+        array = array.transpose()
+    return array
+
+
 def start_server(data_stream, port=5557, hwm=10):
     """Start a data processing server.
 
@@ -1,10 +1,8 @@
 from abc import ABCMeta, abstractmethod
 
-import zmq
 from six import add_metaclass, iteritems
 
-from fuel.iterator import DataIterator
-from fuel.server import recv_arrays
+from fuel.iterator import DataIterator, SourceTuple
 
 
 @add_metaclass(ABCMeta)
@@ -92,9 +90,102 @@ class AbstractDataStream(object):
 
     @abstractmethod
     def get_epoch_iterator(self, as_dict=False):
-        return DataIterator(self, self.iteration_scheme.get_request_iterator()
-                            if self.iteration_scheme else None,
-                            as_dict=as_dict)
+        resume_state = getattr(self, '_resume_state', None)
+        self._resume_state = None
+        if self.iteration_scheme:
+            if resume_state is not None:
+                self.iteration_scheme.load_state_dict(
+                    resume_state['iteration_scheme'])
+            self._epoch_scheme_state = self.iteration_scheme.state_dict()
+            request_iterator = self.iteration_scheme.get_request_iterator()
+        else:
+            request_iterator = None
+        self._epoch_iterator = DataIterator(self, request_iterator,
+                                            as_dict=as_dict)
+        if resume_state is not None:
+            self._fast_forward(self._epoch_iterator,
+                               resume_state['position'])
+        return self._epoch_iterator
+
+    def state_dict(self):
+        """Return the iteration state of the data stream.
+
+        The state consists of the state of the iteration scheme at the
+        start of the current epoch and the number of steps taken since.
+        Together, these allow an epoch to be resumed without reading the
+        data that was already returned.
+
+        Returns
+        -------
+        dict
+            A picklable dictionary that can be passed to
+            :meth:`load_state_dict`.
+
+        """
+        epoch_iterator = getattr(self, '_epoch_iterator', None)
+        state_dict = {'position': (epoch_iterator.position
+                                   if epoch_iterator is not None else 0)}
+        if self.iteration_scheme:
+            state_dict['iteration_scheme'] = getattr(
+                self, '_epoch_scheme_state',
+                self.iteration_scheme.state_dict())
+        return state_dict
+
+    def load_state_dict(self, state_dict):
+        """Resume from a state returned by :meth:`state_dict`.
+
+        The state is applied when the next epoch iterator is requested,
+        which continues the checkpointed epoch where it left off.
+
+        Parameters
+        ----------
+        state_dict : dict
+            The state to restore.
+
+        """
+        self._resume_state = state_dict
+
+    def _fast_forward(self, epoch_iterator, position):
+        """Move a new epoch iterator to a checkpointed position.
+
+        Streams without an iteration scheme rely on the streams they wrap
+        to be fast-forwarded instead.
+
+        """
+        if epoch_iterator.request_iterator is not None:
+            epoch_iterator.seek(position)
+
+    def aget_epoch_iterator(self, as_dict=False, prefetch=1, executor=None):
+        """Get an asynchronous iterator over the next epoch.
+
+        The asynchronous counterpart of :meth:`get_epoch_iterator`, for use
+        with ``async for``. By default the data is read in a background
+        thread, so that many data streams can be consumed concurrently
+        from a single event loop. Requires Python 3.5 or newer.
+
+        Parameters
+        ----------
+        as_dict : bool, optional
+            If `True`, return dictionaries mapping source names to data
+            from each source. If `False` (default), return tuples.
+        prefetch : int, optional
+            The number of batches (or examples) to read ahead. If 0, each
+            batch is read on demand in `executor`. Defaults to 1.
+        executor : :class:`concurrent.futures.Executor`, optional
+            The executor used when `prefetch` is 0. Defaults to the event
+            loop's default executor.
+
+        Returns
+        -------
+        :class:`.AsyncDataIterator`
+            An asynchronous iterator over the epoch.
+
+        """
+        from fuel.async_iterator import AsyncDataIterator
+        epoch_iterator = self.get_epoch_iterator(as_dict=as_dict)
+        self._epoch_iterator = AsyncDataIterator(epoch_iterator, prefetch,
+                                                 executor)
+        return self._epoch_iterator
 
     def iterate_epochs(self, as_dict=False):
         """Allow iteration through all epochs.
@@ -164,7 +255,8 @@ class DataStream(AbstractDataStream):
 
     def get_data(self, request=None):
         """Get data from the dataset."""
-        return self.dataset.get_data(self.data_state, request)
+        return SourceTuple.for_sources(self.sources)(
+            self.dataset.get_data(self.data_state, request))
 
     def get_epoch_iterator(self, **kwargs):
         """Get an epoch iterator for the data stream."""
@@ -174,6 +266,11 @@ class DataStream(AbstractDataStream):
             self._fresh_state = False
         return super(DataStream, self).get_epoch_iterator(**kwargs)
 
+    def _fast_forward(self, epoch_iterator, position):
+        # Without an iteration scheme the dataset's state can only be moved
+        # forward by reading from it.
+        epoch_iterator.seek(position)
+
     @classmethod
     def default_stream(cls, dataset, **kwargs):
         data_stream = cls(dataset, **kwargs)
@@ -216,9 +313,13 @@ class ServerDataStream(AbstractDataStream):
         self.host = host
         self.port = port
         self.hwm = hwm
+        self.async_socket = None
         self.connect()
 
     def connect(self):
+        # ZeroMQ is only imported when a server stream is used
+        import zmq
+        self.disconnect_async()
         context = zmq.Context()
         self.socket = socket = context.socket(zmq.PULL)
         socket.set_hwm(self.hwm)
@@ -228,14 +329,41 @@ class ServerDataStream(AbstractDataStream):
     def get_data(self, request=None):
         if request is not None:
             raise ValueError
+        from fuel.server import recv_arrays
         if not self.connected:
             self.connect()
         data = recv_arrays(self.socket)
-        return tuple(data)
+        return SourceTuple.for_sources(self.sources)(data)
 
     def get_epoch_iterator(self, **kwargs):
         return super(ServerDataStream, self).get_epoch_iterator(**kwargs)
 
+    def aget_epoch_iterator(self, as_dict=False, **kwargs):
+        """Get an asynchronous iterator over the next epoch.
+
+        Batches are received on a :mod:`zmq.asyncio` socket instead of
+        being read in a thread, so any `prefetch` and `executor`
+        arguments are ignored; use the `hwm` to control buffering.
+
+        """
+        from fuel.async_iterator import (ServerAsyncDataIterator,
+                                         connect_async)
+        # The server distributes batches over all connected sockets, so
+        # the blocking socket must be closed for it not to receive any
+        if self.connected:
+            self.socket.close()
+            self.connected = False
+        if self.async_socket is None:
+            self.async_socket = connect_async(self.host, self.port,
+                                              self.hwm)
+        self._epoch_iterator = ServerAsyncDataIterator(self, as_dict)
+        return self._epoch_iterator
+
+    def disconnect_async(self):
+        if getattr(self, 'async_socket', None) is not None:
+            self.async_socket.close()
+            self.async_socket = None
+
     def close(self):
         pass
 
@@ -249,4 +377,5 @@ class ServerDataStream(AbstractDataStream):
         state = self.__dict__.copy()
         state['connected'] = False
         del state['socket']
+        state['async_socket'] = None
         return state
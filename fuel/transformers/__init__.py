@@ -1,15 +1,20 @@
 from abc import ABCMeta, abstractmethod
 from collections import defaultdict
+from functools import partial
 import logging
 from multiprocessing import Process, Queue
+import threading
 
 import numpy
 from picklable_itertools import chain, ifilter, izip
 from six import add_metaclass, iteritems
+from six.moves import queue
 
 from fuel import config
+from fuel.iterator import SourceTuple
 from fuel.streams import AbstractDataStream
 from fuel.schemes import BatchSizeScheme
+from fuel.utils import lazy_module_attributes
 from ..exceptions import AxisLabelsMismatchError
 
 log = logging.getLogger(__name__)
@@ -132,6 +137,34 @@ class Transformer(AbstractDataStream):
         self.child_epoch_iterator = self.data_stream.get_epoch_iterator()
         return super(Transformer, self).get_epoch_iterator(**kwargs)
 
+    def state_dict(self):
+        """Return the iteration state of the transformer.
+
+        Besides the state of the transformer's own iteration scheme (if
+        any), this includes the state of the wrapped data stream and the
+        state of the transformer's `rng` attribute, if it has one.
+
+        Notes
+        -----
+        Transformers which hold on to data between calls (e.g. to cache
+        or prefetch it) are resumed at the position of the wrapped
+        stream, so the data they held at the time of the checkpoint is
+        skipped.
+
+        """
+        state_dict = super(Transformer, self).state_dict()
+        state_dict['data_stream'] = self.data_stream.state_dict()
+        rng = getattr(self, 'rng', None)
+        if isinstance(rng, numpy.random.RandomState):
+            state_dict['rng'] = rng.get_state()
+        return state_dict
+
+    def load_state_dict(self, state_dict):
+        super(Transformer, self).load_state_dict(state_dict)
+        self.data_stream.load_state_dict(state_dict['data_stream'])
+        if 'rng' in state_dict:
+            self.rng.set_state(state_dict['rng'])
+
     def get_data(self, request=None):
         if request is not None:
             raise ValueError
@@ -233,16 +266,66 @@ class SourcewiseTransformer(Transformer):
     which_sources : tuple of str, optional
         Which sources to apply the mapping to. Defaults to `None`, in
         which case the mapping is applied to all sources.
+    inplace : bool, optional
+        If `True`, transformers that support it return views of their
+        input instead of copies, and write their output into arrays that
+        are reused for the next batch (see :meth:`get_buffer`). The data
+        returned is then only valid until the next batch is requested,
+        so this must not be used when the consumer keeps data around
+        (e.g. below :class:`Batch`, :class:`Cache` or a prefetching
+        stream). Defaults to `False`.
 
     """
     def __init__(self, data_stream, produces_examples, which_sources=None,
-                 **kwargs):
+                 inplace=False, **kwargs):
         if which_sources is None:
             which_sources = data_stream.sources
         self.which_sources = which_sources
+        self.inplace = inplace
         super(SourcewiseTransformer, self).__init__(
             data_stream, produces_examples, **kwargs)
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_buffers', None)
+        return state
+
+    def get_buffer(self, source_name, shape, dtype):
+        """Return an output array that is reused between batches.
+
+        One array is kept per source and dtype, and reallocated when the
+        requested shape changes (e.g. for the last batch of an epoch).
+
+        Parameters
+        ----------
+        source_name : str
+            The name of the source the array is for.
+        shape : tuple of int
+            The shape of the array.
+        dtype : :class:`numpy.dtype`
+            The dtype of the array.
+
+        Returns
+        -------
+        :class:`numpy.ndarray`
+            An uninitialized array, which may have been returned for a
+            previous batch.
+
+        """
+        if not hasattr(self, '_buffers'):
+            self._buffers = {}
+        key = (source_name, numpy.dtype(dtype))
+        buffer_ = self._buffers.get(key)
+        if buffer_ is None or buffer_.shape != shape:
+            buffer_ = self._buffers[key] = numpy.empty(shape, dtype)
+        return buffer_
+
+    def _get_allocator(self, source_name):
+        """An `allocate` function for :func:`apply_elementwise_steps`."""
+        if not self.inplace:
+            return None
+        return partial(self.get_buffer, source_name)
+
     def _apply_sourcewise_transformation(self, data, method):
         data = list(data)
         for i, source_name in enumerate(self.data_stream.sources):
@@ -319,6 +402,23 @@ class AgnosticSourcewiseTransformer(AgnosticTransformer,
 
         """
 
+    def get_elementwise_steps(self):
+        """Describe the transformation as a sequence of elementwise steps.
+
+        Transformers that return steps can be combined with adjacent ones
+        by :func:`fuse`. Subclasses that override `transform_any_source`
+        must override this method as well.
+
+        Returns
+        -------
+        list or None
+            A list of steps as understood by
+            :func:`apply_elementwise_steps`, or `None` (default) if the
+            transformation can't be fused.
+
+        """
+        return None
+
 
 class Flatten(SourcewiseTransformer):
     """Flattens selected sources.
@@ -356,6 +456,8 @@ class Flatten(SourcewiseTransformer):
         return axis_labels
 
     def transform_source_example(self, source_example, _):
+        if self.inplace:
+            return numpy.asarray(source_example).reshape(-1)
         return numpy.asarray(source_example).flatten()
 
     def transform_source_batch(self, source_batch, _):
@@ -384,8 +486,59 @@ class ScaleAndShift(AgnosticSourcewiseTransformer):
         super(ScaleAndShift, self).__init__(
             data_stream, data_stream.produces_examples, **kwargs)
 
-    def transform_any_source(self, source_data, _):
-        return numpy.asarray(source_data) * self.scale + self.shift
+    def transform_any_source(self, source_data, source_name):
+        return apply_elementwise_steps(source_data,
+                                       self.get_elementwise_steps(),
+                                       self._get_allocator(source_name))
+
+    def get_elementwise_steps(self):
+        return [('scale_and_shift', self.scale, self.shift)]
+
+
+class Normalize(AgnosticSourcewiseTransformer):
+    """Normalizes selected sources to zero mean and unit variance.
+
+    Each source is transformed as ``(x - mean) / (std + epsilon)``, in
+    ``fuel.config.floatX``. Incoming sources will be treated as numpy
+    arrays (i.e. using `numpy.asarray`).
+
+    Parameters
+    ----------
+    stats : dict
+        Maps the names of the sources to normalize to their statistics,
+        either as :class:`~fuel.utils.stats.RunningStats` (e.g. as
+        returned by :func:`~fuel.utils.stats.get_stats`) or as
+        ``(mean, std)`` pairs. The mean and standard deviation must
+        broadcast against the examples, e.g. have a shape of
+        ``(channels, 1, 1)`` for per-channel statistics of images.
+    epsilon : float, optional
+        Added to the standard deviation to avoid divisions by zero.
+        Defaults to 1e-8.
+
+    """
+    def __init__(self, data_stream, stats, epsilon=1e-8, **kwargs):
+        self.scales_and_shifts = {}
+        for source, source_stats in iteritems(stats):
+            if hasattr(source_stats, 'mean'):
+                mean, std = source_stats.mean, source_stats.std
+            else:
+                mean, std = source_stats
+            scale = 1. / (numpy.asarray(std, dtype='float64') + epsilon)
+            self.scales_and_shifts[source] = (
+                scale.astype(config.floatX),
+                (-numpy.asarray(mean) * scale).astype(config.floatX))
+        kwargs.setdefault('which_sources', tuple(
+            source for source in data_stream.sources if source in stats))
+        if data_stream.axis_labels:
+            kwargs.setdefault('axis_labels', data_stream.axis_labels.copy())
+        super(Normalize, self).__init__(
+            data_stream, data_stream.produces_examples, **kwargs)
+
+    def transform_any_source(self, source_data, source_name):
+        scale, shift = self.scales_and_shifts[source_name]
+        return apply_elementwise_steps(
+            source_data, [('scale_and_shift', scale, shift)],
+            self._get_allocator(source_name))
 
 
 class Cast(AgnosticSourcewiseTransformer):
@@ -410,9 +563,16 @@ class Cast(AgnosticSourcewiseTransformer):
         super(Cast, self).__init__(
             data_stream, data_stream.produces_examples, **kwargs)
 
-    def transform_any_source(self, source_data, _):
+    def transform_any_source(self, source_data, source_name):
+        if self.inplace:
+            return apply_elementwise_steps(source_data,
+                                           self.get_elementwise_steps(),
+                                           self._get_allocator(source_name))
         return numpy.asarray(source_data, dtype=self.dtype)
 
+    def get_elementwise_steps(self):
+        return [('cast', self.dtype)]
+
 
 class ForceFloatX(AgnosticSourcewiseTransformer):
     """Force all floating point numpy arrays to be floatX."""
@@ -422,7 +582,11 @@ class ForceFloatX(AgnosticSourcewiseTransformer):
         super(ForceFloatX, self).__init__(
             data_stream, data_stream.produces_examples, **kwargs)
 
-    def transform_any_source(self, source_data, _):
+    def transform_any_source(self, source_data, source_name):
+        if self.inplace:
+            return apply_elementwise_steps(source_data,
+                                           self.get_elementwise_steps(),
+                                           self._get_allocator(source_name))
         source_needs_casting = (isinstance(source_data, numpy.ndarray) and
                                 source_data.dtype.kind == "f" and
                                 source_data.dtype != config.floatX)
@@ -430,6 +594,172 @@ class ForceFloatX(AgnosticSourcewiseTransformer):
             source_data = source_data.astype(config.floatX)
         return source_data
 
+    def get_elementwise_steps(self):
+        return [('force_floatx',)]
+
+
+def _step_dtype(dtype, step):
+    """The dtype an array of `dtype` has after a casting step."""
+    if step[0] == 'cast':
+        return numpy.dtype(step[1])
+    if step[0] == 'force_floatx' and dtype.kind == 'f':
+        return numpy.dtype(config.floatX)
+    return dtype
+
+
+def _cast(source_data, dtype, allocate):
+    """Cast a source, into an allocated array if possible."""
+    if (allocate is None or not isinstance(source_data, numpy.ndarray) or
+            source_data.dtype == dtype):
+        return numpy.asarray(source_data, dtype=dtype)
+    out = allocate(source_data.shape, dtype)
+    numpy.copyto(out, source_data, casting='unsafe')
+    return out
+
+
+def apply_elementwise_steps(source_data, steps, allocate=None):
+    """Apply a sequence of elementwise steps to a source.
+
+    Each step is a tuple whose first element names the operation:
+    ``('scale_and_shift', scale, shift)``, ``('cast', dtype)`` or
+    ``('force_floatx',)``, with the semantics of :class:`ScaleAndShift`,
+    :class:`Cast` and :class:`ForceFloatX` respectively. The scale and
+    shift can also be arrays that broadcast against the source.
+
+    Rather than allocating a new array for every step, the result of a
+    scaling without shift is written directly into an array of the dtype
+    of a following cast, and arrays allocated by an earlier step are
+    reused where their dtype allows it. The result is the same as that of
+    applying the steps one by one.
+
+    Parameters
+    ----------
+    source_data : :class:`numpy.ndarray`
+        An example or a batch of examples from a source.
+    steps : list of tuples
+        The steps to apply, in order.
+    allocate : callable, optional
+        Called with a shape and a dtype to obtain the arrays that results
+        are written to, e.g. to reuse arrays between batches. By default
+        new arrays are allocated.
+
+    """
+    owned = False
+    for i, step in enumerate(steps):
+        if step[0] != 'scale_and_shift':
+            if step[0] == 'cast':
+                converted = _cast(source_data, step[1], allocate)
+            elif (isinstance(source_data, numpy.ndarray) and
+                    source_data.dtype.kind == 'f' and
+                    source_data.dtype != config.floatX):
+                converted = _cast(source_data, config.floatX, allocate)
+            else:
+                converted = source_data
+            owned = owned or converted is not source_data
+            source_data = converted
+            continue
+        _, scale, shift = step
+        source_data = numpy.asarray(source_data)
+        if not source_data.ndim:
+            source_data, owned = source_data * scale + shift, True
+            continue
+        # The dtypes that `source_data * scale + shift` is computed in
+        scale_dtype = numpy.result_type(source_data, scale)
+        shift_dtype = numpy.result_type(scale_dtype, shift)
+        out_dtype = shift_dtype
+        if not numpy.any(shift) and i + 1 < len(steps):
+            # Casting before the shift is added would change the result
+            out_dtype = _step_dtype(out_dtype, steps[i + 1])
+        if owned and source_data.dtype == out_dtype:
+            out = source_data
+        elif allocate is not None:
+            out = allocate(source_data.shape, out_dtype)
+        else:
+            out = numpy.empty_like(source_data, dtype=out_dtype)
+        numpy.multiply(source_data, scale, out=out, dtype=scale_dtype,
+                       casting='unsafe')
+        if numpy.any(shift):
+            numpy.add(out, shift, out=out, dtype=shift_dtype,
+                      casting='unsafe')
+        source_data, owned = out, True
+    return source_data
+
+
+class ElementwiseFusion(AgnosticSourcewiseTransformer):
+    """Applies the steps of several elementwise transformers at once.
+
+    Instances are normally created by :func:`fuse`.
+
+    Parameters
+    ----------
+    data_stream : :class:`AbstractDataStream` or :class:`Transformer`
+        The data stream.
+    steps : dict
+        Maps source names to lists of elementwise steps, see
+        :func:`apply_elementwise_steps`. Sources not in the dictionary
+        are passed through unchanged.
+
+    """
+    def __init__(self, data_stream, steps, **kwargs):
+        self.steps = steps
+        kwargs.setdefault('which_sources', tuple(
+            source for source in data_stream.sources if source in steps))
+        super(ElementwiseFusion, self).__init__(
+            data_stream, data_stream.produces_examples, **kwargs)
+
+    def transform_any_source(self, source_data, source_name):
+        return apply_elementwise_steps(source_data, self.steps[source_name],
+                                       self._get_allocator(source_name))
+
+
+def _is_fusable(data_stream):
+    return (isinstance(data_stream, AgnosticSourcewiseTransformer) and
+            not data_stream.iteration_scheme and
+            not hasattr(data_stream, '_sources') and
+            data_stream.get_elementwise_steps() is not None)
+
+
+def fuse(data_stream):
+    """Fuse adjacent elementwise transformers in a pipeline.
+
+    Every run of two or more directly nested transformers that describe
+    themselves through
+    :meth:`~AgnosticSourcewiseTransformer.get_elementwise_steps` (e.g.
+    :class:`ScaleAndShift` followed by :class:`Cast`) is replaced by a
+    single :class:`ElementwiseFusion` transformer, which allocates one
+    array per source instead of one per transformer. The fused
+    transformer reuses its arrays if all of the transformers it replaces
+    were created with ``inplace=True``.
+
+    Parameters
+    ----------
+    data_stream : :class:`AbstractDataStream`
+        The outermost data stream of the pipeline.
+
+    Returns
+    -------
+    :class:`AbstractDataStream`
+        The outermost data stream of the fused pipeline. Transformers
+        further down the pipeline are modified in place.
+
+    """
+    outermost = data_stream
+    steps = defaultdict(list)
+    num_fused = 0
+    inplace = True
+    while _is_fusable(data_stream):
+        inplace = inplace and data_stream.inplace
+        for source in data_stream.which_sources:
+            steps[source][:0] = data_stream.get_elementwise_steps()
+        data_stream = data_stream.data_stream
+        num_fused += 1
+    if isinstance(data_stream, Transformer):
+        data_stream.data_stream = fuse(data_stream.data_stream)
+    if num_fused < 2:
+        return outermost
+    return ElementwiseFusion(data_stream, dict(steps), inplace=inplace,
+                             axis_labels=outermost.axis_labels)
+
 
 class Filter(Transformer):
     """Filters samples that meet a predicate.
@@ -782,6 +1112,18 @@ class Merge(AbstractDataStream):
                                       for data_stream in self.data_streams]
         return super(Merge, self).get_epoch_iterator(**kwargs)
 
+    def state_dict(self):
+        state_dict = super(Merge, self).state_dict()
+        state_dict['data_streams'] = [data_stream.state_dict()
+                                      for data_stream in self.data_streams]
+        return state_dict
+
+    def load_state_dict(self, state_dict):
+        super(Merge, self).load_state_dict(state_dict)
+        for data_stream, data_stream_state in zip(
+                self.data_streams, state_dict['data_streams']):
+            data_stream.load_state_dict(data_stream_state)
+
     def get_data(self, request=None):
         if request is not None:
             raise ValueError
@@ -791,6 +1133,219 @@ class Merge(AbstractDataStream):
         return tuple(result)
 
 
+class _Failure(object):
+    """Wraps an exception raised while reading ahead."""
+    def __init__(self, exception):
+        self.exception = exception
+
+
+class Multiplex(AbstractDataStream):
+    """Interleaves several data streams, picking one at random each time.
+
+    Unlike :class:`Merge`, which combines the data of all streams, every
+    batch (or example) comes from a single stream, chosen at random
+    according to the given weights.
+
+    Parameters
+    ----------
+    data_streams : list
+        The data streams to interleave. They must provide the same sources
+        and all produce either examples or batches.
+    weights : list of float or callable, optional
+        The probability of picking each stream, up to normalization. If a
+        callable, it is called with the number of times data was returned
+        so far and should return the weights, which allows them to change
+        over time. Defaults to equal weights.
+    restart : bool, optional
+        If `True` (the default), a stream that runs out of data is started
+        again, and this stream continues until `num_steps` is reached (or
+        forever). If `False`, exhausted streams are no longer picked, and
+        the epoch ends when all of them are exhausted.
+    num_steps : int, optional
+        If given, the number of times data is returned per epoch.
+    prefetch : int, optional
+        If positive, each stream is read by its own background thread,
+        which keeps up to `prefetch` batches (or examples) in a queue, so
+        that a slow stream doesn't hold up the others. Defaults to 0, in
+        which case the streams are read when they are picked.
+    rng : :class:`numpy.random.RandomState`, optional
+        The random number generator used to pick streams.
+
+    Notes
+    -----
+    With `restart`, the streams are not restarted at the start of an
+    epoch but continue where they left off, so consecutive epochs see
+    different data. Without it, every epoch reads each stream from its
+    start, whether or not the streams are prefetched.
+
+    A stream whose prefetching thread fails is no longer picked until
+    the next epoch. The threads are stopped by :meth:`close`,
+    :meth:`reset` and :meth:`next_epoch` before the streams are used.
+
+    """
+    def __init__(self, data_streams, weights=None, restart=True,
+                 num_steps=None, prefetch=0, rng=None, **kwargs):
+        if not all(data_stream.sources == data_streams[0].sources
+                   for data_stream in data_streams):
+            raise ValueError('all data streams must provide the same '
+                             'sources')
+        if not all(data_stream.produces_examples ==
+                   data_streams[0].produces_examples
+                   for data_stream in data_streams):
+            raise ValueError('all data streams must produce the same type of '
+                             'output (batches or examples)')
+        if data_streams[0].axis_labels:
+            kwargs.setdefault('axis_labels',
+                              data_streams[0].axis_labels.copy())
+        super(Multiplex, self).__init__(**kwargs)
+        self.data_streams = data_streams
+        self.produces_examples = data_streams[0].produces_examples
+        if weights is None:
+            weights = numpy.ones(len(data_streams))
+        self.weights = weights
+        self.restart = restart
+        self.num_steps = num_steps
+        self.prefetch = prefetch
+        self.rng = rng
+        if self.rng is None:
+            self.rng = numpy.random.RandomState(config.default_seed)
+        self.step = 0
+        self.child_epoch_iterators = [None] * len(data_streams)
+
+    @property
+    def sources(self):
+        return self.data_streams[0].sources
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_queues', None)
+        state.pop('_threads', None)
+        state.pop('_stop_event', None)
+        return state
+
+    def close(self):
+        self._stop_prefetching()
+        for data_stream in self.data_streams:
+            data_stream.close()
+
+    def reset(self):
+        self._stop_prefetching()
+        for data_stream in self.data_streams:
+            data_stream.reset()
+
+    def next_epoch(self):
+        self._stop_prefetching()
+        for data_stream in self.data_streams:
+            data_stream.next_epoch()
+
+    def _prefetch(self, data_stream, data_queue, stop_event):
+        """Read a stream into a queue until it runs out of data."""
+        try:
+            while True:
+                num_returned = 0
+                for data in data_stream.get_epoch_iterator():
+                    if stop_event.is_set():
+                        return
+                    data_queue.put(data)
+                    num_returned += 1
+                if not self.restart or not num_returned:
+                    break
+        except Exception as e:
+            # Passed on to the consumer, which would otherwise wait forever
+            data_queue.put(_Failure(e))
+            return
+        data_queue.put(StopIteration)
+
+    def _stop_prefetching(self):
+        """Stop the prefetching threads, so the streams can be used."""
+        if not getattr(self, '_threads', None):
+            return
+        self._stop_event.set()
+        for data_queue, thread in zip(self._queues, self._threads):
+            while thread.is_alive():
+                # Unblocks the thread if it waits for room in the queue
+                try:
+                    while True:
+                        data_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                thread.join(0.01)
+        self._queues = self._threads = None
+
+    def _start_prefetching(self):
+        """Start a thread reading each stream that isn't read already."""
+        if not getattr(self, '_threads', None):
+            self._stop_event = threading.Event()
+            self._queues = [None] * len(self.data_streams)
+            self._threads = [None] * len(self.data_streams)
+        for i, data_stream in enumerate(self.data_streams):
+            if self._threads[i] is None or not self._threads[i].is_alive():
+                self._queues[i] = queue.Queue(self.prefetch)
+                self._threads[i] = threading.Thread(
+                    target=self._prefetch,
+                    args=(data_stream, self._queues[i], self._stop_event))
+                self._threads[i].daemon = True
+                self._threads[i].start()
+
+    def get_epoch_iterator(self, **kwargs):
+        if self.prefetch > 0:
+            if not self.restart:
+                # Like the streams read directly, each epoch starts anew
+                self._stop_prefetching()
+            self._start_prefetching()
+        else:
+            for i, data_stream in enumerate(self.data_streams):
+                if not self.restart or self.child_epoch_iterators[i] is None:
+                    self.child_epoch_iterators[i] = (
+                        data_stream.get_epoch_iterator())
+        self.active = numpy.ones(len(self.data_streams), dtype=bool)
+        self.epoch_steps = 0
+        return super(Multiplex, self).get_epoch_iterator(**kwargs)
+
+    def _next_from(self, i):
+        """Return data from the `i`-th stream, or `StopIteration`."""
+        if self.prefetch > 0:
+            data = self._queues[i].get()
+            if isinstance(data, _Failure):
+                # The thread has stopped, so the stream isn't picked again
+                # until the next epoch restarts it
+                self.active[i] = False
+                raise data.exception
+            return data
+        try:
+            return next(self.child_epoch_iterators[i])
+        except StopIteration:
+            if not self.restart:
+                return StopIteration
+        self.child_epoch_iterators[i] = (
+            self.data_streams[i].get_epoch_iterator())
+        return next(self.child_epoch_iterators[i], StopIteration)
+
+    def get_data(self, request=None):
+        if request is not None:
+            raise ValueError
+        if self.num_steps is not None and self.epoch_steps >= self.num_steps:
+            raise StopIteration
+        weights = self.weights
+        if callable(weights):
+            weights = weights(self.step)
+        while True:
+            # Recomputed from scratch, since subtracting the weight of an
+            # exhausted stream could leave a rounding error behind
+            cumulative = numpy.where(self.active, weights, 0).cumsum()
+            if not cumulative[-1] > 0:
+                raise StopIteration
+            i = numpy.searchsorted(
+                cumulative, self.rng.uniform(0, cumulative[-1]),
+                side='right')
+            data = self._next_from(i)
+            if data is not StopIteration:
+                self.step += 1
+                self.epoch_steps += 1
+                return data
+            self.active[i] = False
+
+
 class BackgroundProcess(object):
     """A background process that reads batches and stores them in a queue.
 
@@ -897,7 +1452,7 @@ class Rename(AgnosticTransformer):
             data_stream, data_stream.produces_examples, **kwargs)
 
     def transform_any(self, data):
-        return data
+        return SourceTuple.for_sources(self.sources)(data)
 
 
 class FilterSources(AgnosticTransformer):
@@ -929,7 +1484,15 @@ class FilterSources(AgnosticTransformer):
 
         # keep order of data_stream.sources
         self.sources = tuple(s for s in data_stream.sources if s in sources)
+        self.indices = [i for i, s in enumerate(data_stream.sources)
+                        if s in sources]
 
     def transform_any(self, data):
-        return [d for d, s in izip(data, self.data_stream.sources)
-                if s in self.sources]
+        return SourceTuple.for_sources(self.sources)(
+            [data[i] for i in self.indices])
+
+
+lazy_module_attributes(__name__, {
+    'defaults': 'fuel.transformers.defaults',
+    'image': 'fuel.transformers.image',
+    'sequences': 'fuel.transformers.sequences'})
@@ -1,5 +1,8 @@
 cimport cython
 from cython.parallel cimport prange
+from libc.math cimport floor
+
+import numpy
 
 
 ctypedef long Py_intptr_t
@@ -58,3 +61,299 @@ cpdef window_batch_bchw(image_dtype[:, :, :, :] batch,
             h_extent = h_off + window_height
             w_extent = w_off + window_width
             out[index] = batch[index, :, h_off:h_extent, w_off:w_extent]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef window_list_bchw(object images, long[:] height_offsets,
+                       long[:] width_offsets, image_dtype[:, :, :, :] out):
+    """window_list_bchw(images, height_offsets, width_offsets, out)
+
+    Perform windowing on a sequence of (channels, height, width) images.
+
+    Parameters
+    ----------
+    images : list or object ndarray
+        A sequence of 3-d arrays, all with the same number of channels
+        and the same dtype as `out`, but possibly of different heights
+        and widths.
+    height_offsets : memoryview, integer, 1-dimensional
+        An array of offsets for the height dimension of each image.
+    width_offsets : memoryview, integer, 1-dimensional
+        An array of offsets for the width dimension of each image.
+    out : memoryview
+        The `(batch, channels, window_height, window_width)` array to
+        which to write output. It is assumed that
+        `out.shape[2] + height_offsets[i] <= images[i].shape[1]` and
+        `out.shape[3] + width_offsets[i] <= images[i].shape[2]`, for
+        all values of `i`.
+
+    Notes
+    -----
+    The data pointers and strides of the images are gathered while
+    holding the GIL, after which the windows are copied in parallel via
+    OpenMP. Set `OMP_NUM_THREADS` to benefit from this parallelism.
+
+    This is a low-level utility that, for the sake of speed, does
+    not check its input for validity beyond what Cython memoryviews
+    enforce (number of dimensions and dtype).
+
+    """
+    cdef Py_intptr_t index, c, i, j
+    cdef Py_intptr_t num_images = len(images)
+    cdef Py_intptr_t window_width = out.shape[3]
+    cdef Py_intptr_t window_height = out.shape[2]
+    cdef image_dtype[:, :, :] image
+    cdef Py_intptr_t[:] addresses = numpy.empty(num_images, dtype=numpy.intp)
+    cdef Py_intptr_t[:, :] strides = numpy.empty((num_images, 3),
+                                                 dtype=numpy.intp)
+    cdef char* base
+    for index in range(num_images):
+        image = images[index]
+        if image.shape[0] != out.shape[1]:
+            raise ValueError("all images must have {} channels".format(
+                out.shape[1]))
+        addresses[index] = <Py_intptr_t>&image[0, 0, 0]
+        strides[index, 0] = image.strides[0]
+        strides[index, 1] = image.strides[1]
+        strides[index, 2] = image.strides[2]
+    with nogil:
+        for index in prange(num_images):
+            base = (<char*>addresses[index] +
+                    height_offsets[index] * strides[index, 1] +
+                    width_offsets[index] * strides[index, 2])
+            for c in range(out.shape[1]):
+                for i in range(window_height):
+                    for j in range(window_width):
+                        out[index, c, i, j] = (<image_dtype*>(
+                            base + c * strides[index, 0] +
+                            i * strides[index, 1] +
+                            j * strides[index, 2]))[0]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef flip_batch_bchw(image_dtype[:, :, :, :] batch,
+                      unsigned char[:] flip_height,
+                      unsigned char[:] flip_width,
+                      image_dtype[:, :, :, :] out):
+    """flip_batch_bchw(batch, flip_height, flip_width, out)
+
+    Flip a (batch, channels, height, width) image tensor per image.
+
+    Parameters
+    ----------
+    batch : memoryview, 4-dimensional
+        A 4-d tensor containing a batch of images in the expected
+        format above.
+    flip_height : memoryview, uint8, 1-dimensional
+        Non-zero entries mark images to be flipped along the height
+        axis (i.e. vertically).
+    flip_width : memoryview, uint8, 1-dimensional
+        Non-zero entries mark images to be flipped along the width
+        axis (i.e. horizontally).
+    out : memoryview
+        The array to which to write output. Must have the same shape
+        as `batch` and must not share memory with it.
+
+    Notes
+    -----
+    Operates on a batch in parallel via OpenMP. Set `OMP_NUM_THREADS`
+    to benefit from this parallelism.
+
+    This is a low-level utility that, for the sake of speed, does
+    not check its input for validity.
+
+    """
+    cdef Py_intptr_t index, c, i, j, src_i, src_j
+    cdef Py_intptr_t height = batch.shape[2]
+    cdef Py_intptr_t width = batch.shape[3]
+    with nogil:
+        for index in prange(batch.shape[0]):
+            for c in range(batch.shape[1]):
+                for i in range(height):
+                    if flip_height[index]:
+                        src_i = height - 1 - i
+                    else:
+                        src_i = i
+                    for j in range(width):
+                        if flip_width[index]:
+                            src_j = width - 1 - j
+                        else:
+                            src_j = j
+                        out[index, c, i, j] = batch[index, c, src_i, src_j]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef inline double _sample(image_dtype[:, :, :, :] batch, Py_intptr_t index,
+                           Py_intptr_t c, double y, double x, bint bilinear,
+                           double fill) nogil:
+    cdef Py_intptr_t height = batch.shape[2]
+    cdef Py_intptr_t width = batch.shape[3]
+    cdef Py_intptr_t y0, x0, y1, x1
+    cdef double dy, dx, v00, v01, v10, v11
+    if not bilinear:
+        y0 = <Py_intptr_t>floor(y + 0.5)
+        x0 = <Py_intptr_t>floor(x + 0.5)
+        if y0 < 0 or y0 >= height or x0 < 0 or x0 >= width:
+            return fill
+        return batch[index, c, y0, x0]
+    y0 = <Py_intptr_t>floor(y)
+    x0 = <Py_intptr_t>floor(x)
+    y1 = y0 + 1
+    x1 = x0 + 1
+    dy = y - y0
+    dx = x - x0
+    if y0 >= 0 and y0 < height and x0 >= 0 and x0 < width:
+        v00 = batch[index, c, y0, x0]
+    else:
+        v00 = fill
+    if y0 >= 0 and y0 < height and x1 >= 0 and x1 < width:
+        v01 = batch[index, c, y0, x1]
+    else:
+        v01 = fill
+    if y1 >= 0 and y1 < height and x0 >= 0 and x0 < width:
+        v10 = batch[index, c, y1, x0]
+    else:
+        v10 = fill
+    if y1 >= 0 and y1 < height and x1 >= 0 and x1 < width:
+        v11 = batch[index, c, y1, x1]
+    else:
+        v11 = fill
+    return ((1 - dy) * ((1 - dx) * v00 + dx * v01) +
+            dy * ((1 - dx) * v10 + dx * v11))
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef affine_warp_batch_bchw(image_dtype[:, :, :, :] batch,
+                             double[:, :, :] matrices,
+                             image_dtype[:, :, :, :] out,
+                             bint bilinear=False, double fill=0):
+    """affine_warp_batch_bchw(batch, matrices, out, bilinear=False, fill=0)
+
+    Apply a per-image affine warp to a (batch, channels, height, width)
+    image tensor.
+
+    Parameters
+    ----------
+    batch : memoryview, 4-dimensional
+        A 4-d tensor containing a batch of images in the expected
+        format above.
+    matrices : memoryview, double, 3-dimensional
+        A `(batch, 2, 3)` tensor of affine matrices. Each matrix maps
+        the `(row, column, 1)` coordinates of an output pixel to the
+        `(row, column)` coordinates in the input image it is sampled
+        from, i.e. it is the *inverse* of the transformation applied to
+        the image.
+    out : memoryview
+        The array to which to write output. Its height and width may
+        differ from those of `batch`.
+    bilinear : bool, optional
+        Use bilinear interpolation instead of nearest neighbour
+        sampling. Defaults to `False`.
+    fill : float, optional
+        The value of pixels sampled from outside of the input image.
+        Defaults to 0.
+
+    Notes
+    -----
+    Operates on a batch in parallel via OpenMP. Set `OMP_NUM_THREADS`
+    to benefit from this parallelism.
+
+    Integer outputs are rounded and clipped to the range of the dtype.
+
+    This is a low-level utility that, for the sake of speed, does
+    not check its input for validity.
+
+    """
+    cdef Py_intptr_t index, c, i, j
+    cdef double y, x, value
+    with nogil:
+        for index in prange(batch.shape[0]):
+            for c in range(batch.shape[1]):
+                for i in range(out.shape[2]):
+                    for j in range(out.shape[3]):
+                        y = (matrices[index, 0, 0] * i +
+                             matrices[index, 0, 1] * j +
+                             matrices[index, 0, 2])
+                        x = (matrices[index, 1, 0] * i +
+                             matrices[index, 1, 1] * j +
+                             matrices[index, 1, 2])
+                        value = _sample(batch, index, c, y, x, bilinear,
+                                        fill)
+                        if image_dtype is cython.uchar:
+                            value = floor(value + 0.5)
+                            if value < 0:
+                                value = 0
+                            elif value > 255:
+                                value = 255
+                        out[index, c, i, j] = <image_dtype>value
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cpdef brightness_contrast_batch_bchw(image_dtype[:, :, :, :] batch,
+                                     double[:] brightness,
+                                     double[:] contrast,
+                                     image_dtype[:, :, :, :] out):
+    """brightness_contrast_batch_bchw(batch, brightness, contrast, out)
+
+    Adjust the brightness and contrast of each image in a
+    (batch, channels, height, width) image tensor.
+
+    Parameters
+    ----------
+    batch : memoryview, 4-dimensional
+        A 4-d tensor containing a batch of images in the expected
+        format above.
+    brightness : memoryview, double, 1-dimensional
+        An offset added to every pixel of each image.
+    contrast : memoryview, double, 1-dimensional
+        A factor by which the deviation of each pixel from the mean of
+        its image is scaled.
+    out : memoryview
+        The array to which to write output. Must have the same shape
+        as `batch`; it may be `batch` itself.
+
+    Notes
+    -----
+    Each output pixel is computed as
+    ``(pixel - mean) * contrast + mean + brightness``, where `mean` is
+    taken over all channels and pixels of the image. Integer outputs
+    are rounded and clipped to the range of the dtype.
+
+    Operates on a batch in parallel via OpenMP. Set `OMP_NUM_THREADS`
+    to benefit from this parallelism.
+
+    This is a low-level utility that, for the sake of speed, does
+    not check its input for validity.
+
+    """
+    cdef Py_intptr_t index, c, i, j
+    cdef double mean, value
+    cdef Py_intptr_t size = batch.shape[1] * batch.shape[2] * batch.shape[3]
+    with nogil:
+        for index in prange(batch.shape[0]):
+            mean = 0
+            for c in range(batch.shape[1]):
+                for i in range(batch.shape[2]):
+                    for j in range(batch.shape[3]):
+                        mean = mean + batch[index, c, i, j]
+            if size > 0:
+                mean = mean / size
+            for c in range(batch.shape[1]):
+                for i in range(batch.shape[2]):
+                    for j in range(batch.shape[3]):
+                        value = ((batch[index, c, i, j] - mean) *
+                                 contrast[index] + mean + brightness[index])
+                        if image_dtype is cython.uchar:
+                            value = floor(value + 0.5)
+                            if value < 0:
+                                value = 0
+                            elif value > 255:
+                                value = 255
+                        out[index, c, i, j] = <image_dtype>value
@@ -1,6 +1,5 @@
 """Commonly-used default transformers."""
 from fuel.transformers import ScaleAndShift, Cast, SourcewiseTransformer
-from fuel.transformers.image import ImagesFromBytes
 
 
 def uint8_pixels_to_floatX(which_sources):
@@ -38,5 +37,7 @@ class ToBytes(SourcewiseTransformer):
 
 
 def rgb_images_from_encoded_bytes(which_sources):
+    # Imported here so that using the other defaults doesn't require PIL
+    from fuel.transformers.image import ImagesFromBytes
     return ((ToBytes, [], {'which_sources': ('encoded_images',)}),
             (ImagesFromBytes, [], {'which_sources': ('encoded_images',)}))
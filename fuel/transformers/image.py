@@ -1,13 +1,19 @@
 from __future__ import division
+from abc import ABCMeta, abstractmethod
+from collections import defaultdict
 from io import BytesIO
 import math
+from multiprocessing.pool import ThreadPool
 
 import numpy
 from PIL import Image
-from six import PY3
+from six import PY3, add_metaclass
 
 try:
-    from ._image import window_batch_bchw
+    from ._image import (window_batch_bchw, window_list_bchw,
+                         flip_batch_bchw,
+                         affine_warp_batch_bchw,
+                         brightness_contrast_batch_bchw)
     window_batch_bchw_available = True
 except ImportError:
     window_batch_bchw_available = False
@@ -117,30 +123,80 @@ class MinimumImageDimensions(SourcewiseTransformer, ExpectsAxisLabels):
         Resampling filter for PIL to use to upsample any images requiring
         it. Options include 'nearest' (default), 'bilinear', and 'bicubic'.
         See the PIL documentation for more detailed information.
+    num_threads : int, optional
+        If given, groups of identically shaped images are resized on a
+        pool of this many threads. Defaults to `None`, in which case
+        batches are processed in the calling thread. The pool is
+        started on first use and shut down by :meth:`close`.
 
     Notes
     -----
     This transformer expects stream sources returning individual images,
-    represented as 2- or 3-dimensional arrays, or lists of the same.
-    The format of the stream is unaltered.
+    represented as 2- or 3-dimensional arrays, or batches of the same
+    represented either as lists or as ndarrays with an extra leading
+    axis.
+
+    Batches are processed one group of identically shaped images at a
+    time, so that the target size is computed once per group. With
+    'nearest' resampling a whole group is resized by a single NumPy
+    indexing operation; other filters call PIL once per image. If all
+    the resized images of a batch have the same shape and dtype, the
+    batch is returned as an ndarray, otherwise a list is returned.
 
     """
     def __init__(self, data_stream, minimum_shape, resample='nearest',
-                 **kwargs):
+                 num_threads=None, **kwargs):
         self.minimum_shape = minimum_shape
         try:
             self.resample = getattr(Image, resample.upper())
         except AttributeError:
             raise ValueError("unknown resampling filter '{}'".format(resample))
+        self.num_threads = num_threads
         kwargs.setdefault('produces_examples', data_stream.produces_examples)
         kwargs.setdefault('axis_labels', data_stream.axis_labels)
         super(MinimumImageDimensions, self).__init__(data_stream, **kwargs)
 
+    def __getstate__(self):
+        state = super(MinimumImageDimensions, self).__getstate__()
+        state.pop('_pool', None)
+        return state
+
+    def close(self):
+        if getattr(self, '_pool', None) is not None:
+            self._pool.terminate()
+            self._pool.join()
+            del self._pool
+        super(MinimumImageDimensions, self).close()
+
     def transform_source_batch(self, batch, source_name):
         self.verify_axis_labels(('batch', 'channel', 'height', 'width'),
                                 self.data_stream.axis_labels[source_name],
                                 source_name)
-        return [self._example_transform(im, source_name) for im in batch]
+        if isinstance(batch, numpy.ndarray) and batch.dtype != object:
+            # A homogeneous batch is a single group.
+            if batch.ndim > 4 or batch.ndim < 3:
+                raise NotImplementedError
+            return self._resize_group(batch)
+        groups = defaultdict(list)
+        for i, example in enumerate(batch):
+            if example.ndim > 3 or example.ndim < 2:
+                raise NotImplementedError
+            groups[(example.shape, example.dtype.str)].append(i)
+        groups = list(groups.values())
+        resized = self._map(
+            self._resize_group,
+            [numpy.stack([batch[i] for i in group]) for group in groups])
+        if len(set((r.shape[1:], r.dtype) for r in resized)) == 1:
+            out = numpy.empty((len(batch),) + resized[0].shape[1:],
+                              dtype=resized[0].dtype)
+            for group, images in zip(groups, resized):
+                out[group] = images
+            return out
+        out = [None] * len(batch)
+        for group, images in zip(groups, resized):
+            for i, image in zip(group, images):
+                out[i] = image
+        return out
 
     def transform_source_example(self, example, source_name):
         self.verify_axis_labels(('channel', 'height', 'width'),
@@ -151,28 +207,49 @@ class MinimumImageDimensions(SourcewiseTransformer, ExpectsAxisLabels):
     def _example_transform(self, example, _):
         if example.ndim > 3 or example.ndim < 2:
             raise NotImplementedError
+        return self._resize_group(example[numpy.newaxis])[0]
+
+    def _map(self, function, groups):
+        if not self.num_threads or len(groups) < 2:
+            return [function(group) for group in groups]
+        if getattr(self, '_pool', None) is None:
+            self._pool = ThreadPool(self.num_threads)
+        return self._pool.map(function, groups)
+
+    def _resize_group(self, images):
+        """Resize a stack of identically shaped images."""
         min_height, min_width = self.minimum_shape
-        original_height, original_width = example.shape[-2:]
-        if original_height < min_height or original_width < min_width:
-            dt = example.dtype
-            # If we're dealing with a colour image, swap around the axes
-            # to be in the format that PIL needs.
-            if example.ndim == 3:
-                im = example.transpose(1, 2, 0)
-            else:
-                im = example
-            im = Image.fromarray(im)
-            width, height = im.size
-            multiplier = max(1, min_width / width, min_height / height)
-            width = int(math.ceil(width * multiplier))
-            height = int(math.ceil(height * multiplier))
-            im = numpy.array(im.resize((width, height))).astype(dt)
-            # If necessary, undo the axis swap from earlier.
-            if im.ndim == 3:
-                example = im.transpose(2, 0, 1)
-            else:
-                example = im
-        return example
+        original_height, original_width = images.shape[-2:]
+        if original_height >= min_height and original_width >= min_width:
+            return images
+        multiplier = max(1, min_width / original_width,
+                         min_height / original_height)
+        width = int(math.ceil(original_width * multiplier))
+        height = int(math.ceil(original_height * multiplier))
+        if self.resample == Image.NEAREST:
+            rows = ((numpy.arange(height) + 0.5) *
+                    (original_height / height)).astype('int64')
+            columns = ((numpy.arange(width) + 0.5) *
+                       (original_width / width)).astype('int64')
+            return images[..., rows[:, numpy.newaxis], columns]
+        return numpy.array([self._resize_image(image, height, width)
+                            for image in images])
+
+    def _resize_image(self, example, height, width):
+        dt = example.dtype
+        # If we're dealing with a colour image, swap around the axes
+        # to be in the format that PIL needs.
+        if example.ndim == 3:
+            im = example.transpose(1, 2, 0)
+        else:
+            im = example
+        im = Image.fromarray(im)
+        im = numpy.array(im.resize((width, height),
+                                   resample=self.resample)).astype(dt)
+        # If necessary, undo the axis swap from earlier.
+        if im.ndim == 3:
+            return im.transpose(2, 0, 1)
+        return im
 
 
 class RandomFixedSizeCrop(SourcewiseTransformer, ExpectsAxisLabels):
@@ -192,17 +269,24 @@ class RandomFixedSizeCrop(SourcewiseTransformer, ExpectsAxisLabels):
 
      * Single images represented as 3-dimensional ndarrays, with layout
        `(channel, height, width)`.
-     * Batches of images represented as lists of 3-dimensional ndarrays,
-       possibly of different shapes (i.e. images of differing
-       heights/widths).
+     * Batches of images represented as lists (or object arrays) of
+       3-dimensional ndarrays, possibly of different shapes (i.e. images
+       of differing heights/widths).
      * Batches of images represented as 4-dimensional ndarrays, with
        layout `(batch, channel, height, width)`.
 
-    The format of the stream will be un-altered, i.e. if lists are
-    yielded by `data_stream` then lists will be yielded by this
-    transformer.
+    Since all windows have the same shape, batches are returned as
+    4-dimensional ndarrays, unless the images of a list differ in their
+    number of channels, in which case a list is returned. Lists of
+    images which share their number of channels and a dtype supported by
+    the compiled extension (`uint8`, `float32` or `float64`) are cropped
+    in parallel by a single call to :func:`window_list_bchw`; other
+    lists are cropped one image at a time.
 
     """
+    _kernel_dtypes = (numpy.dtype('uint8'), numpy.dtype('float32'),
+                      numpy.dtype('float64'))
+
     def __init__(self, data_stream, window_shape, **kwargs):
         if not window_batch_bchw_available:
             raise ImportError('window_batch_bchw not compiled')
@@ -238,13 +322,42 @@ class RandomFixedSizeCrop(SourcewiseTransformer, ExpectsAxisLabels):
             window_batch_bchw(source, offsets_h, offsets_w, out)
             return out
         elif all(isinstance(b, numpy.ndarray) and b.ndim == 3 for b in source):
-            return [self.transform_source_example(im, source_name)
-                    for im in source]
+            return self._crop_list(source, source_name)
         else:
             raise ValueError("uninterpretable batch format; expected a list "
                              "of arrays with ndim = 3, or an array with "
                              "ndim = 4")
 
+    def _crop_list(self, source, source_name):
+        windowed_height, windowed_width = self.window_shape
+        shapes = numpy.array([image.shape for image in source],
+                             dtype='int64').reshape((-1, 3))
+        dtypes = set(image.dtype for image in source)
+        batchable = (len(dtypes) == 1 and
+                     dtypes.pop() in self._kernel_dtypes and
+                     len(set(shapes[:, 0])) == 1)
+        if not batchable:
+            crops = [self.transform_source_example(im, source_name)
+                     for im in source]
+            if len(set(shapes[:, 0])) == 1:
+                return numpy.array(crops)
+            return crops
+        max_h_off = shapes[:, 1] - windowed_height
+        max_w_off = shapes[:, 2] - windowed_width
+        if (max_h_off < 0).any() or (max_w_off < 0).any():
+            raise ValueError("can't obtain ({}, {}) window from all image "
+                             "dimensions in batch".format(windowed_height,
+                                                          windowed_width))
+        # Draw all offsets in a single call; each offset is uniform over
+        # [0, max_offset] for its own image.
+        offsets = self.rng.uniform(size=(2, len(source)))
+        offsets_h = (offsets[0] * (max_h_off + 1)).astype('int64')
+        offsets_w = (offsets[1] * (max_w_off + 1)).astype('int64')
+        out = numpy.empty((len(source), shapes[0, 0]) + self.window_shape,
+                          dtype=source[0].dtype)
+        window_list_bchw(source, offsets_h, offsets_w, out)
+        return out
+
     def transform_source_example(self, example, source_name):
         self.verify_axis_labels(('channel', 'height', 'width'),
                                 self.data_stream.axis_labels[source_name],
@@ -366,3 +479,294 @@ class Random2DRotation(SourcewiseTransformer, ExpectsAxisLabels):
         example = numpy.array(im.rotate(rotation_angle,
                                         resample=self.resample)).astype(dt)
         return example.transpose(2, 0, 1)
+
+
+@add_metaclass(ABCMeta)
+class BatchwiseImageTransformer(SourcewiseTransformer, ExpectsAxisLabels):
+    """Base class for image transformers backed by a batch kernel.
+
+    Random parameters are drawn for a whole batch at once by
+    :meth:`sample_parameters` and the images are then transformed by
+    :meth:`transform_bchw`, which is expected to make a single call to
+    one of the compiled kernels in :mod:`fuel.transformers._image`.
+
+    Parameters
+    ----------
+    data_stream : :class:`AbstractDataStream`
+        The data stream to wrap.
+    rng : :class:`numpy.random.RandomState`, optional
+        The random number generator used to draw the parameters of the
+        transformation. Defaults to a generator seeded with
+        ``fuel.config.default_seed``.
+
+    Notes
+    -----
+    This transformer expects to act on stream sources which provide one of
+
+     * Single images represented as 3-dimensional ndarrays, with layout
+       `(channel, height, width)`.
+     * Batches of images represented as lists (or object arrays) of
+       3-dimensional ndarrays, possibly of different shapes.
+     * Batches of images represented as 4-dimensional ndarrays, with
+       layout `(batch, channel, height, width)`.
+
+    The format of the stream will be un-altered. Images must be of dtype
+    `uint8`, `float32` or `float64`.
+
+    """
+    def __init__(self, data_stream, **kwargs):
+        if not window_batch_bchw_available:
+            raise ImportError('fuel.transformers._image not compiled')
+        self.rng = kwargs.pop('rng', None)
+        if self.rng is None:
+            self.rng = numpy.random.RandomState(config.default_seed)
+        kwargs.setdefault('produces_examples', data_stream.produces_examples)
+        kwargs.setdefault('axis_labels', data_stream.axis_labels)
+        super(BatchwiseImageTransformer, self).__init__(data_stream,
+                                                        **kwargs)
+
+    @abstractmethod
+    def sample_parameters(self, batch_size):
+        """Draw the transformation parameters for a batch.
+
+        Parameters
+        ----------
+        batch_size : int
+            The number of images in the batch.
+
+        Returns
+        -------
+        tuple of :class:`numpy.ndarray`
+            Arrays with a leading axis of length `batch_size`.
+
+        """
+
+    @abstractmethod
+    def transform_bchw(self, batch, parameters):
+        """Transform a `(batch, channel, height, width)` ndarray.
+
+        Parameters
+        ----------
+        batch : :class:`numpy.ndarray`
+            A 4-dimensional batch of images.
+        parameters : tuple of :class:`numpy.ndarray`
+            Parameters as returned by :meth:`sample_parameters`.
+
+        """
+
+    def transform_source_batch(self, source, source_name):
+        self.verify_axis_labels(('batch', 'channel', 'height', 'width'),
+                                self.data_stream.axis_labels[source_name],
+                                source_name)
+        if isinstance(source, numpy.ndarray) and source.ndim == 4:
+            return self.transform_bchw(source,
+                                       self.sample_parameters(len(source)))
+        elif all(isinstance(b, numpy.ndarray) and b.ndim == 3
+                 for b in source):
+            parameters = self.sample_parameters(len(source))
+            images = [self.transform_bchw(
+                im[numpy.newaxis], tuple(p[i:i + 1] for p in parameters))[0]
+                for i, im in enumerate(source)]
+            if isinstance(source, numpy.ndarray):
+                out = numpy.empty(len(source), dtype=object)
+                out[:] = images
+                return out
+            return images
+        else:
+            raise ValueError("uninterpretable batch format; expected a list "
+                             "of arrays with ndim = 3, or an array with "
+                             "ndim = 4")
+
+    def transform_source_example(self, example, source_name):
+        self.verify_axis_labels(('channel', 'height', 'width'),
+                                self.data_stream.axis_labels[source_name],
+                                source_name)
+        if not isinstance(example, numpy.ndarray) or example.ndim != 3:
+            raise ValueError("uninterpretable example format; expected "
+                             "ndarray with ndim = 3")
+        return self.transform_bchw(example[numpy.newaxis],
+                                   self.sample_parameters(1))[0]
+
+
+class RandomFlip(BatchwiseImageTransformer):
+    """Randomly flip images horizontally and/or vertically.
+
+    Parameters
+    ----------
+    data_stream : :class:`AbstractDataStream`
+        The data stream to wrap.
+    horizontal : float, optional
+        The probability of flipping an image along its width axis.
+        Defaults to 0.5.
+    vertical : float, optional
+        The probability of flipping an image along its height axis.
+        Defaults to 0.
+
+    Notes
+    -----
+    See :class:`BatchwiseImageTransformer` for the supported formats.
+
+    """
+    def __init__(self, data_stream, horizontal=0.5, vertical=0., **kwargs):
+        if not (0 <= horizontal <= 1 and 0 <= vertical <= 1):
+            raise ValueError('flip probabilities must be in the range [0, 1]')
+        self.horizontal = horizontal
+        self.vertical = vertical
+        super(RandomFlip, self).__init__(data_stream, **kwargs)
+
+    def sample_parameters(self, batch_size):
+        flips = self.rng.uniform(size=(2, batch_size))
+        return ((flips[0] < self.vertical).astype('uint8'),
+                (flips[1] < self.horizontal).astype('uint8'))
+
+    def transform_bchw(self, batch, parameters):
+        flip_height, flip_width = parameters
+        out = numpy.empty_like(batch)
+        flip_batch_bchw(batch, flip_height, flip_width, out)
+        return out
+
+
+class RandomAffineTransformation(BatchwiseImageTransformer):
+    """Randomly scale, translate, rotate and flip images in one pass.
+
+    All of the requested transformations are composed into a single
+    affine matrix per image, and the whole batch is warped by a single
+    call to :func:`affine_warp_batch_bchw`. Rotation and scaling are
+    performed around the center of each image.
+
+    Parameters
+    ----------
+    data_stream : :class:`AbstractDataStream`
+        The data stream to wrap.
+    scale_range : 2-tuple, optional
+        The range from which an isotropic scaling factor is drawn
+        uniformly. Defaults to `(1, 1)`, i.e. no scaling.
+    maximum_translation : 2-tuple, optional
+        The maximum `(height, width)` translation in pixels. Offsets are
+        drawn uniformly from `[-maximum, maximum]`. Defaults to `(0, 0)`.
+    maximum_rotation : float, optional
+        Maximum amount of rotation in radians. The rotation angle is
+        drawn uniformly from `[-maximum_rotation, maximum_rotation]`.
+        Defaults to 0.
+    horizontal_flip : float, optional
+        The probability of flipping an image along its width axis.
+        Defaults to 0.
+    vertical_flip : float, optional
+        The probability of flipping an image along its height axis.
+        Defaults to 0.
+    resample : str, optional
+        Either 'nearest' (default) or 'bilinear'.
+    fill : float, optional
+        The value of pixels that fall outside of the original image.
+        Defaults to 0.
+
+    Notes
+    -----
+    See :class:`BatchwiseImageTransformer` for the supported formats.
+
+    """
+    def __init__(self, data_stream, scale_range=(1., 1.),
+                 maximum_translation=(0., 0.), maximum_rotation=0.,
+                 horizontal_flip=0., vertical_flip=0., resample='nearest',
+                 fill=0., **kwargs):
+        if min(scale_range) <= 0 or scale_range[0] > scale_range[1]:
+            raise ValueError('scale_range must be an increasing pair of '
+                             'positive numbers')
+        if resample not in ('nearest', 'bilinear'):
+            raise ValueError("unknown resampling filter '{}'".format(resample))
+        self.scale_range = scale_range
+        self.maximum_translation = maximum_translation
+        self.maximum_rotation = maximum_rotation
+        self.horizontal_flip = horizontal_flip
+        self.vertical_flip = vertical_flip
+        self.resample = resample
+        self.fill = fill
+        super(RandomAffineTransformation, self).__init__(data_stream,
+                                                         **kwargs)
+
+    def sample_parameters(self, batch_size):
+        scales = self.rng.uniform(self.scale_range[0], self.scale_range[1],
+                                  size=batch_size)
+        max_h, max_w = self.maximum_translation
+        translations = numpy.empty((batch_size, 2))
+        translations[:, 0] = self.rng.uniform(-max_h, max_h, size=batch_size)
+        translations[:, 1] = self.rng.uniform(-max_w, max_w, size=batch_size)
+        angles = self.rng.uniform(-self.maximum_rotation,
+                                  self.maximum_rotation, size=batch_size)
+        flips = self.rng.uniform(size=(batch_size, 2))
+        flips = numpy.where(
+            flips < [self.vertical_flip, self.horizontal_flip], -1., 1.)
+        return scales, translations, angles, flips
+
+    def transform_bchw(self, batch, parameters):
+        scales, translations, angles, flips = parameters
+        cos, sin = numpy.cos(angles), numpy.sin(angles)
+        # The kernel needs the inverse mapping from output to input
+        # coordinates: flip^-1 . scale^-1 . rotation^-1, where the inverse
+        # of a rotation is its transpose and flips are their own inverse.
+        inverse = numpy.empty((len(batch), 2, 2))
+        inverse[:, 0, 0] = cos
+        inverse[:, 0, 1] = sin
+        inverse[:, 1, 0] = -sin
+        inverse[:, 1, 1] = cos
+        inverse *= (flips / scales[:, numpy.newaxis])[:, :, numpy.newaxis]
+        center = (numpy.array(batch.shape[2:], dtype='float64') - 1) / 2
+        matrices = numpy.empty((len(batch), 2, 3))
+        matrices[:, :, :2] = inverse
+        matrices[:, :, 2] = center - numpy.einsum(
+            'bij,bj->bi', inverse, center + translations)
+        out = numpy.empty_like(batch)
+        affine_warp_batch_bchw(batch, matrices, out,
+                               bilinear=self.resample == 'bilinear',
+                               fill=self.fill)
+        return out
+
+
+class RandomBrightnessContrast(BatchwiseImageTransformer):
+    """Randomly jitter the brightness and contrast of images.
+
+    Each pixel is transformed as
+    ``(pixel - mean) * contrast + mean + brightness``, where `mean` is
+    the mean value of the image the pixel belongs to.
+
+    Parameters
+    ----------
+    data_stream : :class:`AbstractDataStream`
+        The data stream to wrap.
+    maximum_brightness : float, optional
+        The brightness offset is drawn uniformly from
+        `[-maximum_brightness, maximum_brightness]`. Defaults to 0.
+    contrast_range : 2-tuple, optional
+        The range from which the contrast factor is drawn uniformly.
+        Defaults to `(1, 1)`, i.e. no contrast change.
+
+    Notes
+    -----
+    See :class:`BatchwiseImageTransformer` for the supported formats.
+    `uint8` images are clipped to the range `[0, 255]`.
+
+    """
+    def __init__(self, data_stream, maximum_brightness=0.,
+                 contrast_range=(1., 1.), **kwargs):
+        if maximum_brightness < 0:
+            raise ValueError('maximum_brightness must be non-negative')
+        if min(contrast_range) < 0 or contrast_range[0] > contrast_range[1]:
+            raise ValueError('contrast_range must be an increasing pair of '
+                             'non-negative numbers')
+        self.maximum_brightness = maximum_brightness
+        self.contrast_range = contrast_range
+        super(RandomBrightnessContrast, self).__init__(data_stream, **kwargs)
+
+    def sample_parameters(self, batch_size):
+        brightness = self.rng.uniform(-self.maximum_brightness,
+                                      self.maximum_brightness,
+                                      size=batch_size)
+        contrast = self.rng.uniform(self.contrast_range[0],
+                                    self.contrast_range[1], size=batch_size)
+        return brightness, contrast
+
+    def transform_bchw(self, batch, parameters):
+        brightness, contrast = parameters
+        out = numpy.empty_like(batch)
+        brightness_contrast_batch_bchw(batch, brightness, contrast, out)
+        return out
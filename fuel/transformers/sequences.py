@@ -1,6 +1,17 @@
+import numpy
+from numpy.lib.stride_tricks import as_strided
+
 from fuel.transformers import Transformer
 
 
+def _sliding_windows(sequence, size):
+    """Return a strided view of all the windows of a sequence."""
+    num_windows = max(len(sequence) - size + 1, 0)
+    return as_strided(
+        sequence, shape=(num_windows, size) + sequence.shape[1:],
+        strides=(sequence.strides[0],) + sequence.strides, writeable=False)
+
+
 class Window(Transformer):
     """Return pairs of source and target windows from a stream.
 
@@ -121,3 +132,111 @@ class NGrams(Window):
     def get_data(self, *args, **kwargs):
         source, target = super(NGrams, self).get_data(*args, **kwargs)
         return (source, target[0])
+
+
+class BatchedWindow(Transformer):
+    """Return batches of all the source and target windows of sequences.
+
+    Extracts the same windows as :class:`Window`, but instead of
+    returning them one at a time it returns all the windows of a sequence
+    (or of a batch of sequences) at once, as two arrays of shape
+    ``(num_windows, source_window)`` and ``(num_windows,
+    target_window)``. The windows are built from strided views of each
+    sequence instead of being sliced out one by one.
+
+    Parameters
+    ----------
+    offset : int
+        The offset from the source window where the target window starts.
+    source_window : int
+        The size of the source window.
+    target_window : int
+        The size of the target window.
+    overlapping : bool
+        See :class:`Window`.
+    data_stream : :class:`.DataStream` instance
+        The data stream providing sequences, or batches of sequences.
+        Each sequence is assumed to be convertible to an array, e.g. a
+        list of integers.
+    target_source : str, optional
+        This data stream adds a new source for the target words. By default
+        this source is 'targets'.
+
+    Notes
+    -----
+    Sequences which are too short to contain a single pair of windows
+    are skipped, so every batch contains at least one window. Batches
+    of sequences from the wrapped stream are turned into a single batch
+    of windows.
+
+    """
+    def __init__(self, offset, source_window, target_window,
+                 overlapping, data_stream, target_source='targets', **kwargs):
+        if len(data_stream.sources) > 1:
+            raise ValueError('{} expects only one source'
+                             .format(self.__class__.__name__))
+        super(BatchedWindow, self).__init__(
+            data_stream, produces_examples=False, **kwargs)
+        self.sources = self.sources + (target_source,)
+
+        self.offset = offset
+        self.source_window = source_window
+        self.target_window = target_window
+        self.overlapping = overlapping
+
+    def _windows(self, sequence):
+        """Return the source and target windows of a single sequence."""
+        sequence = numpy.asarray(sequence)
+        # The target window starts `shift` elements after the source one
+        shift = self.source_window * (not self.overlapping) + self.offset
+        first = max(0, -shift)
+        num_windows = len(sequence) - first + 1 - max(
+            self.source_window, shift + self.target_window)
+        if num_windows <= 0:
+            return None
+        source = _sliding_windows(sequence, self.source_window)
+        target = _sliding_windows(sequence, self.target_window)
+        return (source[first:first + num_windows],
+                target[first + shift:first + shift + num_windows])
+
+    def get_data(self, request=None):
+        if request is not None:
+            raise ValueError
+        windows = []
+        while not windows:
+            data, = next(self.child_epoch_iterator)
+            sequences = ([data] if self.data_stream.produces_examples
+                         else data)
+            windows = [sequence_windows for sequence_windows in
+                       map(self._windows, sequences)
+                       if sequence_windows is not None]
+        sources, targets = zip(*windows)
+        return (numpy.concatenate(sources), numpy.concatenate(targets))
+
+
+class BatchedNGrams(BatchedWindow):
+    """Return batches of all the n-grams of sentences.
+
+    Extracts the same n-grams as :class:`NGrams`, returning all the
+    n-grams of a sentence (or of a batch of sentences) at once as an
+    array of shape ``(num_ngrams, ngram_order)`` and the words following
+    them as an array of shape ``(num_ngrams,)``.
+
+    Parameters
+    ----------
+    ngram_order : int
+        The order of the n-grams to output e.g. 3 for trigrams.
+    data_stream : :class:`.DataStream` instance
+        The data stream providing sentences, or batches of sentences.
+    target_source : str, optional
+        This data stream adds a new source for the target words. By default
+        this source is 'targets'.
+
+    """
+    def __init__(self, ngram_order, *args, **kwargs):
+        super(BatchedNGrams, self).__init__(
+            0, ngram_order, 1, False, *args, **kwargs)
+
+    def get_data(self, *args, **kwargs):
+        source, target = super(BatchedNGrams, self).get_data(*args, **kwargs)
+        return (source, target[:, 0])
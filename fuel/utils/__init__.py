@@ -1,7 +1,10 @@
 import collections
 import contextlib
+import importlib
 import os
 import numbers
+import sys
+import types
 
 import h5py
 import six
@@ -403,6 +406,35 @@ def iterable_fancy_indexing(iterable, request):
         return [iterable[r] for r in request]
 
 
+def shard_slice(num_examples, rank, world_size):
+    """Return the slice selecting one of several contiguous shards.
+
+    The examples are split into `world_size` contiguous shards of
+    ``num_examples // world_size`` examples each, so that all shards have
+    the same size. The remaining examples are left out.
+
+    Parameters
+    ----------
+    num_examples : int
+        The number of examples to split.
+    rank : int
+        The index of the shard, in ``[0, world_size)``.
+    world_size : int
+        The number of shards.
+
+    Returns
+    -------
+    :class:`slice`
+        The examples of shard `rank`.
+
+    """
+    if not 0 <= rank < world_size:
+        raise ValueError("rank should be in [0, {}), got {}"
+                         .format(world_size, rank))
+    shard_size = num_examples // world_size
+    return slice(rank * shard_size, (rank + 1) * shard_size)
+
+
 def find_in_data_path(filename):
     """Searches for a file within Fuel's data path.
 
@@ -511,3 +543,73 @@ def do_not_pickle_attributes(*lazy_properties):
 
         return cls
     return wrap_class
+
+
+def _import_attribute(name, module_name):
+    module = importlib.import_module(module_name)
+    if module_name.rpartition('.')[2] == name:
+        return module
+    return getattr(module, name)
+
+
+class LazyModule(types.ModuleType):
+    """A module whose attributes are imported when first accessed.
+
+    See :func:`lazy_module_attributes`.
+
+    """
+    def __getattr__(self, name):
+        attributes = self.__dict__.get('_lazy_attributes', {})
+        if name not in attributes:
+            raise AttributeError("module '{}' has no attribute '{}'".format(
+                self.__name__, name))
+        value = _import_attribute(name, attributes[name])
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) |
+                      set(self.__dict__.get('_lazy_attributes', {})))
+
+
+def lazy_module_attributes(module_name, attributes):
+    """Defer the imports of a package's attributes until they are used.
+
+    Makes ``from package import name`` and ``package.name`` import the
+    module defining `name` on first access, so that importing a package
+    doesn't import all of its submodules and their dependencies.
+
+    Parameters
+    ----------
+    module_name : str
+        The name of the package, i.e. its ``__name__``.
+    attributes : dict
+        Maps attribute names to the names of the modules that define
+        them. If the last component of a module's name is the attribute
+        name, the attribute is the module itself.
+
+    Notes
+    -----
+    On Python versions before 3.5, where the class of a module can't be
+    changed, all attributes are imported immediately instead.
+
+    Examples
+    --------
+    At the end of a package's ``__init__.py``:
+
+    >>> lazy_module_attributes(__name__, {
+    ...     'MNIST': 'fuel.datasets.mnist',
+    ...     'image': 'fuel.transformers.image'})  # doctest: +SKIP
+
+    """
+    module = sys.modules[module_name]
+    # Keep `from package import *` exporting everything
+    names = getattr(module, '__all__', [name for name in vars(module)
+                                        if not name.startswith('_')])
+    module.__all__ = sorted(set(names) | set(attributes))
+    if sys.version_info < (3, 5):
+        for name, attribute_module in attributes.items():
+            setattr(module, name, _import_attribute(name, attribute_module))
+        return
+    module._lazy_attributes = attributes
+    module.__class__ = LazyModule
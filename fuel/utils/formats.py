@@ -3,6 +3,8 @@ import codecs
 import gzip
 import io
 import tarfile
+import zipfile
+
 import six
 
 
@@ -45,13 +47,16 @@ def open_(filename, mode='r', encoding=None):
         return open(filename, mode, encoding=encoding)
 
 
-def tar_open(f):
+def tar_open(f, stream=False):
     """Open either a filename or a file-like object as a TarFile.
 
     Parameters
     ----------
     f : str or file-like object
         The filename or file-like object from which to read.
+    stream : bool, optional
+        If `True`, the archive is opened as a stream, which can only be
+        read sequentially but never seeks backwards. Defaults to `False`.
 
     Returns
     -------
@@ -59,7 +64,51 @@ def tar_open(f):
         A `TarFile` instance.
 
     """
+    mode = 'r|*' if stream else 'r'
     if isinstance(f, six.string_types):
-        return tarfile.open(name=f)
+        return tarfile.open(name=f, mode=mode)
     else:
-        return tarfile.open(fileobj=f)
+        return tarfile.open(fileobj=f, mode=mode)
+
+
+def iter_archive(f, predicate=None):
+    """Iterate over the files in a tar or zip archive without extracting it.
+
+    Tar archives (with any compression) are read in a single sequential
+    pass using :func:`tar_open`, so that no member is written to disk.
+
+    Parameters
+    ----------
+    f : str or file-like object
+        The filename or file-like object of the archive. Zip archives
+        must be seekable.
+    predicate : callable, optional
+        Called with the name of each regular file in the archive. Only
+        the contents of the files for which it returns `True` are read.
+        By default all files are read.
+
+    Yields
+    ------
+    tuple
+        ``(name, data)`` pairs, where `name` is the member's path within
+        the archive and `data` is a :class:`bytes` object holding its
+        contents, in the order in which they are stored.
+
+    """
+    if zipfile.is_zipfile(f):
+        with zipfile.ZipFile(f) as zip_file:
+            for info in zip_file.infolist():
+                if info.filename.endswith('/'):
+                    continue
+                if predicate is None or predicate(info.filename):
+                    yield info.filename, zip_file.read(info)
+        return
+    if not isinstance(f, six.string_types):
+        # is_zipfile moves the position of file objects
+        f.seek(0)
+    with tar_open(f, stream=True) as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            if predicate is None or predicate(member.name):
+                yield member.name, tar.extractfile(member).read()
@@ -0,0 +1,331 @@
+"""Statistics of datasets, e.g. to normalize their sources.
+
+Statistics are computed in a single streaming pass over a dataset, one
+batch at a time, so that datasets that don't fit in memory (e.g.
+ILSVRC2010) can be processed. The statistics of several batches, or of
+several shards of a dataset processed in parallel, are merged using the
+method of Chan et al. See :class:`RunningStats` and :func:`get_stats`.
+
+"""
+import json
+from functools import partial
+from multiprocessing import Pool
+
+import h5py
+import numpy
+from six import iteritems, string_types
+from six.moves import range
+
+from fuel.datasets import H5PYDataset
+
+STATS_FIELDS = ('count', 'mean', 'm2', 'min', 'max', 'histogram',
+                'bin_edges')
+
+
+class RunningStats(object):
+    """Running statistics of arrays, computed one batch at a time.
+
+    The mean and variance are computed in ``float64`` using Welford's
+    algorithm, generalized to batches: the statistics of each batch are
+    computed with vectorized operations and then merged into the
+    running ones.
+
+    Parameters
+    ----------
+    axes : tuple of int, optional
+        The axes of the examples (i.e. not counting the batch axis) along
+        which separate statistics are computed, e.g. ``(0,)`` for
+        per-channel statistics of ``(channel, height, width)`` images. By
+        default, the statistics of all values are computed.
+    bins : int, optional
+        If given, a histogram of all values with this number of bins is
+        computed as well. Requires `hist_range`.
+    hist_range : tuple of float, optional
+        The lower and upper edges of the histogram's bins. Values outside
+        of this range are ignored.
+
+    Attributes
+    ----------
+    count : int
+        The number of values each of the statistics was computed on.
+    mean : :class:`numpy.ndarray`
+        The mean. Like the other statistics, it has the shape of an
+        example whose axes not in `axes` are reduced to length 1, so that
+        it can be broadcasted against examples and batches.
+    m2 : :class:`numpy.ndarray`
+        The sum of the squared differences to the mean.
+    min : :class:`numpy.ndarray`
+        The minimum.
+    max : :class:`numpy.ndarray`
+        The maximum.
+    histogram : :class:`numpy.ndarray` or None
+        The number of values in each of the histogram's bins.
+    bin_edges : :class:`numpy.ndarray` or None
+        The ``bins + 1`` edges of the histogram's bins.
+
+    """
+    def __init__(self, axes=(), bins=None, hist_range=None):
+        if bins is not None and hist_range is None:
+            raise ValueError("histograms require a hist_range")
+        self.axes = tuple(axes)
+        self.count = 0
+        self.mean = self.m2 = self.min = self.max = None
+        if bins is None:
+            self.histogram = self.bin_edges = None
+        else:
+            self.histogram = numpy.zeros(bins, dtype='int64')
+            self.bin_edges = numpy.linspace(hist_range[0], hist_range[1],
+                                            bins + 1)
+
+    @property
+    def variance(self):
+        """The (population) variance."""
+        return self.m2 / self.count
+
+    @property
+    def std(self):
+        """The (population) standard deviation."""
+        return numpy.sqrt(self.variance)
+
+    def update(self, batch):
+        """Adds a batch of examples to the statistics.
+
+        Parameters
+        ----------
+        batch : :class:`numpy.ndarray`
+            A batch of examples, with the batch axis first.
+
+        """
+        batch = numpy.asarray(batch)
+        if not len(batch):
+            return
+        if any(axis >= batch.ndim - 1 for axis in self.axes):
+            raise ValueError("examples have fewer axes than requested")
+        reduced = tuple(axis for axis in range(batch.ndim)
+                        if axis - 1 not in self.axes)
+        other = RunningStats(self.axes)
+        other.count = batch.size // numpy.prod(
+            [batch.shape[axis + 1] for axis in self.axes], dtype='int64')
+        values = batch.astype('float64')
+        other.mean = values.mean(axis=reduced, keepdims=True)
+        values -= other.mean
+        values **= 2
+        other.m2 = values.sum(axis=reduced, keepdims=True)[0]
+        other.mean = other.mean[0]
+        other.min = batch.min(axis=reduced, keepdims=True)[0]
+        other.max = batch.max(axis=reduced, keepdims=True)[0]
+        if self.histogram is not None:
+            other.histogram, other.bin_edges = numpy.histogram(
+                batch, bins=self.bin_edges)
+        self.merge(other)
+
+    def merge(self, other):
+        """Merges the statistics of other examples into these ones.
+
+        Parameters
+        ----------
+        other : :class:`RunningStats`
+            The statistics to merge, with the same `axes` and histogram
+            bins.
+
+        """
+        if not other.count:
+            return
+        if not self.count:
+            for field in STATS_FIELDS:
+                value = getattr(other, field)
+                if field in ('histogram', 'bin_edges') and value is None:
+                    continue
+                setattr(self, field, value)
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (float(other.count) / count)
+        self.m2 = (self.m2 + other.m2 +
+                   delta ** 2 * (float(self.count) * other.count / count))
+        self.min = numpy.minimum(self.min, other.min)
+        self.max = numpy.maximum(self.max, other.max)
+        if self.histogram is not None:
+            self.histogram = self.histogram + other.histogram
+        self.count = count
+
+
+def _resolve_axes(dataset, source, axes):
+    """Converts axis labels to the indices of the axes of examples."""
+    labels = (dataset.axis_labels or {}).get(source)
+    indices = []
+    for axis in axes:
+        if isinstance(axis, string_types):
+            if not labels or axis not in labels:
+                raise ValueError("source '{}' has no axis '{}'".format(
+                    source, axis))
+            # Axis labels include the batch axis
+            axis = labels.index(axis) - 1
+        indices.append(axis)
+    return tuple(sorted(indices))
+
+
+def _compute_stats(dataset, sources, axes, bins, hist_range, batch_size,
+                   start_stop):
+    """Computes the statistics of a range of examples of a dataset."""
+    start, stop = start_stop
+    stats = dict((source, RunningStats(axes[source], bins, hist_range))
+                 for source in sources)
+    state = dataset.open()
+    try:
+        for batch_start in range(start, stop, batch_size):
+            request = slice(batch_start, min(batch_start + batch_size, stop))
+            data = dataset.get_data(state, request)
+            for source, source_data in zip(dataset.sources, data):
+                if source in stats:
+                    stats[source].update(source_data)
+    finally:
+        dataset.close(state)
+    return stats
+
+
+def compute_stats(dataset, sources=None, axes=(), bins=None,
+                  hist_range=None, batch_size=128, num_workers=1):
+    """Computes the statistics of the sources of a dataset.
+
+    Parameters
+    ----------
+    dataset : :class:`~fuel.datasets.Dataset`
+        A dataset whose `get_data` method accepts slices, e.g. a
+        :class:`~fuel.datasets.H5PYDataset`.
+    sources : tuple of str, optional
+        The sources to compute statistics for. Defaults to all the
+        sources of the dataset.
+    axes : tuple or dict, optional
+        The axes along which separate statistics are computed, see
+        :class:`RunningStats`. Axes can be given by their label (e.g.
+        ``('channel',)``) or by their index within an example. If a
+        dictionary is given, it maps source names to axes. By default,
+        the statistics of all values of each source are computed.
+    bins : int, optional
+        If given, the number of bins of a histogram of the values of
+        each source. Requires `hist_range`.
+    hist_range : tuple of float, optional
+        The lower and upper edges of the histograms' bins.
+    batch_size : int, optional
+        The number of examples read at once. Defaults to 128.
+    num_workers : int, optional
+        The number of processes among which the examples are split. The
+        dataset must be picklable if more than one. Defaults to 1.
+
+    Returns
+    -------
+    dict
+        Maps source names to :class:`RunningStats`.
+
+    """
+    if sources is None:
+        sources = dataset.sources
+    if not isinstance(axes, dict):
+        axes = dict((source, axes) for source in sources)
+    axes = dict((source, _resolve_axes(dataset, source, axes.get(source, ())))
+                for source in sources)
+    # Each worker processes a contiguous range of examples
+    bounds = numpy.linspace(0, dataset.num_examples,
+                            num_workers + 1).astype('int64').tolist()
+    ranges = list(zip(bounds[:-1], bounds[1:]))
+    compute = partial(_compute_stats, dataset, sources, axes, bins,
+                      hist_range, batch_size)
+    if num_workers == 1:
+        results = [compute(ranges[0])]
+    else:
+        pool = Pool(num_workers)
+        try:
+            results = pool.map(compute, ranges)
+        finally:
+            pool.close()
+            pool.join()
+    stats = results[0]
+    for result in results[1:]:
+        for source, source_stats in iteritems(result):
+            stats[source].merge(source_stats)
+    return stats
+
+
+def _cache_key(dataset, axes, bins, hist_range):
+    """Describes the statistics of a source, or `None` if not cacheable."""
+    subset = dataset.user_given_subset
+    if not isinstance(subset, slice):
+        return None
+    return 'stats' + json.dumps([
+        list(dataset.which_sets), [subset.start, subset.stop, subset.step],
+        dataset.shard and list(dataset.shard), list(axes), bins,
+        hist_range and list(hist_range)], separators=(',', ':'))
+
+
+def get_stats(dataset, sources=None, axes=(), bins=None, hist_range=None,
+              batch_size=128, num_workers=1, cache=True):
+    """Returns the statistics of the sources of a dataset, using a cache.
+
+    The statistics of an :class:`~fuel.datasets.H5PYDataset` are stored
+    as attributes of the HDF5 datasets of its sources, so that they are
+    only computed once. Statistics are cached per split, subset, shard,
+    axes and histogram bins. They aren't cached for subsets given as a
+    list of indices, or if the file can't be written to.
+
+    Parameters
+    ----------
+    dataset : :class:`~fuel.datasets.Dataset`
+        The dataset, see :func:`compute_stats`. Statistics are only
+        cached for an :class:`~fuel.datasets.H5PYDataset` given a path.
+    sources, axes, bins, hist_range, batch_size, num_workers
+        See :func:`compute_stats`.
+    cache : bool, optional
+        Whether to read and write cached statistics. Defaults to `True`.
+
+    Returns
+    -------
+    dict
+        Maps source names to :class:`RunningStats`.
+
+    """
+    if sources is None:
+        sources = dataset.sources
+    if not isinstance(axes, dict):
+        axes = dict((source, axes) for source in sources)
+    axes = dict((source, _resolve_axes(dataset, source, axes.get(source, ())))
+                for source in sources)
+    cache = (cache and isinstance(dataset, H5PYDataset) and
+             dataset.external_file_handle is None)
+    if not cache:
+        return compute_stats(dataset, sources, axes, bins, hist_range,
+                             batch_size, num_workers)
+    keys = dict((source, _cache_key(dataset, axes[source], bins, hist_range))
+                for source in sources)
+    stats = {}
+    with h5py.File(dataset.path, mode='r') as h5file:
+        for source in sources:
+            attrs = h5file[source].attrs
+            if keys[source] and keys[source] + '.count' in attrs:
+                source_stats = RunningStats(axes[source])
+                for field in STATS_FIELDS:
+                    name = '{}.{}'.format(keys[source], field)
+                    if name in attrs:
+                        setattr(source_stats, field, attrs[name])
+                source_stats.count = int(source_stats.count)
+                stats[source] = source_stats
+    missing = tuple(source for source in sources if source not in stats)
+    if not missing:
+        return stats
+    computed = compute_stats(dataset, missing, axes, bins, hist_range,
+                             batch_size, num_workers)
+    stats.update(computed)
+    try:
+        with h5py.File(dataset.path, mode='a') as h5file:
+            for source, source_stats in iteritems(computed):
+                if not keys[source]:
+                    continue
+                attrs = h5file[source].attrs
+                for field in STATS_FIELDS:
+                    value = getattr(source_stats, field)
+                    if value is not None:
+                        attrs['{}.{}'.format(keys[source], field)] = value
+    except (IOError, OSError):
+        # e.g. the file is read-only, or still open for reading
+        pass
+    return stats
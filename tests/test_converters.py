@@ -18,9 +18,12 @@ from scipy.io import savemat
 from six.moves import range, zip, cPickle
 
 from fuel.converters.base import (fill_hdf5_file, check_exists,
+                                  parallel_map, read_array,
                                   MissingInputFiles)
-from fuel.converters import (adult, binarized_mnist, caltech101_silhouettes,
-                             celeba, iris, cifar10, cifar100, mnist, svhn)
+from fuel.converters import (adult, billion, binarized_mnist,
+                             caltech101_silhouettes, celeba, iris, cifar10,
+                             cifar100, mnist, svhn)
+from fuel.datasets import H5PYDataset, TokenizedCorpus
 from fuel.downloaders.caltech101_silhouettes import silhouettes_downloader
 from fuel.downloaders.base import default_downloader
 from fuel.utils import remember_cwd
@@ -59,6 +62,19 @@ class TestFillHDF5File(object):
         assert_equal(self.h5file['targets'],
                      numpy.vstack([self.train_targets, self.test_targets]))
 
+    def test_data_in_parts(self):
+        fill_hdf5_file(
+            self.h5file,
+            (('train', 'features', [self.train_features[:1],
+                                    self.train_features[1:]]),
+             ('train', 'targets', self.train_targets),
+             ('test', 'features', [self.test_features]),
+             ('test', 'targets', self.test_targets)))
+        assert_equal(self.h5file['features'],
+                     numpy.vstack([self.train_features, self.test_features]))
+        subset, = H5PYDataset.get_subsets(self.h5file, ['test'], ['features'])
+        assert_equal(subset.list_or_slice, slice(4, 6))
+
     def test_dtype(self):
         fill_hdf5_file(
             self.h5file,
@@ -92,6 +108,27 @@ class TestFillHDF5File(object):
              ('test', 'features', test_features)))
 
 
+def test_read_array():
+    data = numpy.arange(1000, dtype='>i4')
+    assert_equal(read_array(six.BytesIO(data.tobytes()), (10, 100), '>i4',
+                            buffer_size=64),
+                 data.reshape((10, 100)))
+    rval = read_array(six.BytesIO(data.tobytes()), (1000,), '>i4', 'float32',
+                      buffer_size=12)
+    assert_equal(rval, data.astype('float32'))
+    assert_equal(str(rval.dtype), 'float32')
+    assert_raises(ValueError, read_array, six.BytesIO(data.tobytes()),
+                  (1001,), '>i4')
+
+
+def test_parallel_map():
+    for num_workers in (1, 3):
+        assert_equal(list(parallel_map(lambda x: x ** 2, range(50),
+                                       num_workers=num_workers,
+                                       buffer_size=4)),
+                     [x ** 2 for x in range(50)])
+
+
 class TestMNIST(object):
     def setUp(self):
         MNIST_IMAGE_MAGIC = 2051
@@ -251,6 +288,51 @@ class TestAdult(object):
             assert h5['targets'].shape[0] == h5['features'].shape[0]
 
 
+class TestOneBillionWord(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        training = os.path.join(
+            self.tempdir, 'training-monolingual.tokenized.shuffled')
+        os.mkdir(training)
+        with open(os.path.join(training, 'news.en-00001-of-00100'),
+                  'w') as f:
+            f.write('the cat sat\nthe dog\n')
+        with open(os.path.join(training, 'news.en-00002-of-00100'),
+                  'w') as f:
+            f.write('a cat\n')
+        self.dictionary = os.path.join(self.tempdir, 'dictionary.pkl')
+        with open(self.dictionary, 'wb') as f:
+            cPickle.dump({'<S>': 0, '</S>': 1, '<UNK>': 2, 'the': 3,
+                          'cat': 4, 'a': 5}, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_fill_subparser(self):
+        parser = argparse.ArgumentParser()
+        subparsers = parser.add_subparsers()
+        subparser = subparsers.add_parser('billion')
+        convert_function = billion.fill_subparser(subparser)
+        assert convert_function is billion.convert_one_billion_word
+
+    def test_converter(self):
+        output_path, = billion.convert_one_billion_word(
+            self.tempdir, self.tempdir, 'training', [1, 2], self.dictionary)
+        assert os.path.basename(output_path) == 'billion_training.hdf5'
+        with h5py.File(output_path, 'r') as h5file:
+            assert h5file['tokens'].dtype == numpy.int32
+            assert h5file['tokens'].chunks is None
+            assert_equal(h5file['offsets'][...], [0, 5, 9, 13])
+        data, = TokenizedCorpus(output_path).get_data(request=[2, 0])
+        assert_equal(data[0], [0, 5, 4, 1])
+        assert_equal(data[1], [0, 3, 4, 2, 1])
+
+    def test_missing_partition(self):
+        assert_raises(MissingInputFiles, billion.convert_one_billion_word,
+                      self.tempdir, self.tempdir, 'training', [3],
+                      self.dictionary)
+
+
 class TestBinarizedMNIST(object):
     def setUp(self):
         numpy.random.seed(9 + 5 + 2015)
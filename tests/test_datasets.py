@@ -120,6 +120,14 @@ class TestIndexableDataset(object):
     def test_pickling(self):
         cPickle.loads(cPickle.dumps(IndexableDataset({'a': (1, 2)})))
 
+    def test_shard(self):
+        dataset = IndexableDataset(
+            OrderedDict([('foo', list(range(10))),
+                         ('bar', numpy.arange(10) + 1)]), shard=(2, 3))
+        assert dataset.num_examples == 3
+        assert_equal(dataset.get_data(request=[0, 2]), ([6, 8], [7, 9]))
+        assert_raises(ValueError, IndexableDataset, [1, 2], shard=(2, 2))
+
     def test_batch_iteration_scheme_with_lists(self):
         """Batch schemes should work with more than ndarrays."""
         data = IndexableDataset(OrderedDict([('foo', list(range(50))),
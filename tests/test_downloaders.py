@@ -1,11 +1,15 @@
 import argparse
+import hashlib
 import mock
 import os
+import re
 import shutil
 import tempfile
+import threading
 from functools import wraps
 
 from numpy.testing import assert_equal, assert_raises
+import requests
 
 from fuel.downloaders import (adult, binarized_mnist, caltech101_silhouettes,
                               celeba, cifar10, cifar100, dogs_vs_cats, iris,
@@ -13,8 +17,9 @@ from fuel.downloaders import (adult, binarized_mnist, caltech101_silhouettes,
 from fuel.downloaders.base import (download, default_downloader,
                                    filename_from_url, NeedURLPrefix,
                                    ensure_directory_exists)
+from fuel.exceptions import ChecksumError
 from picklable_itertools import chain
-from six.moves import range
+from six.moves import range, BaseHTTPServer, socketserver
 
 mock_url = 'http://mock.com/mock.data'
 mock_filename = 'mock.data'
@@ -42,6 +47,8 @@ def mock_requests(content_disposition=False, content_length=True):
                 cd = 'attachment; filename={}'.format(mock_filename)
                 mock_response.headers['Content-Disposition'] = cd
             mock_requests.get.return_value = mock_response
+            mock_requests.Session.return_value.get.return_value = \
+                mock_response
             return func(*args, **kwargs)
         return wrapper_func
     return mock_decorator
@@ -102,6 +109,7 @@ def test_mnist():
     urls = ['http://yann.lecun.com/exdb/mnist/' + f for f in filenames]
     assert_equal(args.filenames, filenames)
     assert_equal(args.urls, urls)
+    assert len(args.sha256s) == len(filenames)
     assert download_function is default_downloader
 
 
@@ -184,6 +192,7 @@ def test_cifar10():
     urls = ['http://www.cs.toronto.edu/~kriz/cifar-10-python.tar.gz']
     assert_equal(args.filenames, filenames)
     assert_equal(args.urls, urls)
+    assert len(args.sha256s) == len(filenames)
     assert download_function is default_downloader
 
 
@@ -211,6 +220,7 @@ def test_cifar100():
     urls = ['http://www.cs.toronto.edu/~kriz/cifar-100-python.tar.gz']
     assert_equal(args.filenames, filenames)
     assert_equal(args.urls, urls)
+    assert len(args.sha256s) == len(filenames)
     assert download_function is default_downloader
 
 
@@ -304,3 +314,188 @@ class TestDefaultDownloader(object):
                     filenames=['tmp.data'])
         default_downloader(**args)
         assert not os.path.isfile(file_path)
+
+
+class RangeRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        range_ = self.headers.get('Range')
+        server.requests.append((self.path, range_))
+        content = server.files.get(self.path.lstrip('/'))
+        if content is None:
+            self.send_error(404)
+            return
+        start = 0
+        etag = '"{}"'.format(hashlib.sha256(content).hexdigest()[:16])
+        if range_ and server.range_error:
+            self.send_error(server.range_error)
+            return
+        if_range = self.headers.get('If-Range')
+        if (range_ and server.support_ranges and
+                if_range in (None, etag)):
+            start = int(re.match(r'bytes=(\d+)-', range_).group(1))
+            if start >= len(content):
+                self.send_response(416)
+                self.send_header('Content-Range',
+                                 'bytes */{}'.format(len(content)))
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes {}-{}/{}'.format(
+                start, len(content) - 1, len(content)))
+        else:
+            self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(content) - start))
+        self.end_headers()
+        self.wfile.write(content[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn,
+                          BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class TestDefaultDownloaderHTTP(object):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0),
+                                          RangeRequestHandler)
+        self.server.files = dict(
+            ('file{}.data'.format(i), os.urandom(100000 + i))
+            for i in range(3))
+        self.server.requests = []
+        self.server.support_ranges = True
+        self.server.range_error = None
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       kwargs={'poll_interval': 0.01})
+        self.thread.daemon = True
+        self.thread.start()
+        self.url_prefix = 'http://127.0.0.1:{}/'.format(
+            self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tempdir)
+
+    def download(self, filenames, **kwargs):
+        kwargs.setdefault('sha256s', [
+            hashlib.sha256(self.server.files[filename]).hexdigest()
+            for filename in filenames])
+        default_downloader(self.tempdir, [None] * len(filenames),
+                           list(filenames), url_prefix=self.url_prefix,
+                           **kwargs)
+
+    def read(self, filename):
+        with open(os.path.join(self.tempdir, filename), 'rb') as f:
+            return f.read()
+
+    def write_partial(self, filename, content, validator=None):
+        with open(os.path.join(self.tempdir, filename + '.part'), 'wb') as f:
+            f.write(content)
+        if validator is not None:
+            with open(os.path.join(self.tempdir,
+                                   filename + '.part.validator'), 'w') as f:
+                f.write(validator)
+
+    def etag(self, filename):
+        return '"{}"'.format(hashlib.sha256(
+            self.server.files[filename]).hexdigest()[:16])
+
+    def test_concurrent_download(self):
+        filenames = sorted(self.server.files)
+        self.download(filenames, num_workers=3)
+        for filename in filenames:
+            assert self.read(filename) == self.server.files[filename]
+        assert sorted(os.listdir(self.tempdir)) == filenames
+
+    def test_resume(self):
+        content = self.server.files['file0.data']
+        self.write_partial('file0.data', content[:40000])
+        self.download(['file0.data'])
+        assert self.read('file0.data') == content
+        assert self.server.requests == [('/file0.data', 'bytes=40000-')]
+
+    def test_resume_with_validator(self):
+        content = self.server.files['file0.data']
+        self.write_partial('file0.data', content[:40000],
+                           self.etag('file0.data'))
+        self.download(['file0.data'], sha256s=[None])
+        assert self.read('file0.data') == content
+        assert self.server.requests == [('/file0.data', 'bytes=40000-')]
+        assert os.listdir(self.tempdir) == ['file0.data']
+
+    def test_resume_changed_file(self):
+        content = self.server.files['file0.data']
+        self.write_partial('file0.data', b'stale', '"stale"')
+        self.download(['file0.data'], sha256s=[None])
+        assert self.read('file0.data') == content
+
+    def test_resume_unverifiable_partial_download(self):
+        self.write_partial('file0.data', b'garbage')
+        self.download(['file0.data'], sha256s=[None])
+        assert self.read('file0.data') == self.server.files['file0.data']
+        assert self.server.requests == [('/file0.data', None)]
+
+    def test_store_validator(self):
+        validators = []
+        with tempfile.TemporaryFile() as f:
+            download(self.url_prefix + 'file1.data', f, show_progress=False,
+                     store_validator=validators.append)
+        assert validators == [self.etag('file1.data')]
+
+    def test_resume_complete_partial_download(self):
+        content = self.server.files['file0.data']
+        self.write_partial('file0.data', content)
+        self.download(['file0.data'])
+        assert self.read('file0.data') == content
+
+    def test_resume_too_long_partial_download(self):
+        content = self.server.files['file0.data']
+        self.write_partial('file0.data', content + b'garbage',
+                           self.etag('file0.data'))
+        self.download(['file0.data'], sha256s=[None])
+        assert self.read('file0.data') == content
+
+    def test_resume_without_range_support(self):
+        self.server.support_ranges = False
+        self.write_partial('file0.data', b'garbage')
+        self.download(['file0.data'])
+        assert self.read('file0.data') == self.server.files['file0.data']
+
+    def test_resume_error_keeps_partial_download(self):
+        content = self.server.files['file0.data']
+        self.write_partial('file0.data', content[:40000])
+        self.server.range_error = 503
+        assert_raises(requests.HTTPError, self.download, ['file0.data'])
+        with open(os.path.join(self.tempdir, 'file0.data.part'), 'rb') as f:
+            assert f.read() == content[:40000]
+
+    def test_no_resume(self):
+        self.write_partial('file0.data', b'garbage')
+        self.download(['file0.data'], resume=False)
+        assert self.read('file0.data') == self.server.files['file0.data']
+        assert self.server.requests == [('/file0.data', None)]
+
+    def test_checksum_error(self):
+        self.write_partial('file0.data', b'garbage')
+        assert_raises(ChecksumError, self.download, ['file0.data'],
+                      sha256s=['0' * 64])
+        assert not os.listdir(self.tempdir)
+
+    def test_verified_files_skipped(self):
+        with open(os.path.join(self.tempdir, 'file0.data'), 'wb') as f:
+            f.write(self.server.files['file0.data'])
+        self.download(['file0.data', 'file1.data'])
+        assert self.read('file1.data') == self.server.files['file1.data']
+        assert self.server.requests == [('/file1.data', None)]
+
+    def test_download_without_checksum(self):
+        with tempfile.TemporaryFile() as f:
+            download(self.url_prefix + 'file2.data', f, show_progress=False)
+            f.seek(0)
+            assert f.read() == self.server.files['file2.data']
@@ -0,0 +1,57 @@
+import os
+import tempfile
+
+import h5py
+import mock
+import numpy
+from six import StringIO
+
+from fuel.bin import fuel_info
+from fuel.datasets import H5PYDataset
+
+
+def test_recommend_chunks():
+    assert fuel_info.recommend_chunks((1000, 3, 32, 32), 4, 64) == \
+        (64, 3, 32, 32)
+    assert fuel_info.recommend_chunks((1000, 3, 256, 256), 1, 64) == \
+        (5, 3, 256, 256)
+    assert fuel_info.recommend_chunks((10, 3), 8, 64) == (10, 3)
+
+
+def test_format_size():
+    assert fuel_info.format_size(None) == 'N/A'
+    assert fuel_info.format_size(10) == '10 B'
+    assert fuel_info.format_size(3 * 2 ** 20) == '3.0 MiB'
+
+
+class TestExtendedReport(object):
+    def setUp(self):
+        with tempfile.NamedTemporaryFile(suffix='.hdf5', delete=False) as f:
+            self.path = f.name
+        with h5py.File(self.path, mode='w') as h5file:
+            h5file['features'] = numpy.zeros((20, 2, 3), dtype='uint8')
+            h5file.create_dataset(
+                'targets', data=numpy.zeros((20, 1), dtype='float32'),
+                chunks=(20, 1), compression='gzip')
+            h5file.attrs['split'] = H5PYDataset.create_split_array(
+                {'train': {'features': (0, 15), 'targets': (0, 15)},
+                 'test': {'features': (15, 20), 'targets': (15, 20)}})
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_extended(self):
+        with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+            fuel_info.main([self.path, '--extended', '--batch-size', '8',
+                            '--num-batches', '2'])
+        report = stdout.getvalue()
+        assert 'Metadata for' in report
+        assert 'contiguous (memory-mappable)' in report
+        assert 'gzip (4)' in report
+        assert 'examples [15, 20)' in report
+        assert 'h5repack -l targets:CHUNK=8x1' in report
+
+    def test_not_extended(self):
+        with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+            fuel_info.main([self.path])
+        assert 'Sources' not in stdout.getvalue()
@@ -1,12 +1,17 @@
 import os
+import sys
 import tables
+import tempfile
+import threading
+import time
 
 import h5py
+import mock
 import numpy
 from numpy.testing import assert_equal, assert_raises
 from six.moves import range, cPickle
 
-from fuel.datasets.hdf5 import PytablesDataset, H5PYDataset
+from fuel.datasets.hdf5 import PytablesDataset, H5PYDataset, FileHandlePool
 from fuel.streams import DataStream
 from fuel.schemes import SequentialScheme
 
@@ -33,6 +38,21 @@ class TestPytablesDataset(object):
         self.dataset_default.close_file()
         os.remove('tmp.h5')
 
+    def test_cached_rows(self):
+        dataset = PytablesDataset('tmp.h5', ('y',), 20, 500, cache_size=3)
+        assert_equal(dataset.get_data(request=[4, 1, 2])[0],
+                     numpy.array([[24], [21], [22]]))
+        assert list(dataset.row_cache) == [21, 22, 24]
+        assert_equal(dataset.get_data(request=[2, 7])[0],
+                     numpy.array([[22], [27]]))
+        assert list(dataset.row_cache) == [24, 22, 27]
+        assert_equal(dataset.get_data(request=4)[0], [24])
+        assert list(dataset.row_cache) == [22, 27, 24]
+        dataset.close_file()
+        dataset = cPickle.loads(cPickle.dumps(dataset))
+        assert not dataset.row_cache
+        dataset.close_file()
+
     def test_dataset_default(self):
         assert self.dataset_default.start == 0
         assert self.dataset_default.stop == 500
@@ -45,14 +65,269 @@ class TestPytablesDataset(object):
         assert_equal(self.dataset.get_data(request=list(range(10)))[0],
                      numpy.arange(20, 30).reshape(10, 1))
 
+    def test_get_data_unsorted_request(self):
+        request = [7, 3, 4, 5, 0, 3, 200, 6]
+        for request in (request, numpy.array(request)):
+            assert_equal(self.dataset.get_data(request=request)[0],
+                         (numpy.array(request) + 20).reshape(8, 1))
+
+    def test_get_data_integer_request(self):
+        assert_equal(self.dataset.get_data(request=3)[0], [23])
+
+    def test_get_data_open_slice_request(self):
+        assert_equal(self.dataset.get_data(request=slice(None, 5))[0],
+                     numpy.arange(20, 25).reshape(5, 1))
+        assert_equal(self.dataset.get_data(request=slice(475, None))[0],
+                     numpy.arange(495, 500).reshape(5, 1) % 256)
+
+    def test_get_data_empty_request(self):
+        assert self.dataset.get_data(request=[])[0].shape == (0, 1)
+
     def test_get_data_value_error(self):
         assert_raises(ValueError, self.dataset.get_data, None, True)
+        assert_raises(IndexError, self.dataset.get_data, None, [480])
+
+    def test_coalesced_reads(self):
+        node = self.dataset.nodes[0]
+        requests = []
+
+        class Node(object):
+            shape = node.shape
+            dtype = node.dtype
+
+            def __getitem__(self, request):
+                requests.append(request)
+                return node[request]
+        self.dataset.nodes = [Node()]
+        data, = self.dataset.get_data(request=[9, 3, 4, 10, 5])
+        assert_equal(data, numpy.array([29, 23, 24, 30, 25]).reshape(5, 1))
+        assert requests == [slice(23, 26), slice(29, 31)]
 
     def test_pickling(self):
         dataset = cPickle.loads(cPickle.dumps(self.dataset))
         assert_equal(len(dataset.nodes), 1)
 
 
+class TestFileHandlePool(object):
+    def setUp(self):
+        with tempfile.NamedTemporaryFile(suffix='.hdf5', delete=False) as f:
+            self.path = f.name
+        with h5py.File(self.path, mode='w') as h5file:
+            h5file['features'] = numpy.arange(30, dtype='uint8')
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_shared_handle(self):
+        pool = FileHandlePool(linger=0)
+        handle = pool.acquire(self.path)
+        assert pool.acquire(self.path) is handle
+        pool.release(self.path)
+        assert pool.get(self.path) is handle
+        pool.release(self.path)
+        assert not handle
+        assert_raises(IOError, pool.get, self.path)
+        pool.release(self.path)
+
+    def test_linger(self):
+        pool = FileHandlePool(linger=60)
+        handle = pool.acquire(self.path)
+        pool.release(self.path)
+        assert handle
+        assert pool.acquire(self.path) is handle
+        pool.release(self.path)
+        pool.close_all()
+        assert not handle
+        assert not pool.handles
+
+        pool = FileHandlePool(linger=0.01)
+        handle = pool.acquire(self.path)
+        pool.release(self.path)
+        for _ in range(500):
+            if not handle:
+                break
+            time.sleep(0.01)
+        assert not handle
+        assert not pool.handles
+
+    def test_threads(self):
+        pool = FileHandlePool(linger=0)
+        errors = []
+
+        def read():
+            try:
+                for _ in range(20):
+                    handle = pool.acquire(self.path)
+                    assert handle['features'][5] == 5
+                    pool.release(self.path)
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors
+        assert not pool.handles
+        assert not pool.ref_counts
+
+    def test_reopened_after_fork(self):
+        pool = FileHandlePool(linger=0)
+        handle = pool.acquire(self.path)
+        # Pretend to be a child process
+        pool._pid = -1
+        child_handle = pool.get(self.path)
+        assert child_handle is not handle
+        assert child_handle['features'][3] == 3
+        pool.release(self.path)
+        assert not pool.handles
+        handle.close()
+
+    def test_chunk_cache_configuration(self):
+        pool = FileHandlePool(linger=0, rdcc_nbytes=2 ** 22,
+                              rdcc_nslots=10007)
+        handle = pool.acquire(self.path)
+        try:
+            cache = handle.id.get_access_plist().get_cache()
+            assert cache[1:3] == (10007, 2 ** 22)
+        finally:
+            pool.release(self.path)
+
+
+class TestH5PYDatasetMetadataCache(object):
+    def setUp(self):
+        with tempfile.NamedTemporaryFile(suffix='.hdf5', delete=False) as f:
+            self.path = f.name
+        self.write(20)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def write(self, num_train):
+        with h5py.File(self.path, mode='w') as h5file:
+            h5file['features'] = numpy.arange(30, dtype='uint8')
+            h5file.attrs['split'] = H5PYDataset.create_split_array(
+                {'train': {'features': (0, num_train)},
+                 'test': {'features': (num_train, 30)}})
+
+    def test_metadata_read_once(self):
+        with mock.patch.object(H5PYDataset, 'read_metadata',
+                               wraps=H5PYDataset.read_metadata) as read:
+            dataset = H5PYDataset(self.path, which_sets=('train',))
+            assert dataset.num_examples == 20
+            assert read.call_count == 1
+            dataset = H5PYDataset(self.path, which_sets=('test',))
+            assert dataset.num_examples == 10
+            assert read.call_count == 1
+        assert dataset.path not in H5PYDataset._handle_pool.handles
+
+    def test_invalidated_on_modification(self):
+        assert H5PYDataset(self.path, ('train',)).num_examples == 20
+        self.write(25)
+        stat = os.stat(self.path)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+        assert H5PYDataset(self.path, ('train',)).num_examples == 25
+        assert len([key for key in H5PYDataset._metadata_cache
+                    if key[0] == os.path.abspath(self.path)]) == 1
+
+    def test_empty_split_not_requested(self):
+        self.write(30)
+        assert H5PYDataset(self.path, ('train',)).num_examples == 30
+
+    def test_concurrent_construction(self):
+        paths = []
+        for i in range(4):
+            with tempfile.NamedTemporaryFile(suffix='.hdf5',
+                                             delete=False) as f:
+                paths.append(f.name)
+            with h5py.File(paths[-1], mode='w') as h5file:
+                h5file['features'] = numpy.arange(30, dtype='uint8')
+                h5file.attrs['split'] = H5PYDataset.create_split_array(
+                    {'train': {'features': (0, 20)}})
+        # Makes evicting stale entries slow enough for threads to overlap
+        for i in range(100000):
+            H5PYDataset._metadata_cache['dummy', i, 0] = None
+        errors = []
+        if hasattr(sys, 'setswitchinterval'):
+            switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(1e-6)
+
+        def construct(path):
+            try:
+                for i in range(20):
+                    # Each new modification time is a cache miss
+                    os.utime(path, (i, i))
+                    H5PYDataset(path, which_sets=('train',)).num_examples
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=construct, args=(path,))
+                   for path in paths]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            if hasattr(sys, 'setswitchinterval'):
+                sys.setswitchinterval(switch_interval)
+            for key in list(H5PYDataset._metadata_cache):
+                if key[0] == 'dummy':
+                    del H5PYDataset._metadata_cache[key]
+            for path in paths:
+                os.remove(path)
+        assert not errors, errors
+
+    def test_external_file_handle_not_cached(self):
+        with h5py.File(self.path, mode='r') as h5file:
+            H5PYDataset(h5file, which_sets=('train',)).num_examples
+        assert not any(key[0] == os.path.abspath(self.path)
+                       for key in H5PYDataset._metadata_cache)
+
+
+class TestH5PYDatasetMappedSources(object):
+    def setUp(self):
+        with tempfile.NamedTemporaryFile(suffix='.hdf5', delete=False) as f:
+            self.path = f.name
+        self.features = numpy.arange(600, dtype='float32').reshape((100, 6))
+        self.targets = numpy.arange(100, dtype='uint8').reshape((100, 1))
+        with h5py.File(self.path, mode='w') as h5file:
+            h5file['features'] = self.features
+            h5file.create_dataset('targets', data=self.targets,
+                                  compression='gzip')
+            h5file.attrs['split'] = H5PYDataset.create_split_array(
+                {'train': {'features': (10, 90), 'targets': (10, 90)}})
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_contiguous_sources_mapped(self):
+        dataset = H5PYDataset(self.path, which_sets=('train',))
+        features, targets = dataset.mapped_sources
+        assert isinstance(features, numpy.ndarray)
+        assert targets is None
+        dataset = cPickle.loads(cPickle.dumps(dataset))
+        assert dataset.mapped_sources[0] is not None
+        dataset = H5PYDataset(self.path, which_sets=('train',),
+                              load_in_memory=True)
+        assert dataset.mapped_sources == (None, None)
+
+    def test_get_data(self):
+        dataset = H5PYDataset(self.path, which_sets=('train',),
+                              subset=slice(5, 75))
+        state = dataset.open()
+        for request in (3, slice(2, 40), slice(None, None, 7),
+                        [4, 9, 60], [60, 4, 9]):
+            features, targets = dataset.get_data(state, request)
+            if isinstance(request, slice):
+                request = list(range(70))[request]
+            expected = numpy.array(request) + 15
+            assert_equal(features, self.features[expected])
+            assert_equal(targets, self.targets[expected])
+            assert type(features) is numpy.ndarray
+            assert features.flags.writeable
+        dataset.close(state)
+
+
 class TestH5PYDataset(object):
     def setUp(self):
         self.features = numpy.arange(3600, dtype='uint16').reshape((100, 36))
@@ -337,6 +612,16 @@ class TestH5PYDataset(object):
                      (self.features[[0, 2, 4]], self.targets[[0, 2, 4]]))
         dataset.close(handle)
 
+    def test_shard(self):
+        dataset = H5PYDataset(
+            self.h5file, which_sets=('train',), subset=slice(1, 20),
+            shard=(1, 4))
+        assert dataset.num_examples == 4
+        handle = dataset.open()
+        assert_equal(dataset.get_data(handle, slice(0, 4)),
+                     (self.features[5:9], self.targets[5:9]))
+        dataset.close(handle)
+
     def test_vlen_axis_labels(self):
         dataset = H5PYDataset(self.vlen_h5file, which_sets=('train',))
         assert_equal(dataset.axis_labels['features'],
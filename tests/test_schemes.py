@@ -1,10 +1,17 @@
+from collections import OrderedDict
+
 import numpy
-from numpy.testing import assert_raises
+from numpy.testing import assert_allclose, assert_equal, assert_raises
+
+from fuel.datasets import IndexableDataset
 
 from fuel.schemes import (ConstantScheme, SequentialExampleScheme,
                           SequentialScheme, ShuffledExampleScheme,
                           ShuffledScheme, ConcatenatedScheme,
-                          cross_validation)
+                          ShardedScheme, FeistelPermutation,
+                          LazyShuffledScheme, LazyShuffledExampleScheme,
+                          AliasTable, WeightedSampleScheme,
+                          StratifiedBatchScheme, cross_validation)
 
 
 def iterator_requester(scheme):
@@ -135,6 +142,184 @@ def test_concatenated_scheme_infers_request_type():
                  SequentialExampleScheme(examples=10)]).requests_examples
 
 
+def test_sharded_scheme():
+    def shards(scheme, world_size, **kwargs):
+        return [list(ShardedScheme(scheme, rank, world_size,
+                                   **kwargs).get_request_iterator())
+                for rank in range(world_size)]
+    scheme = SequentialScheme(10, 3)
+    assert shards(scheme, 2) == [[[0, 1, 2], [6, 7, 8]],
+                                 [[3, 4, 5], [9]]]
+    assert shards(scheme, 3) == [[[0, 1, 2], [9]], [[3, 4, 5], [0, 1, 2]],
+                                 [[6, 7, 8], [3, 4, 5]]]
+    assert shards(scheme, 3, remainder='drop') == [[[0, 1, 2]], [[3, 4, 5]],
+                                                   [[6, 7, 8]]]
+    assert shards(scheme, 3, contiguous=True) == [
+        [[0, 1, 2], [3, 4, 5]], [[6, 7, 8], [9]], [[0, 1, 2], [3, 4, 5]]]
+    assert shards(SequentialExampleScheme(5), 2, remainder='drop',
+                  contiguous=True) == [[0, 1], [2, 3]]
+    assert ShardedScheme(SequentialExampleScheme(5), 0, 2).requests_examples
+
+    # Workers agree on the shuffled order of every epoch
+    schemes = [ShardedScheme(ShuffledScheme(12, 2), rank, 3, seed=5)
+               for rank in range(3)]
+    for epoch in range(2):
+        requests = [list(scheme.get_request_iterator())
+                    for scheme in schemes]
+        assert sorted(sum(sum(requests, []), [])) == list(range(12))
+    assert requests[0] != list(ShardedScheme(
+        ShuffledScheme(12, 2), 0, 3, seed=5).get_request_iterator())
+
+    assert_raises(ValueError, ShardedScheme, scheme, 2, 2)
+    assert_raises(ValueError, ShardedScheme, scheme, 0, 2, remainder='wrap')
+
+
+def test_feistel_permutation():
+    rng = numpy.random.RandomState(1)
+    for num_examples in (1, 2, 5, 16, 17, 1000):
+        permutation = FeistelPermutation(num_examples,
+                                         rng.randint(2 ** 30, size=4))
+        permuted = permutation(numpy.arange(num_examples))
+        assert sorted(permuted.tolist()) == list(range(num_examples))
+        assert_equal(permutation([num_examples - 1, 0]),
+                     permuted[[num_examples - 1, 0]])
+
+
+def test_lazy_shuffled_scheme():
+    scheme = LazyShuffledScheme(10, 3, rng=numpy.random.RandomState(3))
+    assert not scheme.requests_examples
+    epochs = [list(scheme.get_request_iterator()) for _ in range(2)]
+    for epoch in epochs:
+        assert [len(batch) for batch in epoch] == [3, 3, 3, 1]
+        assert sorted(sum(epoch, [])) == list(range(10))
+    assert epochs[0] != epochs[1]
+    assert epochs[0] == list(LazyShuffledScheme(
+        10, 3, rng=numpy.random.RandomState(3)).get_request_iterator())
+
+    request_iterator = LazyShuffledScheme(
+        10, 3, rng=numpy.random.RandomState(3)).get_request_iterator()
+    request_iterator.seek(2)
+    assert list(request_iterator) == epochs[0][2:]
+
+    scheme = LazyShuffledScheme([10, 20, 30, 40, 50], 2, sorted_indices=True)
+    epoch = list(scheme.get_request_iterator())
+    assert all(batch == sorted(batch) for batch in epoch)
+    assert sorted(sum(epoch, [])) == [10, 20, 30, 40, 50]
+
+
+def test_lazy_shuffled_example_scheme():
+    scheme = LazyShuffledExampleScheme(range(5, 25, 2))
+    assert scheme.requests_examples
+    epoch = list(scheme.get_request_iterator())
+    assert sorted(epoch) == list(range(5, 25, 2))
+    assert all(isinstance(index, int) for index in epoch)
+    assert list(LazyShuffledExampleScheme(0).get_request_iterator()) == []
+
+
+def test_alias_table():
+    rng = numpy.random.RandomState(1)
+    for weights in ([1, 1, 1], [0, 2, 0, 1], [100, 1, 1, 1, 1],
+                    rng.exponential(size=100) ** 3):
+        table = AliasTable(weights)
+        # The probability of each outcome implied by the table
+        probabilities = table.accept.copy()
+        numpy.add.at(probabilities, table.alias, 1 - table.accept)
+        assert_allclose(probabilities / len(table),
+                        numpy.divide(weights, numpy.sum(weights)))
+    samples = AliasTable([0, 1, 3]).sample(10000, rng)
+    assert_allclose(numpy.bincount(samples) / 10000., [0, 0.25, 0.75],
+                    atol=0.02)
+    assert_raises(ValueError, AliasTable, [])
+    assert_raises(ValueError, AliasTable, [0, 0])
+    assert_raises(ValueError, AliasTable, [1, -1])
+
+
+def test_weighted_sample_scheme():
+    scheme = WeightedSampleScheme([0, 1, 3], num_examples=1000,
+                                  batch_size=300)
+    assert not scheme.requests_examples
+    batches = list(scheme.get_request_iterator())
+    assert [len(batch) for batch in batches] == [300, 300, 300, 100]
+    assert 0 not in sum(batches, [])
+
+    scheme = WeightedSampleScheme([0, 1, 3, 1], replacement=False,
+                                  num_examples=3)
+    assert scheme.requests_examples
+    for _ in range(5):
+        assert sorted(scheme.get_request_iterator()) == [1, 2, 3]
+    scheme.num_examples = 4
+    assert_raises(ValueError, scheme.get_request_iterator)
+
+    dataset = IndexableDataset(OrderedDict([('features', numpy.eye(3)),
+                                            ('weights', [1, 0, 1])]))
+    scheme = WeightedSampleScheme(dataset, num_examples=20)
+    assert set(scheme.get_request_iterator()) == {0, 2}
+
+
+class ReadLogger(object):
+    """An indexable which logs the reads of a source."""
+    def __init__(self, name, data, reads):
+        self.name = name
+        self.data = data
+        self.reads = reads
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        self.reads.append(self.name)
+        return self.data[key]
+
+
+def test_weighted_sample_scheme_reads_only_weights():
+    dataset = IndexableDataset(OrderedDict([('features', numpy.eye(3)),
+                                            ('weights', [1, 0, 1])]))
+    reads = []
+    dataset.indexables = [
+        ReadLogger(source, indexable, reads)
+        for source, indexable in zip(dataset.sources, dataset.indexables)]
+    scheme = WeightedSampleScheme(dataset, num_examples=20)
+    assert set(scheme.get_request_iterator()) == {0, 2}
+    assert reads == ['weights']
+    assert dataset.sources == ('features', 'weights')
+    assert_raises(ValueError, WeightedSampleScheme(
+        dataset, source='targets').get_request_iterator)
+
+
+def test_stratified_batch_scheme():
+    dataset = IndexableDataset(OrderedDict([
+        ('features', numpy.zeros(10)),
+        ('targets', numpy.array([[0]] * 7 + [[1]] * 2 + [[2]]))]))
+    labels = dataset.indexables[1].ravel()
+    scheme = StratifiedBatchScheme(dataset, 4, replacement=False)
+    batches = list(scheme.get_request_iterator())
+    assert len(batches) == 3
+    for batch in batches:
+        assert len(batch) == 4
+        assert set(labels[batch]) == {0, 1, 2}
+    class_0 = [index for batch in batches for index in batch
+               if labels[index] == 0]
+    assert len(set(class_0)) == len(class_0)
+
+    scheme = StratifiedBatchScheme(labels, 6, num_batches=5,
+                                   class_weights={0: 4, 1: 2})
+    for batch in scheme.get_request_iterator():
+        assert_equal(numpy.bincount(labels[batch], minlength=3), [4, 2, 0])
+    scheme = StratifiedBatchScheme(labels, 6, class_weights={3: 1})
+    assert_raises(ValueError, scheme.get_request_iterator)
+
+
+def test_scheme_state_dict():
+    scheme = ConcatenatedScheme([ShuffledScheme(7, 3),
+                                 ShardedScheme(ShuffledScheme(7, 2), 0, 2)])
+    state_dict = scheme.state_dict()
+    expected = list(scheme.get_request_iterator())
+    assert list(scheme.get_request_iterator()) != expected
+    scheme.load_state_dict(state_dict)
+    assert list(scheme.get_request_iterator()) == expected
+    assert SequentialScheme(7, 3).state_dict() == {}
+
+
 def test_cross_validation():
     # test raise when strict=True
     cross = cross_validation(SequentialExampleScheme, 10, 3)
@@ -1,14 +1,18 @@
+import os
 import tempfile
 
+import h5py
 import numpy
 from numpy.testing import assert_raises
 from six import BytesIO
 from six.moves import cPickle
 
-from fuel.datasets import TextFile, IterableDataset, IndexableDataset
-from fuel.schemes import SequentialScheme
+from fuel.datasets import (TextFile, TokenizedCorpus, IterableDataset,
+                           IndexableDataset)
+from fuel.schemes import SequentialScheme, ShuffledScheme
 from fuel.streams import DataStream
-from fuel.transformers.sequences import Window, NGrams
+from fuel.transformers.sequences import (Window, NGrams, BatchedWindow,
+                                         BatchedNGrams)
 
 
 def lower(s):
@@ -55,6 +59,77 @@ def test_text():
     assert sentence[-3:] == [2, 4, 28]
 
 
+def test_text_blocks_and_dtype():
+    with tempfile.NamedTemporaryFile(mode='w', delete=False) as f:
+        sentences = f.name
+        f.write("This is a sentence\n")
+        f.write("\n")
+        f.write("This another one")
+    dictionary = {'<UNK>': 0, '<S>': 1, '</S>': 2, 'this': 3, 'a': 4}
+    expected = [[1, 3, 0, 4, 0, 2], [1, 2], [1, 3, 0, 0, 2]]
+    for block_size in (1, 2, 1024):
+        text_data = TextFile(files=[sentences], dictionary=dictionary,
+                             preprocess=lower, block_size=block_size)
+        assert [s for s, in DataStream(text_data).get_epoch_iterator()] == \
+            expected
+    text_data = TextFile(files=[sentences], dictionary=dictionary,
+                         preprocess=lower, dtype='int32', block_size=2)
+    epoch = list(DataStream(text_data).get_epoch_iterator())
+    for (sentence,), expected_sentence in zip(epoch, expected):
+        assert sentence.dtype == numpy.int32
+        assert sentence.tolist() == expected_sentence
+    text_data = TextFile(files=[sentences], dictionary=dictionary,
+                         unk_token=None)
+    assert_raises(KeyError, next, DataStream(text_data).get_epoch_iterator())
+
+    # Unknown characters are replaced for the whole block at once
+    dictionary = {'<UNK>': 0, '<S>': 1, '</S>': 2, 't': 3, 'h': 4, ' ': 5}
+    expected = [[1, 3, 4, 0, 0, 5, 0, 0, 5, 0, 5, 0, 0, 0, 3, 0, 0, 0, 0, 2],
+                [1, 2],
+                [1, 3, 4, 0, 0, 5, 0, 0, 0, 3, 4, 0, 0, 5, 0, 0, 0, 2]]
+    for dtype in (None, 'int32'):
+        text_data = TextFile(files=[sentences], dictionary=dictionary,
+                             preprocess=lower, level='character',
+                             dtype=dtype, block_size=2)
+        epoch = list(DataStream(text_data).get_epoch_iterator())
+        assert [list(sentence) for sentence, in epoch] == expected
+    text_data = TextFile(files=[sentences], dictionary=dictionary,
+                         level='character', unk_token=None)
+    assert_raises(KeyError, next, DataStream(text_data).get_epoch_iterator())
+
+
+def test_tokenized_corpus():
+    sentences = [[1, 2, 3], [4], [], [5, 6], [7, 8, 9, 10]]
+    with tempfile.NamedTemporaryFile(suffix='.hdf5', delete=False) as f:
+        path = f.name
+    try:
+        with h5py.File(path, 'w') as h5file:
+            h5file['tokens'] = numpy.arange(1, 11, dtype='int32')
+            h5file['offsets'] = numpy.array([0, 3, 4, 4, 6, 10], dtype='int64')
+        dataset = TokenizedCorpus(path)
+        assert dataset.num_examples == 5
+        assert dataset.get_data(request=3)[0].tolist() == [5, 6]
+        assert dataset.get_data(request=slice(None, 0)) == ([],)
+        for request in (slice(1, 4), [4, 0, 2]):
+            data, = dataset.get_data(request=request)
+            expected = (sentences[request] if isinstance(request, slice)
+                        else [sentences[i] for i in request])
+            assert [sentence.tolist() for sentence in data] == expected
+        stream = DataStream(dataset, iteration_scheme=ShuffledScheme(5, 2))
+        epoch = [sentence.tolist() for batch, in stream.get_epoch_iterator()
+                 for sentence in batch]
+        assert sorted(epoch) == sorted(sentences)
+
+        dataset = cPickle.loads(cPickle.dumps(TokenizedCorpus(
+            path, subset=slice(2, 5))))
+        assert dataset.num_examples == 3
+        assert [sentence.tolist() for sentence, in
+                dataset.get_example_stream().get_epoch_iterator()] == \
+            sentences[2:]
+    finally:
+        os.remove(path)
+
+
 def test_ngram_stream():
     sentences = [list(numpy.random.randint(10, size=sentence_length))
                  for sentence_length in [3, 5, 7]]
@@ -85,6 +160,43 @@ def test_window_stream():
     assert i == 1  # Should get 2 examples
 
 
+def test_batched_window_stream():
+    sentences = [list(numpy.random.randint(10, size=sentence_length))
+                 for sentence_length in [3, 5, 7, 2, 9]]
+    stream = DataStream(IterableDataset(sentences))
+    for args in [(0, 4, 4, True), (-2, 4, 4, False), (-2, 4, 4, True),
+                 (1, 3, 2, False), (0, 3, 1, False)]:
+        expected = list(Window(*(args + (stream,))).get_epoch_iterator())
+        windows = BatchedWindow(*(args + (stream,)))
+        batches = list(windows.get_epoch_iterator())
+        assert not windows.produces_examples
+        assert all(len(source) == len(target) > 0
+                   for source, target in batches)
+        assert [(source.tolist(), target.tolist())
+                for batch in batches for source, target in zip(*batch)] == \
+            expected
+    batch_stream = DataStream(IndexableDataset(sentences),
+                              iteration_scheme=SequentialScheme(5, 2))
+    source, target = next(BatchedWindow(
+        0, 3, 1, False, batch_stream).get_epoch_iterator())
+    assert source.shape == (2, 3)
+    assert target.shape == (2, 1)
+
+
+def test_batched_ngram_stream():
+    sentences = [list(numpy.random.randint(10, size=sentence_length))
+                 for sentence_length in [3, 5, 7]]
+    stream = DataStream(IterableDataset(sentences))
+    expected = list(NGrams(4, stream).get_epoch_iterator())
+    ngrams = BatchedNGrams(4, stream)
+    assert ngrams.sources == ('data', 'targets')
+    sources, targets = zip(*ngrams.get_epoch_iterator())
+    assert numpy.concatenate(sources).tolist() == [s for s, t in expected]
+    assert numpy.concatenate(targets).tolist() == [t for s, t in expected]
+    stream.sources = ('1', '2')
+    assert_raises(ValueError, BatchedNGrams, 4, stream)
+
+
 def test_ngram_stream_error_on_multiple_sources():
     # Check that NGram accepts only data streams with one source
     sentences = [list(numpy.random.randint(10, size=sentence_length))
@@ -1,3 +1,4 @@
+import sys
 from multiprocessing import Process
 
 from numpy.testing import assert_allclose, assert_raises
@@ -34,6 +35,25 @@ class TestServer(object):
                 assert_allclose(*data)
         assert_raises(StopIteration, next, server_data)
 
+    def test_aget_epoch_iterator(self):
+        if sys.version_info < (3, 5):
+            raise SkipTest("asyncio iteration requires Python 3.5")
+        import asyncio
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            server_data = self.stream.aget_epoch_iterator()
+            expected_data = get_stream().get_epoch_iterator()
+            for e in expected_data:
+                s = loop.run_until_complete(server_data.__anext__())
+                for data in zip(s, e):
+                    assert_allclose(*data)
+            assert_raises(StopAsyncIteration,  # noqa
+                          loop.run_until_complete, server_data.__anext__())
+        finally:
+            loop.close()
+            asyncio.set_event_loop(None)
+
     def test_pickling(self):
         try:
             self.stream = cPickle.loads(cPickle.dumps(self.stream))
@@ -1,9 +1,20 @@
+import sys
+import time
+from collections import OrderedDict
+
 import numpy
+from nose.exc import SkipTest
 from numpy.testing import assert_equal, assert_raises
 
+from six.moves import cPickle
+
 from fuel.datasets import IterableDataset, IndexableDataset
-from fuel.schemes import SequentialExampleScheme, SequentialScheme
+from fuel.iterator import SourceTuple
+from fuel.schemes import (ConstantScheme, LazyShuffledScheme,
+                          SequentialExampleScheme, SequentialScheme,
+                          ShuffledExampleScheme, ShuffledScheme)
 from fuel.streams import AbstractDataStream, DataStream
+from fuel.transformers import Batch, Mapping, Merge, Rename
 
 
 class DummyDataStream(AbstractDataStream):
@@ -63,3 +74,190 @@ class TestDataStream(object):
         stream = DataStream(self.dataset,
                             iteration_scheme=SequentialExampleScheme(2))
         assert stream.produces_examples
+
+    def test_source_tuple(self):
+        stream = DataStream(IndexableDataset(
+            OrderedDict([('features', [1, 2]), ('targets', [3, 4])])),
+            iteration_scheme=SequentialScheme(2, 1))
+        batch = next(stream.get_epoch_iterator())
+        assert isinstance(batch, SourceTuple)
+        assert batch == ([1], [3])
+        assert batch.get('targets') == batch[1] == [3]
+        assert batch[:1] == ([1],)
+        assert_raises(KeyError, batch.get, 'weights')
+        assert_raises(TypeError, batch.__getitem__, 'targets')
+        assert batch.as_dict() == {'features': [1], 'targets': [3]}
+        unpickled = cPickle.loads(cPickle.dumps(batch))
+        assert type(unpickled) is type(batch)
+        assert unpickled.get('features') == [1]
+        # Data streams return the container, which is passed through
+        data = stream.get_data(next(stream.iteration_scheme
+                                    .get_request_iterator()))
+        assert type(data) is type(batch)
+        renamed = Rename(stream, {'targets': 'labels'})
+        returned = []
+        get_data = renamed.get_data
+        renamed.get_data = lambda request=None: returned.append(
+            get_data(request)) or returned[-1]
+        batch = next(renamed.get_epoch_iterator())
+        assert batch is returned[0]
+        assert_equal(batch.get('labels'), [3])
+
+
+class CountingDataset(IndexableDataset):
+    def __init__(self, *args, **kwargs):
+        super(CountingDataset, self).__init__(*args, **kwargs)
+        self.num_requests = 0
+
+    def get_data(self, state=None, request=None):
+        self.num_requests += 1
+        return super(CountingDataset, self).get_data(state, request)
+
+
+class RandomShift(Mapping):
+    def __init__(self, data_stream):
+        self.rng = numpy.random.RandomState(1)
+        super(RandomShift, self).__init__(data_stream, self.shift)
+
+    def shift(self, data):
+        return tuple(d + self.rng.uniform() for d in data)
+
+
+class TestStateDict(object):
+    def setUp(self):
+        self.data = numpy.arange(20)
+
+    def get_stream(self, dataset):
+        return RandomShift(DataStream(
+            dataset, iteration_scheme=ShuffledScheme(20, 3)))
+
+    def test_resume_mid_epoch(self):
+        stream = self.get_stream(IndexableDataset(self.data))
+        epoch = stream.get_epoch_iterator()
+        for _ in range(3):
+            next(epoch)
+        state_dict = cPickle.loads(cPickle.dumps(stream.state_dict()))
+        expected = list(epoch) + list(stream.get_epoch_iterator())
+
+        dataset = CountingDataset(self.data)
+        stream = self.get_stream(dataset)
+        stream.load_state_dict(state_dict)
+        resumed = list(stream.get_epoch_iterator())
+        assert dataset.num_requests == 4
+        resumed += list(stream.get_epoch_iterator())
+        assert_equal(resumed, expected)
+
+    def test_resume_lazy_shuffled_scheme(self):
+        def get_stream():
+            return DataStream(IndexableDataset(self.data),
+                              iteration_scheme=LazyShuffledScheme(20, 3))
+        stream = get_stream()
+        epoch = stream.get_epoch_iterator()
+        next(epoch)
+        state_dict = stream.state_dict()
+        stream = get_stream()
+        stream.load_state_dict(state_dict)
+        resumed = stream.get_epoch_iterator()
+        assert resumed.request_iterator.position == 1
+        assert_equal(list(resumed), list(epoch))
+
+    def test_resume_without_iteration_scheme(self):
+        stream = Batch(DataStream(IterableDataset(self.data)),
+                       iteration_scheme=ConstantScheme(6))
+        epoch = stream.get_epoch_iterator()
+        next(epoch)
+        state_dict = stream.state_dict()
+        assert state_dict['data_stream'] == {'position': 6}
+        expected = list(epoch)
+        stream = Batch(DataStream(IterableDataset(self.data)),
+                       iteration_scheme=ConstantScheme(6))
+        stream.load_state_dict(state_dict)
+        assert_equal(list(stream.get_epoch_iterator()), expected)
+
+    def test_merge(self):
+        def get_stream():
+            return Merge([DataStream(
+                IndexableDataset(self.data),
+                iteration_scheme=ShuffledExampleScheme(20)),
+                          DataStream(IterableDataset(self.data))],
+                         ('a', 'b'))
+        stream = get_stream()
+        epoch = stream.get_epoch_iterator()
+        next(epoch)
+        state_dict = stream.state_dict()
+        stream = get_stream()
+        stream.load_state_dict(state_dict)
+        assert_equal(list(stream.get_epoch_iterator()), list(epoch))
+
+
+def drain_async(loop, epoch_iterator):
+    # Consumes an asynchronous iterator without `async for` syntax
+    data = []
+    while True:
+        try:
+            data.append(loop.run_until_complete(epoch_iterator.__anext__()))
+        except StopAsyncIteration:  # noqa
+            return data
+
+
+class SlowDataset(IndexableDataset):
+    def get_data(self, state=None, request=None):
+        time.sleep(0.05)
+        return super(SlowDataset, self).get_data(state, request)
+
+
+class TestAsyncEpochIterator(object):
+    def setUp(self):
+        if sys.version_info < (3, 5):
+            raise SkipTest("asyncio iteration requires Python 3.5")
+        import asyncio
+        self.asyncio = asyncio
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.stream = DataStream(IndexableDataset(numpy.arange(10)),
+                                 iteration_scheme=SequentialScheme(10, 3))
+
+    def tearDown(self):
+        self.loop.close()
+        self.asyncio.set_event_loop(None)
+
+    def test_matches_blocking_iterator(self):
+        expected = list(self.stream.get_epoch_iterator())
+        for prefetch in (0, 1, 4):
+            epoch = self.stream.aget_epoch_iterator(prefetch=prefetch)
+            assert_equal(drain_async(self.loop, epoch), expected)
+            assert_raises(StopAsyncIteration,  # noqa
+                          self.loop.run_until_complete, epoch.__anext__())
+
+    def test_as_dict(self):
+        epoch = self.stream.aget_epoch_iterator(as_dict=True)
+        assert_equal(drain_async(self.loop, epoch)[-1], {'data': [9]})
+
+    def test_exceptions_are_propagated(self):
+        def fail(data):
+            raise KeyError
+        epoch = Mapping(self.stream, fail).aget_epoch_iterator()
+        assert_raises(KeyError, self.loop.run_until_complete,
+                      epoch.__anext__())
+
+    def test_state_dict_ignores_prefetched_data(self):
+        epoch = self.stream.aget_epoch_iterator(prefetch=3)
+        self.loop.run_until_complete(epoch.__anext__())
+        time.sleep(0.1)
+        state_dict = self.stream.state_dict()
+        assert state_dict['position'] == 1
+        self.loop.run_until_complete(epoch.aclose())
+        self.stream.load_state_dict(state_dict)
+        assert_equal(next(self.stream.get_epoch_iterator()), ([3, 4, 5],))
+
+    def test_streams_are_read_concurrently(self):
+        streams = [DataStream(SlowDataset(numpy.arange(10)),
+                              iteration_scheme=SequentialScheme(10, 1))
+                   for _ in range(4)]
+        epochs = [stream.aget_epoch_iterator(prefetch=0)
+                  for stream in streams]
+        start = time.time()
+        for _ in range(10):
+            self.loop.run_until_complete(self.asyncio.gather(
+                *[epoch.__anext__() for epoch in epochs]))
+        assert time.time() - start < 4 * 10 * 0.05
@@ -1,17 +1,29 @@
 from functools import partial
+import json
 import operator
 import os
 import shutil
+import subprocess
+import sys
+import tarfile
 import tempfile
 import time
+import zipfile
 
+import h5py
+import mock
 import numpy
-from numpy.testing import assert_raises, assert_equal
+from nose.exc import SkipTest
+from numpy.testing import assert_allclose, assert_raises, assert_equal
+from six import BytesIO
 from six.moves import range, cPickle
 
 from fuel import config
+from fuel.datasets import H5PYDataset
 from fuel.iterator import DataIterator
 from fuel.utils import do_not_pickle_attributes, find_in_data_path, Subset
+from fuel.utils.formats import iter_archive
+from fuel.utils import stats
 from fuel.utils.parallel import producer_consumer
 
 
@@ -262,6 +274,61 @@ class TestDoNotPickleAttributes(object):
         assert_raises(ValueError, getattr, NonLoadingClass(), 'attribute')
 
 
+def import_in_subprocess(statement):
+    """Returns the time an import took and the modules it loaded."""
+    code = ("import json, sys, time\n"
+            "start = time.time()\n"
+            "{}\n"
+            "print(json.dumps([time.time() - start, list(sys.modules)]))"
+            .format(statement))
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [root] + os.environ.get('PYTHONPATH', '').split(os.pathsep)))
+    output = subprocess.check_output([sys.executable, '-c', code], env=env)
+    return json.loads(output.decode('utf-8').splitlines()[-1])
+
+
+class TestLazyImports(object):
+    def setUp(self):
+        if sys.version_info < (3, 5):
+            raise SkipTest("attributes are imported eagerly before 3.5")
+
+    def test_packages_import_submodules_lazily(self):
+        for package in ('fuel.datasets', 'fuel.transformers',
+                        'fuel.converters', 'fuel.downloaders'):
+            _, modules = import_in_subprocess('import ' + package)
+            for module in ('fuel.datasets.mnist', 'fuel.datasets.hdf5',
+                           'fuel.transformers.image', 'fuel.converters.mnist',
+                           'fuel.downloaders.mnist', 'tables', 'PIL', 'zmq'):
+                assert module not in modules, (package, module)
+
+    def test_attributes_are_imported_on_access(self):
+        _, modules = import_in_subprocess(
+            'from fuel.datasets import MNIST\n'
+            'import fuel.transformers\n'
+            'fuel.transformers.image')
+        assert 'fuel.datasets.mnist' in modules
+        assert 'fuel.transformers.image' in modules
+        assert 'fuel.datasets.svhn' not in modules
+
+    def test_import_time(self):
+        # Guards against regressions that import every dataset again
+        lazy_time = min(import_in_subprocess('import fuel.datasets')[0]
+                        for _ in range(3))
+        eager_time = min(import_in_subprocess(
+            'import fuel.datasets\n'
+            'from fuel.datasets import *')[0] for _ in range(3))
+        assert lazy_time < eager_time
+
+    def test_star_import_exports_everything(self):
+        import fuel.transformers
+        assert 'Mapping' in fuel.transformers.__all__
+        assert 'image' in fuel.transformers.__all__
+        import fuel.datasets
+        assert 'MNIST' in dir(fuel.datasets)
+        assert_raises(AttributeError, getattr, fuel.datasets, 'NoDataset')
+
+
 def send_integers(socket, n):
     socket.send_pyobj(n)
     for i in range(n):
@@ -286,3 +353,88 @@ def test_producer_consumer():
     assert (producer_consumer(partial(send_integers, n=2000),
                               receive_integers) ==
             sum(i ** 2 for i in range(2000)))
+
+
+def test_iter_archive():
+    members = [('a/1.png', b'one'), ('a/2.txt', b'two'), ('3.png', b'')]
+    zip_buffer = BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w') as zip_file:
+        zip_file.writestr('a/', b'')
+        for name, data in members:
+            zip_file.writestr(name, data)
+    tar_buffer = BytesIO()
+    with tarfile.open(fileobj=tar_buffer, mode='w:gz') as tar:
+        directory = tarfile.TarInfo('a')
+        directory.type = tarfile.DIRTYPE
+        tar.addfile(directory)
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, BytesIO(data))
+    for archive in (zip_buffer, tar_buffer):
+        archive.seek(0)
+        assert list(iter_archive(archive)) == members
+        archive.seek(0)
+        assert list(iter_archive(
+            archive, lambda name: name.endswith('.png'))) == \
+            [members[0], members[2]]
+
+
+class TestStats(object):
+    def setUp(self):
+        numpy.random.seed(1234)
+        self.features = numpy.random.randint(
+            0, 256, (23, 3, 4, 5)).astype('uint8')
+        with tempfile.NamedTemporaryFile(suffix='.hdf5', delete=False) as f:
+            self.path = f.name
+        with h5py.File(self.path, mode='w') as h5file:
+            h5file['features'] = self.features
+            for i, label in enumerate(('batch', 'channel', 'height',
+                                       'width')):
+                h5file['features'].dims[i].label = label
+            h5file.attrs['split'] = H5PYDataset.create_split_array(
+                {'train': {'features': (0, 20)},
+                 'test': {'features': (20, 23)}})
+        self.dataset = H5PYDataset(self.path, which_sets=('train',))
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_per_channel(self):
+        features = self.features[:20]
+        for num_workers in (1, 2):
+            result = stats.compute_stats(
+                self.dataset, axes=('channel',), batch_size=3,
+                num_workers=num_workers)['features']
+            assert result.count == 20 * 4 * 5
+            assert_allclose(result.mean,
+                            features.mean(axis=(0, 2, 3))[:, None, None])
+            assert_allclose(result.std,
+                            features.std(axis=(0, 2, 3))[:, None, None])
+            assert_equal(result.min,
+                         features.min(axis=(0, 2, 3))[:, None, None])
+            assert_equal(result.max,
+                         features.max(axis=(0, 2, 3))[:, None, None])
+
+    def test_histogram(self):
+        result = stats.compute_stats(self.dataset, bins=4, hist_range=(0, 256),
+                                     batch_size=7)['features']
+        assert_equal(result.histogram, numpy.histogram(
+            self.features[:20], bins=4, range=(0, 256))[0])
+        assert_allclose(result.mean, self.features[:20].mean())
+        assert result.mean.shape == (1, 1, 1)
+        assert_raises(ValueError, stats.RunningStats, bins=4)
+
+    def test_cached(self):
+        result = stats.get_stats(self.dataset, axes=('channel',))
+        with mock.patch.object(stats, 'compute_stats') as compute_stats:
+            cached = stats.get_stats(self.dataset, axes=('channel',))
+            assert not compute_stats.called
+            stats.get_stats(H5PYDataset(self.path, which_sets=('test',)),
+                            axes=('channel',))
+            assert compute_stats.called
+        cached = cached['features']
+        assert cached.count == result['features'].count
+        assert_equal(cached.mean, result['features'].mean)
+        assert_equal(cached.m2, result['features'].m2)
+        assert cached.histogram is None
@@ -12,7 +12,10 @@ from fuel.streams import DataStream
 from fuel.transformers.image import (ImagesFromBytes,
                                      MinimumImageDimensions,
                                      RandomFixedSizeCrop,
-                                     Random2DRotation)
+                                     Random2DRotation,
+                                     RandomFlip,
+                                     RandomAffineTransformation,
+                                     RandomBrightnessContrast)
 
 
 def reorder_axes(shp):
@@ -192,6 +195,60 @@ class TestMinimumDimensions(ImageTestingMixin):
                     example.shape[0] == shp[1]
                     for example, shp in zip(batch[1], shapes))
 
+    def test_minimum_dimensions_ndarray_batch(self):
+        stream = MinimumImageDimensions(self.batch_stream, (4, 5),
+                                        which_sources=('source3',))
+        batch = numpy.stack([self.dataset.indexables[2][2]] * 3)
+        out = stream.transform_source_batch(batch, 'source3')
+        assert isinstance(out, numpy.ndarray)
+        assert out.shape == (3, 3, 7, 5)
+        assert out.dtype == numpy.uint8
+        expected = stream.transform_source_example(batch[0], 'source3')
+        for image in out:
+            assert_equal(image, expected)
+        large = numpy.zeros((2, 3, 6, 6), dtype='uint8')
+        assert stream.transform_source_batch(large, 'source3') is large
+
+    def test_minimum_dimensions_grouped_batch(self):
+        stream = MinimumImageDimensions(self.batch_stream, (4, 5),
+                                        which_sources=('source3',))
+        source3 = self.dataset.indexables[2]
+        out = stream.transform_source_batch(source3, 'source3')
+        assert isinstance(out, list)
+        for image, original in zip(out, source3):
+            assert_equal(image, stream.transform_source_example(original,
+                                                                'source3'))
+        out = stream.transform_source_batch([source3[0], source3[0]],
+                                            'source3')
+        assert isinstance(out, numpy.ndarray)
+        assert out.shape == (2, 3, 5, 9)
+
+    def test_minimum_dimensions_thread_pool(self):
+        stream = MinimumImageDimensions(self.batch_stream, (4, 5),
+                                        resample='bilinear', num_threads=2,
+                                        which_sources=('source3',))
+        source3 = self.dataset.indexables[2]
+        out = stream.transform_source_batch(source3, 'source3')
+        for image, original in zip(out, source3):
+            assert_equal(image, stream.transform_source_example(original,
+                                                                'source3'))
+        pool = stream._pool
+        stream.close()
+        assert not hasattr(stream, '_pool')
+        assert_raises(ValueError, pool.map, abs, [1])
+        out = stream.transform_source_batch(source3, 'source3')
+        assert len(out) == len(source3)
+        stream.close()
+
+    def test_minimum_dimensions_nearest_matches_pil(self):
+        stream = MinimumImageDimensions(self.example_stream, (7, 11),
+                                        which_sources=('source3',))
+        image = self.dataset.indexables[2][0]
+        out = stream.transform_source_example(image, 'source3')
+        pil_image = Image.fromarray(image.transpose(1, 2, 0)).resize(
+            (13, 7), resample=Image.NEAREST)
+        assert_equal(out, numpy.array(pil_image).transpose(2, 0, 1))
+
     def test_axes_exception(self):
         stream = MinimumImageDimensions(self.example_stream, (4, 5),
                                         which_sources=('source1',))
@@ -260,6 +317,36 @@ class TestFixedSizeRandomCrop(ImageTestingMixin):
         else:
             assert False
 
+    def test_list_batch_source_kernel(self):
+        stream = RandomFixedSizeCrop(self.batch_stream, (5, 4),
+                                     which_sources=('source2',))
+        source2 = self.dataset.indexables[1]
+        object_source = numpy.empty(len(source2), dtype=object)
+        object_source[:] = source2
+        for source in (source2, object_source):
+            out = stream.transform_source_batch(source, 'source2')
+            assert isinstance(out, numpy.ndarray)
+            assert out.shape == (len(source2), 2, 5, 4)
+            for crop, image in zip(out, source2):
+                # Each crop must be a window of its own image.
+                height, width = image.shape[1:]
+                assert any(
+                    numpy.array_equal(crop, image[:, i:i + 5, j:j + 4])
+                    for i in range(height - 4) for j in range(width - 3))
+
+    def test_list_batch_source_fallback(self):
+        stream = RandomFixedSizeCrop(self.batch_stream, (5, 4),
+                                     which_sources=('source2',))
+        source2 = self.dataset.indexables[1]
+        mixed = [source2[0], source2[1].astype('int32')]
+        out = stream.transform_source_batch(mixed, 'source2')
+        assert isinstance(out, numpy.ndarray)
+        assert out.shape == (2, 2, 5, 4)
+        channels = [source2[0], numpy.zeros((3, 6, 6), dtype='uint8')]
+        out = stream.transform_source_batch(channels, 'source2')
+        assert isinstance(out, list)
+        assert out[1].shape == (3, 5, 4)
+
     def test_format_exceptions(self):
         estream = RandomFixedSizeCrop(self.example_stream, (5, 4),
                                       which_sources=('source2',))
@@ -285,6 +372,12 @@ class TestFixedSizeRandomCrop(ImageTestingMixin):
         assert_raises(ValueError, bstream.transform_source_batch,
                       numpy.empty((5, 3, 4, 2)), 'source1')
 
+        bstream = RandomFixedSizeCrop(self.batch_stream, (5, 4),
+                                      which_sources=('source2',))
+        assert_raises(ValueError, bstream.transform_source_batch,
+                      [numpy.empty((3, 6, 6), dtype='uint8'),
+                       numpy.empty((3, 4, 6), dtype='uint8')], 'source2')
+
 
 class TestRandom2DRotation(ImageTestingMixin):
     def setUp(self):
@@ -435,3 +528,109 @@ class TestRandom2DRotation(ImageTestingMixin):
         out = bstream.transform_source_batch(self.source3, 'source3')
         assert_equal(out[0], expected[0])
         assert_equal(out[1], expected[1])
+
+
+class TestBatchwiseImageTransformers(ImageTestingMixin):
+    def setUp(self):
+        source1 = numpy.zeros((4, 2, 3, 4), dtype='uint8')
+        source1[:] = numpy.arange(2 * 3 * 4, dtype='uint8').reshape(2, 3, 4)
+        source2 = [numpy.arange(2 * 3 * 5, dtype='float32').reshape(2, 3, 5),
+                   numpy.arange(2 * 4 * 4, dtype='float32').reshape(2, 4, 4),
+                   numpy.arange(2 * 3 * 4, dtype='float32').reshape(2, 3, 4),
+                   numpy.arange(2 * 5 * 3, dtype='float32').reshape(2, 5, 3)]
+        self.source1 = source1
+        self.source2 = source2
+        axis_labels = {'source1': ('batch', 'channel', 'height', 'width'),
+                       'source2': ('batch', 'channel', 'height', 'width')}
+        self.dataset = IndexableDataset(OrderedDict([('source1', source1),
+                                                     ('source2', source2)]),
+                                        axis_labels=axis_labels)
+        self.common_setup()
+
+    def test_flip(self):
+        stream = RandomFlip(self.batch_stream, horizontal=1, vertical=1,
+                            which_sources=('source1',))
+        out = stream.transform_source_batch(self.source1, 'source1')
+        assert_equal(out, self.source1[:, :, ::-1, ::-1])
+        out = stream.transform_source_batch(self.source2, 'source1')
+        assert isinstance(out, list)
+        for image, flipped in zip(self.source2, out):
+            assert_equal(flipped, image[:, ::-1, ::-1])
+
+    def test_flip_probabilities(self):
+        stream = RandomFlip(self.example_stream, horizontal=0, vertical=0,
+                            which_sources=('source1',))
+        for example in stream.get_epoch_iterator():
+            assert_equal(example[0], self.source1[0])
+        assert_raises(ValueError, RandomFlip, self.example_stream, 1.5)
+
+    def test_affine_identity(self):
+        stream = RandomAffineTransformation(self.batch_stream,
+                                            which_sources=('source1',
+                                                           'source2'))
+        for batch in stream.get_epoch_iterator():
+            for image in batch[0]:
+                assert_equal(image, self.source1[0])
+            assert isinstance(batch[1], list)
+        out = stream.transform_source_batch(self.source2, 'source2')
+        for image, warped in zip(self.source2, out):
+            assert_equal(warped, image)
+
+    def test_affine_flip_matches_flip(self):
+        stream = RandomAffineTransformation(self.batch_stream,
+                                            horizontal_flip=1,
+                                            which_sources=('source1',))
+        out = stream.transform_source_batch(self.source1, 'source1')
+        assert_equal(out, self.source1[:, :, :, ::-1])
+
+    def test_affine_translation(self):
+        stream = RandomAffineTransformation(self.example_stream,
+                                            maximum_translation=(0, 1),
+                                            rng=numpy.random.RandomState(1),
+                                            which_sources=('source2',))
+        out = stream.transform_source_example(self.source2[0], 'source2')
+        stream.rng = numpy.random.RandomState(1)
+        shift = int(numpy.round(stream.sample_parameters(1)[1][0, 1]))
+        expected = numpy.zeros_like(self.source2[0])
+        if shift >= 0:
+            expected[:, :, shift:] = self.source2[0][:, :, :5 - shift]
+        else:
+            expected[:, :, :5 + shift] = self.source2[0][:, :, -shift:]
+        assert_equal(out, expected)
+
+    def test_affine_bilinear_scale(self):
+        stream = RandomAffineTransformation(self.example_stream,
+                                            scale_range=(2, 2),
+                                            resample='bilinear',
+                                            which_sources=('source2',))
+        out = stream.transform_source_example(self.source2[2], 'source2')
+        assert out.shape == (2, 3, 4)
+        assert out.dtype == numpy.float32
+        # Zooming in around the center keeps the center value.
+        assert_equal(out[:, 1, :].mean(axis=1),
+                     self.source2[2][:, 1, :].mean(axis=1))
+
+    def test_affine_exceptions(self):
+        assert_raises(ValueError, RandomAffineTransformation,
+                      self.example_stream, scale_range=(0, 1))
+        assert_raises(ValueError, RandomAffineTransformation,
+                      self.example_stream, resample='bicubic')
+        stream = RandomAffineTransformation(self.batch_stream,
+                                            which_sources=('source2',))
+        assert_raises(ValueError, stream.transform_source_batch,
+                      [numpy.empty((3, 4))], 'source2')
+
+    def test_brightness_contrast(self):
+        stream = RandomBrightnessContrast(self.batch_stream,
+                                          maximum_brightness=300,
+                                          which_sources=('source1',))
+        out = stream.transform_source_batch(self.source1, 'source1')
+        assert out.dtype == numpy.uint8
+        assert out.min() >= 0 and out.max() <= 255
+        stream = RandomBrightnessContrast(self.example_stream,
+                                          contrast_range=(0, 0),
+                                          which_sources=('source2',))
+        out = stream.transform_source_example(self.source2[0], 'source2')
+        assert_equal(out, numpy.ones_like(out) * self.source2[0].mean())
+        assert_raises(ValueError, RandomBrightnessContrast,
+                      self.example_stream, contrast_range=(2, 1))
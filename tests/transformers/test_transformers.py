@@ -1,9 +1,10 @@
 import logging
 import operator
+import threading
 from collections import OrderedDict
 
 import numpy
-from numpy.testing import assert_raises, assert_equal
+from numpy.testing import assert_allclose, assert_raises, assert_equal
 from six.moves import zip, cPickle
 
 from fuel import config
@@ -13,8 +14,9 @@ from fuel.schemes import (ConstantScheme, SequentialScheme,
 from fuel.streams import DataStream
 from fuel.transformers import (
     ExpectsAxisLabels, Transformer, Mapping, SortMapping, ForceFloatX, Filter,
-    Cache, Batch, Padding, MultiProcessing, Unpack, Merge,
-    SourcewiseTransformer, Flatten, ScaleAndShift, Cast, Rename, FilterSources)
+    Cache, Batch, Padding, MultiProcessing, Unpack, Merge, Multiplex,
+    SourcewiseTransformer, Flatten, ScaleAndShift, Normalize, Cast, Rename,
+    FilterSources, ElementwiseFusion, fuse)
 from fuel.transformers.defaults import ToBytes
 
 
@@ -233,6 +235,33 @@ class TestScaleAndShift(object):
         assert_equal(self.wrapper.axis_labels, self.stream.axis_labels)
 
 
+class TestNormalize(object):
+    def setUp(self):
+        self.features = numpy.arange(24, dtype='uint8').reshape((4, 2, 3))
+        dataset = IndexableDataset(
+            OrderedDict([('features', self.features),
+                         ('targets', numpy.arange(4))]),
+            axis_labels={'features': ('batch', 'channel', 'width'),
+                         'targets': ('batch',)})
+        self.stream = DataStream(
+            dataset, iteration_scheme=SequentialScheme(4, 2))
+        self.mean = self.features.mean(axis=(0, 2), keepdims=True)[0]
+        self.std = self.features.std(axis=(0, 2), keepdims=True)[0]
+        self.wrapper = Normalize(
+            self.stream, {'features': (self.mean, self.std)})
+
+    def test_normalize(self):
+        features = numpy.concatenate(
+            [f for f, t in self.wrapper.get_epoch_iterator()])
+        assert_allclose(features, (self.features - self.mean) / self.std,
+                        rtol=1e-5)
+        assert features.dtype == config.floatX
+        assert_equal(next(self.wrapper.get_epoch_iterator())[1], [0, 1])
+
+    def test_axis_labels_are_passed_through(self):
+        assert_equal(self.wrapper.axis_labels, self.stream.axis_labels)
+
+
 class TestCast(object):
     def setUp(self):
         dataset = IterableDataset(
@@ -280,6 +309,121 @@ class TestForceFloatX(object):
         assert_equal(transformer.axis_labels, stream.axis_labels)
 
 
+class TestInplace(object):
+    def setUp(self):
+        self.dataset = IndexableDataset(
+            OrderedDict([('features', numpy.arange(30, dtype='uint8')
+                          .reshape((10, 3))),
+                         ('targets', numpy.arange(10))]))
+        self.stream = DataStream(self.dataset,
+                                 iteration_scheme=SequentialScheme(10, 4))
+
+    def test_buffers_are_reused(self):
+        stream = Cast(ScaleAndShift(self.stream, 2, 1, inplace=True),
+                      'float32', inplace=True, which_sources=('features',))
+        epoch = stream.get_epoch_iterator()
+        first = next(epoch)[0]
+        assert_equal(first, numpy.arange(12).reshape((4, 3)) * 2 + 1)
+        assert first.dtype == 'float32'
+        second = next(epoch)[0]
+        assert second is first
+        assert_equal(second, numpy.arange(12, 24).reshape((4, 3)) * 2 + 1)
+        last, targets = next(epoch)
+        assert last.shape == (2, 3)
+        assert_equal(targets, [17, 19])
+        assert_equal(self.dataset.features[0], [0, 1, 2])
+
+    def test_matches_copying_transformers(self):
+        def pipeline(inplace):
+            stream = ScaleAndShift(self.stream, 1 / 255.0, -0.5,
+                                   inplace=inplace)
+            stream = ForceFloatX(Cast(stream, 'float32', inplace=inplace),
+                                 inplace=inplace)
+            return Flatten(stream, inplace=inplace)
+        for expected, data in zip(pipeline(False).get_epoch_iterator(),
+                                  pipeline(True).get_epoch_iterator()):
+            for expected_source, source in zip(expected, data):
+                assert source.dtype == expected_source.dtype
+                assert_equal(source, expected_source)
+
+    def test_flatten_example_is_view(self):
+        stream = Flatten(self.dataset.get_example_stream(), inplace=True,
+                         which_sources=('features',))
+        features, _ = next(stream.get_epoch_iterator())
+        assert features.base is not None
+
+    def test_fused_transformer_reuses_buffers(self):
+        stream = fuse(Cast(ScaleAndShift(self.stream, 1 / 255.0, 0,
+                                         inplace=True),
+                           'float32', inplace=True))
+        assert stream.inplace
+        epoch = stream.get_epoch_iterator()
+        assert next(epoch)[0] is next(epoch)[0]
+        assert not fuse(Cast(ScaleAndShift(self.stream, 1 / 255.0, 0),
+                             'float32', inplace=True)).inplace
+
+    def test_buffers_are_not_pickled(self):
+        stream = ScaleAndShift(self.stream, 2, 1, inplace=True)
+        next(stream.get_epoch_iterator())
+        assert '_buffers' not in cPickle.loads(cPickle.dumps(stream)).__dict__
+
+
+class TestFuse(object):
+    def setUp(self):
+        self.dataset = IndexableDataset(
+            OrderedDict([('features', numpy.arange(12, dtype='uint8')),
+                         ('targets', numpy.arange(12))]),
+            axis_labels={'features': ('batch',), 'targets': ('batch',)})
+
+    def get_stream(self):
+        stream = DataStream(self.dataset,
+                            iteration_scheme=SequentialScheme(12, 5))
+        stream = ScaleAndShift(stream, 1 / 255.0, 0)
+        stream = Cast(stream, 'float32', which_sources=('features',))
+        return ScaleAndShift(stream, 2, 1, which_sources=('targets',))
+
+    def test_fuse(self):
+        fused = fuse(self.get_stream())
+        assert isinstance(fused, ElementwiseFusion)
+        assert isinstance(fused.data_stream, DataStream)
+        assert_equal(fused.axis_labels, self.dataset.axis_labels)
+        assert_equal(
+            fused.steps,
+            {'features': [('scale_and_shift', 1 / 255.0, 0),
+                          ('cast', 'float32')],
+             'targets': [('scale_and_shift', 1 / 255.0, 0),
+                         ('scale_and_shift', 2, 1)]})
+        for expected, data in zip(self.get_stream().get_epoch_iterator(),
+                                  fused.get_epoch_iterator()):
+            for expected_source, source in zip(expected, data):
+                assert source.dtype == expected_source.dtype
+                assert_equal(source, expected_source)
+
+    def test_fuse_below_other_transformers(self):
+        stream = Mapping(self.get_stream(), lambda data: data)
+        assert fuse(stream) is stream
+        assert isinstance(stream.data_stream, ElementwiseFusion)
+
+    def test_single_transformer_is_not_fused(self):
+        stream = Cast(DataStream(self.dataset), 'float32')
+        assert fuse(stream) is stream
+
+    def test_default_transformers_are_fused(self):
+        self.dataset.default_transformers = (
+            (ScaleAndShift, [1 / 255.0, 0], {}), (Cast, ['floatX'], {}))
+        stream = DataStream.default_stream(
+            self.dataset, iteration_scheme=SequentialScheme(12, 5))
+        assert isinstance(stream, ElementwiseFusion)
+        features, targets = next(stream.get_epoch_iterator())
+        assert features.dtype == config.floatX
+        assert_allclose(features, numpy.arange(5) / 255.0, rtol=1e-6)
+
+    def test_pickling(self):
+        fused = cPickle.loads(cPickle.dumps(fuse(self.get_stream())))
+        assert_equal(next(fused.get_epoch_iterator())[1],
+                     numpy.arange(5) / 255.0 * 2 + 1)
+
+
 class TestFilter(object):
     def test_filter_examples(self):
         data = [1, 2, 3]
@@ -614,6 +758,110 @@ class TestMerge(object):
         assert all(stream.reset_called for stream in streams)
 
 
+class TestMultiplex(object):
+    def setUp(self):
+        self.streams = [DataStream(IterableDataset(range(0, 3))),
+                        DataStream(IterableDataset(range(10, 12))),
+                        DataStream(IterableDataset(range(20, 25)))]
+
+    def test_without_restart(self):
+        for prefetch in (0, 2):
+            stream = Multiplex(self.streams, restart=False, prefetch=prefetch)
+            for _ in range(2):
+                epoch = [data for data, in stream.get_epoch_iterator()]
+                assert sorted(epoch) == [0, 1, 2, 10, 11, 20, 21, 22, 23, 24]
+                assert [data for data in epoch if data < 10] == [0, 1, 2]
+
+    def test_restart_and_weights(self):
+        for prefetch in (0, 2):
+            stream = Multiplex(self.streams, weights=[1, 3, 0],
+                               num_steps=400, prefetch=prefetch)
+            epoch = [data for data, in stream.get_epoch_iterator()]
+            assert len(epoch) == 400
+            assert set(epoch) == {0, 1, 2, 10, 11}
+            assert 250 < sum(data >= 10 for data in epoch) < 350
+
+    def test_without_restart_terminates(self):
+        # Removing exhausted streams from the weights must not leave
+        # rounding errors behind, or exhausted streams are picked again
+        for i in range(30):
+            stream = Multiplex(self.streams, weights=[0.3, 0.6, 0.7],
+                               restart=False, prefetch=1,
+                               rng=numpy.random.RandomState(i))
+            epochs = []
+            thread = threading.Thread(target=lambda: epochs.append(
+                list(stream.get_epoch_iterator())))
+            thread.daemon = True
+            thread.start()
+            thread.join(10)
+            assert not thread.is_alive()
+            assert len(epochs[0]) == 10
+
+    def test_prefetch_error(self):
+        def fail(data):
+            raise KeyError
+        stream = Multiplex([self.streams[0], Mapping(self.streams[1], fail)],
+                           weights=[0, 1], prefetch=1)
+        errors = []
+
+        def read():
+            epoch_iterator = stream.get_epoch_iterator()
+            try:
+                next(epoch_iterator)
+            except KeyError as e:
+                errors.append(e)
+            # The failed stream isn't picked again
+            assert_raises(StopIteration, next, epoch_iterator)
+            errors.append(None)
+        thread = threading.Thread(target=read)
+        thread.daemon = True
+        thread.start()
+        thread.join(10)
+        assert not thread.is_alive()
+        assert len(errors) == 2
+
+    def test_prefetch_epochs(self):
+        epochs = []
+        for prefetch in (0, 2):
+            streams = [DataStream(IterableDataset(range(100))),
+                       DataStream(IterableDataset(range(100, 200)))]
+            stream = Multiplex(streams, restart=False, num_steps=4,
+                               prefetch=prefetch,
+                               rng=numpy.random.RandomState(1))
+            epochs.append([list(stream.get_epoch_iterator())
+                           for _ in range(3)])
+            stream.close()
+        assert epochs[0] == epochs[1]
+
+    def test_close_stops_prefetching(self):
+        stream = Multiplex(self.streams, num_steps=2, prefetch=1)
+        threads = []
+        for _ in range(2):
+            list(stream.get_epoch_iterator())
+            threads.extend(stream._threads)
+            stream.close()
+            assert not any(thread.is_alive() for thread in threads)
+
+    def test_time_varying_weights(self):
+        stream = Multiplex(self.streams,
+                           weights=lambda step: [step < 5, 0, step >= 5],
+                           num_steps=10)
+        epoch = [data for data, in stream.get_epoch_iterator()]
+        assert epoch == [0, 1, 2, 0, 1, 20, 21, 22, 23, 24]
+        assert stream.step == 10
+
+    def test_empty_stream(self):
+        stream = Multiplex([DataStream(IterableDataset([])),
+                            DataStream(IterableDataset([1]))], num_steps=3)
+        assert [data for data, in stream.get_epoch_iterator()] == [1, 1, 1]
+
+    def test_value_error(self):
+        assert_raises(ValueError, Multiplex, [
+            self.streams[0], Batch(self.streams[1], ConstantScheme(2))])
+        self.streams[1].sources = ('features',)
+        assert_raises(ValueError, Multiplex, self.streams)
+
+
 class TestMultiprocessing(object):
     def setUp(self):
         stream = DataStream(IterableDataset(range(100)))